@@ -0,0 +1,195 @@
+"""
+Offline upstream for the benchmark.
+
+World Bank and OECD responses come from a recorded cassette (see `python -m benchmarks.run --record`)
+and, for anything not on the cassette, from a deterministic generator that speaks the same
+JSON formats. Either way the real adapters, HttpClient retry loop and parsers do the work;
+only the socket is replaced.
+"""
+import json
+import math
+import time
+import random
+import threading
+from typing import Dict, Tuple
+from urllib.parse import urlencode, urlsplit, parse_qs
+import requests
+from data.http_client import HttpClient
+from data.countries import COUNTRY_NAMES
+
+def fixture_key(url: str, params: dict | None) -> str:
+    return f"{url}?{urlencode(sorted((params or {}).items()))}" if params else url
+
+class Fixtures:
+    """
+    (url, params) -> (status, body bytes).
+    Cassette entries win; otherwise World Bank / OECD URLs are synthesised with
+    `years` points per series (one value per year in the requested window).
+    """
+
+    def __init__(self, cassette_path: str | None = None):
+        self.recorded: Dict[str, Tuple[int, bytes]] = {}
+        if cassette_path:
+            with open(cassette_path) as f:
+                for entry in json.load(f):
+                    self.recorded[entry["key"]] = (entry["status"], entry["body"].encode())
+        self.replayed = 0
+        self.synthesised = 0
+        self._lock = threading.Lock()
+
+    def respond(self, url: str, params: dict | None) -> Tuple[int, bytes]:
+        entry = self.recorded.get(fixture_key(url, params))
+        if entry is not None:
+            self._count("replayed")
+            return entry
+
+        self._count("synthesised")
+        host = urlsplit(url).netloc
+        if "worldbank" in host:
+            return 200, json.dumps(_worldbank_payload(url, params or {})).encode()
+        if "oecd" in host:
+            payload = _oecd_payload(url)
+            return (200, json.dumps(payload).encode()) if payload else (404, b"NoRecordsFound")
+        return 404, b""
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+class FixtureSession(requests.Session):
+    """
+    A Session whose GETs never leave the process. `latency` (seconds) stands in for the network.
+    """
+
+    def __init__(self, fixtures: Fixtures, latency: float = 0.0):
+        super().__init__()
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        if self.latency:
+            if timeout is not None and timeout < self.latency:
+                time.sleep(timeout)
+                raise requests.Timeout(f"Fixture response slower than the {timeout:.2f}s timeout")
+            time.sleep(self.latency)
+        status, body = self.fixtures.respond(url, params)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.url = url
+        response.encoding = "utf-8"
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+class ReplayHttpClient(HttpClient):
+    """
+    HttpClient (same retry loop, counters and listeners) over a FixtureSession.
+    """
+
+    def __init__(self, fixtures: Fixtures, latency: float = 0.0):
+        super().__init__()
+        self._fixture_session = FixtureSession(fixtures, latency)
+
+    def _session_for(self, url: str) -> requests.Session:
+        return self._fixture_session
+
+class RecordingHttpClient(HttpClient):
+    """
+    Live HttpClient that keeps every final response, for writing a cassette.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.entries: Dict[str, dict] = {}
+
+    def get(self, url: str, params: dict | None = None, timeout: float = 10) -> requests.Response:
+        response = super().get(url, params=params, timeout=timeout)
+        key = fixture_key(url, dict(params) if params else None)
+        with self._lock:
+            self.entries[key] = {"key": key, "status": response.status_code, "body": response.text}
+        return response
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(list(self.entries.values()), f)
+
+# --- Synthetic payloads ---
+def _series_values(country: str, indicator: str, years: range) -> Dict[int, float]:
+    """
+    A deterministic random walk per (country, indicator), on the indicator's rough scale.
+    """
+    rng = random.Random(f"{country}:{indicator}")
+    if indicator == "SP.POP.TOTL":
+        level, step = rng.uniform(5e6, 1.4e9), 0.012
+    elif indicator == "EN.ATM.CO2E.KT":
+        level, step = rng.uniform(1e4, 1e7), 0.03
+    else:
+        level, step = rng.uniform(1, 8), 0.25
+    values = {}
+    for year in years:
+        level = level * (1 + rng.gauss(0.01, step)) if level > 100 else level + rng.gauss(0, step * 4)
+        values[year] = round(level, 3)
+    return values
+
+def _worldbank_payload(url: str, params: dict) -> list:
+    path = urlsplit(url).path  # /v2/country/IND;CHN/indicator/NY.GDP.MKTP.KD.ZG
+    countries = path.split("/country/")[1].split("/")[0].split(";")
+    if countries == ["all"]:
+        # Every known country plus a few aggregates, which the adapter must filter out.
+        countries = list(COUNTRY_NAMES) + ["WLD", "EUU", "HIC"]
+    indicator = path.split("/indicator/")[1].strip("/")
+    start, end = (int(y) for y in str(params.get("date", "2018:2022")).split(":"))
+    per_page = int(params.get("per_page", 50))
+    page = int(params.get("page", 1))
+
+    records = []
+    for country in countries:
+        values = _series_values(country, indicator, range(start, end + 1))
+        # Newest first, like the real API
+        for year in range(end, start - 1, -1):
+            records.append({
+                "indicator": {"id": indicator, "value": indicator},
+                "country": {"id": country[:2], "value": country},
+                "countryiso3code": country,
+                "date": str(year),
+                "value": values[year],
+                "unit": "", "obs_status": "", "decimal": 1,
+            })
+
+    pages = max(1, math.ceil(len(records) / per_page))
+    header = {"page": page, "pages": pages, "per_page": per_page, "total": len(records)}
+    return [header, records[(page - 1) * per_page: page * per_page]]
+
+def _oecd_payload(url: str) -> dict | None:
+    """
+    SDMX-JSON with dimensionAtObservation=allDimensions. The key's dimensions may use
+    '+' (OR) to list several members, e.g. USA+FRA.HUR.TOT.GT.A.
+    """
+    parts = urlsplit(url)
+    segments = parts.path.split("/")
+    key = segments[segments.index("data") + 2]
+    query = parse_qs(parts.query)
+    start, end = int(query["startTime"][0]), int(query["endTime"][0])
+
+    dim_ids = ["LOCATION", "SUBJECT", "MEASURE", "AGE", "FREQUENCY"]
+    members = [part.split("+") for part in key.split(".")]
+    members += [[""]] * (len(dim_ids) - len(members))
+    years = list(range(start, end + 1))
+
+    observations = {}
+    for c, country in enumerate(members[0]):
+        for s, subject in enumerate(members[1]):
+            values = _series_values(country, subject, range(start, end + 1))
+            for t, year in enumerate(years):
+                observations[f"{c}:{s}:0:0:0:{t}"] = [values[year], None]
+    if not observations:
+        return None
+
+    dimensions = [{"id": dim_id, "values": [{"id": m, "name": m} for m in dim_members]}
+                  for dim_id, dim_members in zip(dim_ids, members)]
+    dimensions.append({"id": "TIME_PERIOD", "values": [{"id": str(y), "name": str(y)} for y in years]})
+    return {
+        "header": {"id": "benchmark-fixture"},
+        "dataSets": [{"action": "Information", "observations": observations}],
+        "structure": {"dimensions": {"observation": dimensions}},
+    }
@@ -0,0 +1,463 @@
+"""
+Offline benchmark for the analysis pipeline.
+
+    python -m benchmarks.run                                  # both modes, defaults
+    python -m benchmarks.run --mode api --concurrency 32 --requests 500
+    python -m benchmarks.run --mode batch --batch-size 20       # POST /api/v1/query/batch
+    python -m benchmarks.run --years 60 --cache warm          # long series, cache-served
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.25
+
+No network: World Bank / OECD come from benchmarks.fixtures, Gemini from benchmarks.stub_llm.
+Modes:
+- pipeline: AgentOrchestrator.run_pipeline from a thread pool (the blocking entry point).
+- api:      POST /api/v1/query through the FastAPI app, in-process over ASGI (routing, validation,
+            the async pipeline and serialisation; no sockets).
+- batch:    the same questions as POST /api/v1/query/batch, --batch-size per request; throughput
+            counts questions, latency is per batch.
+Reports end-to-end p50/p95/p99 and throughput, the same percentiles per stage/span
+(from the tracing spans), and peak Python memory per stage from a separate sequential pass.
+"""
+import os
+import sys
+
+# The benchmark never touches the real cache files, the network or the real Gemini key.
+# (Set before any project import: these are read at import time.)
+os.environ["SERIES_CACHE_PATH"] = ":memory:"
+for name in ("PLAN_CACHE_PATH", "NARRATIVE_CACHE_PATH", "RESPONSE_CACHE_PATH", "SHARED_STORE_PATH", "WEB_CONCURRENCY"):
+    os.environ.pop(name, None)
+os.environ.pop("PREFETCH_INTERVAL_HOURS", None)
+# Fixtures are not rate limited; the simulated latency is the constraint (concurrency caps stay on).
+os.environ["WORLDBANK_RATE_PER_SEC"] = os.environ["OECD_RATE_PER_SEC"] = "0"
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import threading
+import tracemalloc
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import numpy as np
+from orchestrator.main import AgentOrchestrator
+from orchestrator.cache import TTLCache
+from orchestrator import tracing
+from benchmarks.fixtures import Fixtures, ReplayHttpClient, RecordingHttpClient
+from benchmarks.stub_llm import StubModel
+
+# WORKLOAD
+# Fast-path questions (rule-based router) and questions that need the planner (canned LLM plans).
+FAST_PATH_QUERIES = [
+    "GDP growth India vs China",
+    "US inflation",
+    "population of Brazil",
+    "CO2 emissions Germany vs Japan vs India",
+    "inflation in France, Italy and Spain",
+    "unemployment in Canada",
+]
+PLANNED_QUERIES = {
+    "Why did inflation in Turkey and Argentina diverge from Brazil?": {
+        "target_countries": ["TUR", "ARG", "BRA"], "target_indicators": ["FP.CPI.TOTL.ZG"],
+        "source": "WORLDBANK", "topic": "inflation_divergence"},
+    "Which of the G7 grew fastest?": {
+        "target_countries": ["USA", "JPN", "DEU", "GBR", "FRA", "ITA", "CAN"],
+        "target_indicators": ["NY.GDP.MKTP.KD.ZG", "FP.CPI.TOTL.ZG"],
+        "source": "WORLDBANK", "topic": "g7_growth"},
+    "How has joblessness in Spain compared with Portugal?": {
+        "target_countries": ["ESP", "PRT"], "target_indicators": ["HUR"],
+        "source": "OECD", "topic": "unemployment"},
+}
+WORKLOAD = FAST_PATH_QUERIES + list(PLANNED_QUERIES)
+
+LAST_YEAR = 2023
+STAGES = ("plan", "fetch", "analyze", "narrate", "total")
+
+class BenchmarkOrchestrator(AgentOrchestrator):
+    """
+    The real orchestrator with a configurable year window, so series size is a benchmark knob.
+    """
+
+    def __init__(self, years: List[int]):
+        super().__init__()
+        self.years = years
+
+    def _plan(self, user_query: str):
+        plan = super()._plan(user_query)
+        plan.years = list(self.years)
+        return plan
+
+    async def _aplan(self, user_query: str):
+        plan = await super()._aplan(user_query)
+        plan.years = list(self.years)
+        return plan
+
+    async def aplan_many(self, user_queries: List[str], query_id: str | None = None, timeout: float | None = None) -> list:
+        plans = await super().aplan_many(user_queries, query_id, timeout)
+        for plan in plans:
+            if not isinstance(plan, Exception):
+                plan.years = list(self.years)
+        return plans
+
+def build_orchestrator(args, client) -> BenchmarkOrchestrator:
+    orchestrator = BenchmarkOrchestrator(list(range(LAST_YEAR - args.years + 1, LAST_YEAR + 1)))
+    attach_fixtures(orchestrator, client, args.llm_latency)
+    fetcher = orchestrator.fetcher
+    if args.cache == "cold":
+        # Every request goes through the adapters and parsers; only in-flight coalescing remains.
+        for source in fetcher.sources:
+            source.adapter = source.adapter.adapter
+        orchestrator.planner.plan_cache = TTLCache("plans", max_entries=0, ttl=0)
+        orchestrator.narrator.cache = TTLCache("narratives", max_entries=0, ttl=0)
+    return orchestrator
+
+def attach_fixtures(orchestrator, client, llm_latency_ms: float):
+    """
+    Points an already-built orchestrator at the offline fixtures and the stub LLM.
+    """
+    model = StubModel(PLANNED_QUERIES, latency=llm_latency_ms / 1000)
+    orchestrator.planner.model = model
+    orchestrator.narrator.model = model
+
+    fetcher = orchestrator.fetcher
+    fetcher.http = client
+    client.add_listener(tracing.record_upstream)
+    for source in fetcher.sources:
+        source.upstream.client = client
+
+# --- Span capture ---
+class SpanCollector(logging.Handler):
+    """
+    Collects the duration of every tracing span (stage.*, adapter.*, upstream, llm.*).
+    """
+
+    def __init__(self):
+        super().__init__(level=logging.INFO)
+        self.durations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        span = getattr(record, "span", None)
+        if span is None:
+            return
+        with self._lock:
+            self.durations.setdefault(span["name"], []).append(span["duration_ms"])
+
+    def reset(self):
+        with self._lock:
+            self.durations = {}
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Silences the per-request JSON logs and adapter prints while measuring (they would dominate).
+    """
+    handlers = [h for name in list(logging.root.manager.loggerDict)
+                for h in getattr(logging.getLogger(name), "handlers", [])
+                if isinstance(h, logging.StreamHandler)]
+    levels = [h.level for h in handlers]
+    for h in handlers:
+        h.setLevel(logging.WARNING)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            yield
+        finally:
+            for h, level in zip(handlers, levels):
+                h.setLevel(level)
+
+def percentiles(samples_ms: List[float]) -> dict:
+    if not samples_ms:
+        return {"count": 0}
+    arr = np.asarray(samples_ms, dtype=float)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"count": int(arr.size), "p50": round(float(p50), 2), "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2), "mean": round(float(arr.mean()), 2), "max": round(float(arr.max()), 2)}
+
+# --- Drivers ---
+def run_pipeline_mode(orchestrator, queries: List[str], concurrency: int, deadline: float | None = None) -> dict:
+    latencies, errors, partial = [], 0, 0
+    lock = threading.Lock()
+
+    def one(query: str):
+        nonlocal errors, partial
+        start = time.perf_counter()
+        result = orchestrator.run_pipeline(query, timeout=deadline)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            errors += result.get("type") != "success"
+            partial += is_partial(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        list(pool.map(one, queries))
+    return {"wall_s": time.perf_counter() - start, "latencies": latencies, "errors": errors, "partial": partial}
+
+def is_partial(result: dict | None) -> bool:
+    return bool(result and result.get("type") == "success" and result["data"].get("partial"))
+
+def deadline_headers(deadline: float | None) -> dict:
+    return {"x-request-timeout": str(deadline)} if deadline else {}
+
+def run_api_mode(orchestrator, queries: List[str], concurrency: int, cache: str = "cold",
+                 deadline: float | None = None) -> dict:
+    import gateway.routes as routes
+    from gateway.main import app
+    from gateway.response_cache import ResponseCache
+    routes.orchestrator = orchestrator
+    # Cold: every request runs the pipeline. Warm: repeats are answered from the response cache.
+    routes.response_cache = ResponseCache(max_entries=0 if cache == "cold" else 256, disk_path=None)
+
+    async def drive():
+        latencies, errors, partial = [], 0, 0
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(query: str):
+            nonlocal errors, partial
+            async with limit:
+                start = time.perf_counter()
+                status, body = await asgi_post(app, "/api/v1/query", {"text": query}, deadline_headers(deadline))
+                latencies.append((time.perf_counter() - start) * 1000)
+                result = json.loads(body).get("result") if status == 200 else None
+                if not result or result.get("type") != "success":
+                    errors += 1
+                partial += is_partial(result)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in queries))
+        return {"wall_s": time.perf_counter() - start, "latencies": latencies, "errors": errors, "partial": partial}
+
+    return asyncio.run(drive())
+
+def run_batch_mode(orchestrator, queries: List[str], concurrency: int, cache: str = "cold",
+                   batch_size: int = 20, deadline: float | None = None) -> dict:
+    import gateway.routes as routes
+    from gateway.main import app
+    from gateway.response_cache import ResponseCache
+    routes.orchestrator = orchestrator
+    routes.response_cache = ResponseCache(max_entries=0 if cache == "cold" else 256, disk_path=None)
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+
+    async def drive():
+        latencies, errors, partial = [], 0, 0
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(batch: List[str]):
+            nonlocal errors, partial
+            async with limit:
+                start = time.perf_counter()
+                status, body = await asgi_post(app, "/api/v1/query/batch", {"texts": batch}, deadline_headers(deadline))
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors += len(batch)
+                    return
+                results = [item["result"] for item in json.loads(body)["results"]]
+                errors += sum(result.get("type") != "success" for result in results)
+                partial += sum(map(is_partial, results))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(batch) for batch in batches))
+        return {"wall_s": time.perf_counter() - start, "latencies": latencies, "errors": errors, "partial": partial}
+
+    return asyncio.run(drive())
+
+async def asgi_post(app, path: str, payload: dict, headers: dict | None = None):
+    return await asgi_request(app, "POST", path, payload, headers)
+
+async def asgi_request(app, method: str, path: str, payload: dict | None = None, headers: dict | None = None):
+    """
+    One HTTP request straight into the ASGI app. Returns (status, body bytes).
+    """
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())]
+                   + [(name.encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    sent = False
+    done = asyncio.Event()
+    status, chunks = 0, []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+def profile_memory(orchestrator, queries: List[str]) -> dict:
+    """
+    Peak Python allocations per stage (KiB), one query at a time so peaks are attributable.
+    """
+    peaks = {stage: 0 for stage in ("plan", "fetch", "analyze", "narrate")}
+    tracemalloc.start()
+    try:
+        for query in queries:
+            for stage in peaks:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                if stage == "plan":
+                    plan = orchestrator._plan(query)
+                elif stage == "fetch":
+                    series = orchestrator.fetcher.execute_plan(plan)
+                elif stage == "analyze":
+                    stats = orchestrator.analyst.analyze(series)
+                else:
+                    orchestrator.narrate(plan, stats)
+                peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    return {stage: round(peak / 1024, 1) for stage, peak in peaks.items()}
+
+# --- Reporting ---
+def summarise(raw: dict, spans: Dict[str, List[float]], n_requests: int) -> dict:
+    return {
+        "requests": n_requests,
+        "errors": raw["errors"],
+        "partial": raw.get("partial", 0),
+        "wall_s": round(raw["wall_s"], 3),
+        "throughput_rps": round(n_requests / raw["wall_s"], 2) if raw["wall_s"] else 0.0,
+        "latency_ms": percentiles(raw["latencies"]),
+        "spans_ms": {name: percentiles(samples) for name, samples in sorted(spans.items())},
+    }
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    p95 regressions beyond `tolerance` (0.2 = 20% slower), end to end and per stage.
+    Differences under `min_delta_ms` are ignored (sub-millisecond stages are mostly scheduler noise).
+    """
+    regressions = []
+    for mode, result in report["results"].items():
+        base = baseline.get("results", {}).get(mode)
+        if base is None:
+            continue
+        pairs = [("latency", result["latency_ms"], base["latency_ms"])]
+        pairs += [(f"stage.{s}", result["spans_ms"].get(f"stage.{s}", {}), base["spans_ms"].get(f"stage.{s}", {}))
+                  for s in STAGES]
+        for name, now, before in pairs:
+            if not before.get("p95") or not now.get("p95") or now["p95"] - before["p95"] < min_delta_ms:
+                continue
+            if now["p95"] > before["p95"] * (1 + tolerance):
+                regressions.append(f"{mode} {name} p95 {before['p95']}ms -> {now['p95']}ms")
+    return regressions
+
+def print_report(report: dict):
+    cfg = report["config"]
+    print(f"\nBenchmark | years={cfg['years']} cache={cfg['cache']} concurrency={cfg['concurrency']} "
+          f"requests={cfg['requests']} upstream={cfg['upstream_latency_ms']}ms llm={cfg['llm_latency_ms']}ms")
+    for mode, result in report["results"].items():
+        lat = result["latency_ms"]
+        print(f"\n[{mode}] {result['throughput_rps']} req/s, errors={result['errors']}, partial={result.get('partial', 0)}, "
+              f"p50={lat.get('p50')}ms p95={lat.get('p95')}ms p99={lat.get('p99')}ms")
+        for name, p in result["spans_ms"].items():
+            print(f"  {name:<22} n={p['count']:<6} p50={p.get('p50'):<9} p95={p.get('p95'):<9} p99={p.get('p99')}")
+    print(f"\nPeak memory per stage (KiB): {report['memory']['stage_peak_kib']} | "
+          f"max RSS {report['memory']['max_rss_mib']} MiB")
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Offline pipeline benchmark.")
+    parser.add_argument("--mode", choices=["pipeline", "api", "batch", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per mode (cycles through the workload)")
+    parser.add_argument("--batch-size", type=int, default=20, help="questions per request in batch mode")
+    parser.add_argument("--years", type=int, default=5, help="points per series (years ending in 2023)")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold",
+                        help="cold: no plan/series/narrative/response cache, every request parses upstream JSON; warm: caches on, pre-filled")
+    parser.add_argument("--upstream-latency", type=float, default=20, help="simulated upstream latency per request (ms)")
+    parser.add_argument("--llm-latency", type=float, default=50, help="simulated Gemini latency per call (ms)")
+    parser.add_argument("--deadline", type=float, help="per-request time budget in seconds (default: REQUEST_DEADLINE_SECONDS)")
+    parser.add_argument("--cassette", help="recorded upstream responses to replay (see --record)")
+    parser.add_argument("--record", metavar="PATH", help="run the workload once against the live APIs and save a cassette")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against; exit 1 on p95 regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore p95 changes smaller than this")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        client = RecordingHttpClient()
+        orchestrator = build_orchestrator(args, client)
+        for query in WORKLOAD:
+            orchestrator.run_pipeline(query)
+        client.save(args.record)
+        print(f"Recorded {len(client.entries)} upstream responses to {args.record}")
+        return 0
+
+    collector = SpanCollector()
+    tracing.logger.addHandler(collector)
+    fixtures = Fixtures(args.cassette)
+    queries = [WORKLOAD[i % len(WORKLOAD)] for i in range(args.requests)]
+    modes = ["pipeline", "api"] if args.mode == "both" else [args.mode]
+
+    results = {}
+    with quiet():
+        for mode in modes:
+            orchestrator = build_orchestrator(args, ReplayHttpClient(fixtures, args.upstream_latency / 1000))
+            if args.cache == "warm":
+                for query in WORKLOAD:
+                    orchestrator.run_pipeline(query)
+            collector.reset()
+            if mode == "pipeline":
+                raw = run_pipeline_mode(orchestrator, queries, args.concurrency, args.deadline)
+            elif mode == "api":
+                raw = run_api_mode(orchestrator, queries, args.concurrency, args.cache, args.deadline)
+            else:
+                raw = run_batch_mode(orchestrator, queries, args.concurrency, args.cache, args.batch_size, args.deadline)
+            results[mode] = summarise(raw, collector.durations, len(queries))
+
+        memory = profile_memory(build_orchestrator(args, ReplayHttpClient(fixtures)), WORKLOAD)
+
+    report = {
+        "config": {
+            "mode": args.mode, "concurrency": args.concurrency, "requests": args.requests, "years": args.years,
+            "cache": args.cache, "upstream_latency_ms": args.upstream_latency, "llm_latency_ms": args.llm_latency,
+            "deadline_s": args.deadline,
+            "cassette": args.cassette, "fixtures": {"replayed": fixtures.replayed, "synthesised": fixtures.synthesised},
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+        "memory": {
+            "stage_peak_kib": memory,
+            # ru_maxrss is KiB on Linux
+            "max_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+    }
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+            return 1
+        print(f"\nNo p95 regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Start-up benchmark: what a container restart costs before the gateway serves traffic.
+
+    python -m benchmarks.startup                         # import budget + cold start, 3 runs each
+    python -m benchmarks.startup --import-budget-ms 600 --cold-start-budget-ms 3000
+    python -m benchmarks.startup --save benchmarks/startup.json
+
+Each run is a fresh interpreter:
+- import:     python -X importtime -c "import gateway.main"; total and the heaviest top-level packages.
+- cold start: a child process imports the app, runs the ASGI lifespan, polls GET /ready, then serves
+              one POST /api/v1/query (offline fixtures and stub LLM, attached once the agents exist).
+              Milestones are seconds since the child process started, interpreter start-up included.
+Exits 1 when the median of either measurement is over its budget.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+IMPORT_BUDGET_MS = 600
+FIRST_QUERY = "GDP growth India vs China"  # fast path: no planner call
+READY_TIMEOUT_S = 60
+
+# --- Import time ---
+def measure_imports(module: str = "gateway.main", top: int = 8) -> dict:
+    env = {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "offline-benchmark")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, env=env, check=True)
+    # "import time: self [us] | cumulative | <indent>module"; a package's cost is its largest cumulative entry.
+    totals, packages = {}, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name, ms = name.strip(), int(cumulative) / 1000
+        totals[name] = ms
+        root = name.split(".")[0]
+        packages[root] = max(packages.get(root, 0.0), ms)
+    packages.pop(module.split(".")[0], None)
+    heaviest = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {"total_ms": round(totals.get(module, 0.0), 1),
+            "heaviest_ms": {name: round(ms, 1) for name, ms in heaviest}}
+
+# --- Cold start (child process) ---
+def child() -> dict:
+    # Same isolation as benchmarks.run, set before the app reads its settings.
+    os.environ["SERIES_CACHE_PATH"] = ":memory:"
+    for name in ("PLAN_CACHE_PATH", "NARRATIVE_CACHE_PATH", "RESPONSE_CACHE_PATH", "SHARED_STORE_PATH", "WEB_CONCURRENCY",
+                 "PREFETCH_INTERVAL_HOURS"):
+        os.environ.pop(name, None)
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ["WORLDBANK_RATE_PER_SEC"] = os.environ["OECD_RATE_PER_SEC"] = "0"
+
+    from gateway.main import app
+    from orchestrator.tracing import process_age
+    milestones = {"imported_s": process_age()}
+    return asyncio.run(_drive(app, milestones))
+
+async def _drive(app, milestones: dict) -> dict:
+    from gateway import routes
+    shutdown, lifespan = await _start_lifespan(app)
+    milestones["lifespan_s"] = _age()
+
+    poll_statuses = []
+    deadline = time.monotonic() + READY_TIMEOUT_S
+    while time.monotonic() < deadline:
+        status, body = await _request(app, "GET", "/ready")
+        poll_statuses.append(status)
+        if status == 200 or json.loads(body).get("status") == "error":
+            break
+        await asyncio.sleep(0.01)
+    milestones["ready_s"] = _age()
+    milestones["ready"] = poll_statuses[-1] == 200
+    milestones["not_ready_polls"] = poll_statuses.count(503)
+
+    # Only now: benchmarks.run imports the orchestrator, whose import is part of what is measured.
+    from benchmarks.run import attach_fixtures
+    from benchmarks.fixtures import Fixtures, ReplayHttpClient
+    attach_fixtures(routes.get_orchestrator(), ReplayHttpClient(Fixtures(), latency=0.02), llm_latency_ms=50)
+    status, body = await _request(app, "POST", "/api/v1/query", {"text": FIRST_QUERY})
+    milestones["first_response_s"] = _age()
+    milestones["first_response_ok"] = status == 200 and json.loads(body).get("result", {}).get("type") == "success"
+
+    shutdown.set()
+    await lifespan
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in milestones.items()}
+
+def _age() -> float:
+    from orchestrator.tracing import process_age
+    return process_age()
+
+async def _request(app, method: str, path: str, payload: dict | None = None):
+    from benchmarks.run import asgi_request
+    return await asgi_request(app, method, path, payload)
+
+async def _start_lifespan(app):
+    """
+    Runs the app's lifespan the way uvicorn does; returns once startup has completed.
+    """
+    startup, shutdown = asyncio.Event(), asyncio.Event()
+    sent_startup = False
+
+    async def receive():
+        nonlocal sent_startup
+        if not sent_startup:
+            sent_startup = True
+            return {"type": "lifespan.startup"}
+        await shutdown.wait()
+        return {"type": "lifespan.shutdown"}
+
+    async def send(message):
+        if message["type"] == "lifespan.startup.complete":
+            startup.set()
+        elif message["type"] == "lifespan.startup.failed":
+            raise RuntimeError(message.get("message"))
+
+    task = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+    await startup.wait()
+    return shutdown, task
+
+def measure_cold_start() -> dict:
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child"],
+                          capture_output=True, text=True, check=True)
+    # The child prints logs too; the report is the last line.
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+# --- Report ---
+def median_of(runs: List[dict], key: str) -> float:
+    return round(statistics.median(run[key] for run in runs), 3)
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup", description="Import time and cold start.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--cold-start-budget-ms", type=float, default=None,
+                        help="budget for process start -> first served query (off by default; machine-specific)")
+    parser.add_argument("--save", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child()))
+        return 0
+
+    imports = [measure_imports() for _ in range(args.runs)]
+    cold = [measure_cold_start() for _ in range(args.runs)]
+    report: Dict[str, dict] = {
+        "import": {"total_ms": median_of(imports, "total_ms"), "heaviest_ms": imports[-1]["heaviest_ms"],
+                   "budget_ms": args.import_budget_ms},
+        "cold_start": {key: median_of(cold, key) for key in ("imported_s", "lifespan_s", "ready_s", "first_response_s")},
+        "runs": {"import": imports, "cold_start": cold},
+    }
+    report["cold_start"]["budget_ms"] = args.cold_start_budget_ms
+
+    print(f"import gateway.main: {report['import']['total_ms']}ms (budget {args.import_budget_ms}ms)")
+    for name, ms in report["import"]["heaviest_ms"].items():
+        print(f"  {name:<28} {ms}ms")
+    c = report["cold_start"]
+    print(f"cold start (s since process start): imported {c['imported_s']} | lifespan {c['lifespan_s']} | "
+          f"ready {c['ready_s']} | first response {c['first_response_s']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.save}")
+
+    failures = []
+    if not all(run["ready"] and run["first_response_ok"] for run in cold):
+        failures.append("a cold-start run never became ready or failed its first query")
+    if report["import"]["total_ms"] > args.import_budget_ms:
+        failures.append(f"import {report['import']['total_ms']}ms > budget {args.import_budget_ms}ms")
+    if args.cold_start_budget_ms is not None and c["first_response_s"] * 1000 > args.cold_start_budget_ms:
+        failures.append(f"first response {c['first_response_s'] * 1000:.0f}ms > budget {args.cold_start_budget_ms}ms")
+    if failures:
+        print("\nOVER BUDGET:\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
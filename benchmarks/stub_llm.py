@@ -0,0 +1,88 @@
+"""
+Stand-in for the Gemini model: same generate_content / generate_content_async surface,
+canned plans and narratives, configurable latency, and usage_metadata so token metrics still flow.
+"""
+import re
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+from typing import Dict
+
+NARRATIVE = (
+    "### Overview\n"
+    "The selected indicators moved within a narrow band over the period. "
+    "**Growth** was uneven, with a dip mid-period followed by a recovery. "
+    "- The leading country kept its advantage throughout.\n"
+    "- The lagging country narrowed the gap in the final years.\n"
+    "### Outlook\nBased on the trend, the indicator is expected to remain stable.\n"
+) * 4
+
+_QUERY_RE = re.compile(r'USER QUERY: "(.*)"')
+_BATCH_RE = re.compile(r'^\s*(\d+)\. (".*")$', re.MULTILINE)  # numbered, JSON-quoted questions
+
+class StubResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        # ~4 characters per token, like the real tokenizer on English text.
+        self.usage_metadata = SimpleNamespace(prompt_token_count=len(prompt) // 4,
+                                              candidates_token_count=len(text) // 4)
+
+class StubStream(StubResponse):
+    """
+    Async-iterable response for stream=True, yielding the text in a few chunks.
+    """
+
+    def __init__(self, text: str, prompt: str, latency: float, chunks: int = 8):
+        super().__init__(text, prompt)
+        size = max(1, len(text) // chunks)
+        self._pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        self._delay = latency / max(1, len(self._pieces))
+
+    async def __aiter__(self):
+        for piece in self._pieces:
+            await asyncio.sleep(self._delay)
+            yield SimpleNamespace(text=piece)
+
+class StubModel:
+    """
+    plans: query text -> plan dict (for questions the rule-based router does not handle).
+    Any other planner prompt is answered with an empty plan (the planner rejects it, as with a real miss).
+    Batch planner prompts get a JSON array with one plan per numbered question.
+    """
+
+    def __init__(self, plans: Dict[str, dict] | None = None, latency: float = 0.0):
+        self.plans = plans or {}
+        self.latency = latency
+
+    def generate_content(self, prompt: str, request_options: dict | None = None, **kwargs) -> StubResponse:
+        if self.latency:
+            # Like the SDK: a call slower than request_options["timeout"] fails after that long.
+            timeout = (request_options or {}).get("timeout")
+            if timeout is not None and timeout < self.latency:
+                time.sleep(timeout)
+                raise TimeoutError(f"Stub Gemini call timed out after {timeout:.2f}s")
+            time.sleep(self.latency)
+        return StubResponse(self._answer(prompt), prompt)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        if stream:
+            return StubStream(self._answer(prompt), prompt, self.latency)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return StubResponse(self._answer(prompt), prompt)
+
+    def _answer(self, prompt: str) -> str:
+        if "USER QUERIES:" in prompt:
+            return json.dumps([{"index": int(index), **self._plan(json.loads(query))}
+                               for index, query in _BATCH_RE.findall(prompt)])
+        match = _QUERY_RE.search(prompt)
+        if match is None:
+            return NARRATIVE
+        return json.dumps(self._plan(match.group(1)))
+
+    def _plan(self, query: str) -> dict:
+        plan = self.plans.get(query)
+        if plan is None:
+            plan = {"target_countries": [], "target_indicators": [], "source": "WORLDBANK", "topic": "unknown"}
+        return plan
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 from data.canonical import IndicatorSeries
 
 class BaseAdapter(ABC):
@@ -6,10 +7,31 @@ class BaseAdapter(ABC):
     The Interface.
     Every adapter MUST implement these methods.
     """
-    
+    # Canonical source name stamped on every IndicatorSeries (e.g. "WORLDBANK").
+    source: str = ""
+    # True when fetch_batch is a real multi-country request rather than the fetch_data loop below.
+    supports_batch: bool = False
+    # True when fetch_all can return every country the source covers in bulk (screening questions).
+    supports_all: bool = False
+
     @abstractmethod
     def fetch_data(self, country_code: str, indicator_code: str, start_year: int, end_year: int) -> IndicatorSeries:
         """
         Fetches data from the source and returns it in OUR Canonical format.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def fetch_batch(self, country_codes: List[str], indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Fetches one indicator for several countries.
+        Returns one series per requested country, in the same order (empty if the source had nothing).
+        The default just loops fetch_data; adapters whose API accepts country lists override it.
+        """
+        return [self.fetch_data(country, indicator_code, start_year, end_year) for country in country_codes]
+
+    def fetch_all(self, indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Fetches one indicator for every country the source covers (countries only, no regional
+        aggregates). Returns only the countries that have data.
+        """
+        raise NotImplementedError(f"{self.source} cannot list every country in bulk.")
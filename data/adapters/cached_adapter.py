@@ -0,0 +1,143 @@
+from array import array
+from typing import Callable, List
+from data.adapters.base_adapter import BaseAdapter
+from data.canonical import IndicatorSeries
+from data.series_cache import SeriesCache
+
+class CachedAdapter(BaseAdapter):
+    """
+    Wraps a real adapter with the local SeriesCache.
+    Serves whatever years are cached and fresh, and only asks the upstream
+    for the missing ones. When the upstream fails (or its breaker is open),
+    expired data still in the cache is served instead of nothing.
+    """
+
+    def __init__(self, adapter: BaseAdapter, cache: SeriesCache, max_age: int | None = None,
+                 on_lookup: Callable[[str], None] | None = None):
+        self.adapter = adapter
+        self.cache = cache
+        self.source = adapter.source
+        self.supports_batch = adapter.supports_batch
+        self.supports_all = adapter.supports_all
+        # Optional stricter freshness than the cache TTL (the prefetch job refreshes ahead of expiry).
+        self.max_age = max_age
+        # Optional metrics hook, called with "hit" / "partial" / "miss" per series lookup.
+        self.on_lookup = on_lookup
+
+    def fetch_data(self, country_code: str, indicator_code: str, start_year: int, end_year: int) -> IndicatorSeries:
+        cached, missing = self.cache.lookup(self.source, country_code, indicator_code, start_year, end_year, self.max_age)
+
+        self._record(cached, missing)
+        if not missing:
+            print(f"[Cache] HIT {self.source} {country_code} - {indicator_code} ({start_year}-{end_year})")
+            return cached
+        print(f"[Cache] {'PARTIAL' if len(cached) else 'MISS'} {self.source} {country_code} - {indicator_code}, fetching {missing}")
+
+        parts = [cached]
+        for range_start, range_end in missing:
+            try:
+                fresh = self.adapter.fetch_data(country_code, indicator_code, range_start, range_end)
+            except Exception as e:
+                # A gap at the edge (e.g. the latest year not published yet) should not
+                # throw away the years we already have.
+                stale = self._stale(country_code, indicator_code, range_start, range_end)
+                if not len(cached) and not len(stale):
+                    raise
+                print(f"[Cache] Could not fill {range_start}-{range_end}: {e}. "
+                      f"Serving {'stale' if len(stale) else 'cached'} years only.")
+                parts.append(stale)
+                continue
+
+            # Empty series are not cached. Failures raise above; empty means the source has no observations
+            # yet (often a year not published), so the next query should ask again rather than wait out the TTL.
+            if len(fresh):
+                self.cache.store(fresh, range_start, range_end)
+            parts.append(fresh)
+
+        return _merge(parts)
+
+    def fetch_batch(self, country_codes: List[str], indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Same idea as fetch_data, for many countries.
+        Countries that are missing the same year ranges share one upstream batch call.
+        """
+        parts = {}
+        groups = {}  # tuple(missing ranges) -> [countries]
+        for country in country_codes:
+            cached, missing = self.cache.lookup(self.source, country, indicator_code, start_year, end_year, self.max_age)
+            parts[country] = [cached]
+            self._record(cached, missing)
+            if missing:
+                groups.setdefault(tuple(missing), []).append(country)
+
+        hits = len(country_codes) - sum(len(group) for group in groups.values())
+        print(f"[Cache] Batch {self.source} {indicator_code}: {hits}/{len(country_codes)} countries fully cached")
+
+        for missing, group in groups.items():
+            for range_start, range_end in missing:
+                try:
+                    fresh_list = self.adapter.fetch_batch(group, indicator_code, range_start, range_end)
+                except Exception as e:
+                    stale = {country: self._stale(country, indicator_code, range_start, range_end) for country in group}
+                    if not any(len(parts[country][0]) or len(stale[country]) for country in group):
+                        raise
+                    print(f"[Cache] Could not fill {range_start}-{range_end} for {group}: {e}. Serving cached/stale years only.")
+                    for country in group:
+                        parts[country].append(stale[country])
+                    continue
+
+                for fresh in fresh_list:
+                    if len(fresh):
+                        self.cache.store(fresh, range_start, range_end)
+                    parts[fresh.country].append(fresh)
+
+        return [_merge(parts[country]) for country in country_codes]
+
+    def fetch_all(self, indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Every country at once: served from the store if a fresh bulk fetch covers the window,
+        otherwise one bulk upstream request whose series are all stored in one transaction.
+        """
+        cached = self.cache.lookup_all(self.source, indicator_code, start_year, end_year, self.max_age)
+        if self.on_lookup is not None:
+            self.on_lookup("hit" if cached is not None else "miss")
+        if cached is not None:
+            print(f"[Cache] HIT {self.source} all countries - {indicator_code} ({start_year}-{end_year})")
+            return cached
+
+        print(f"[Cache] MISS {self.source} all countries - {indicator_code}, fetching {start_year}-{end_year}")
+        try:
+            fresh = self.adapter.fetch_all(indicator_code, start_year, end_year)
+        except Exception as e:
+            stale = self.cache.lookup_all(self.source, indicator_code, start_year, end_year,
+                                          self.cache.stale_age(self.source))
+            if stale is None:
+                raise
+            print(f"[Cache] Could not fetch all countries: {e}. Serving the stale bulk fetch.")
+            return stale
+        if fresh:
+            self.cache.store_many(fresh, start_year, end_year, all_countries=True)
+        return fresh
+
+    def _stale(self, country_code: str, indicator_code: str, start_year: int, end_year: int) -> IndicatorSeries:
+        # Expired but not yet evicted years (SeriesCache.stale_grace); possibly empty.
+        stale, _ = self.cache.lookup(self.source, country_code, indicator_code, start_year, end_year,
+                                     self.cache.stale_age(self.source))
+        return stale
+
+    def _record(self, cached: IndicatorSeries, missing: list):
+        if self.on_lookup is not None:
+            self.on_lookup("miss" if not len(cached) and missing else "partial" if missing else "hit")
+
+def _merge(parts: List[IndicatorSeries]) -> IndicatorSeries:
+    """
+    Concatenates cached and freshly fetched pieces of one series (the constructor re-sorts by year).
+    """
+    if len(parts) == 1:
+        return parts[0]
+    first = parts[0]
+    years, values = array("i"), array("d")
+    for part in parts:
+        years.extend(part.years)
+        values.extend(part.values)
+    return IndicatorSeries.from_arrays(first.indicator, first.country, first.source, years, values)
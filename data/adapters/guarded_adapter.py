@@ -0,0 +1,27 @@
+from typing import List
+from data.adapters.base_adapter import BaseAdapter
+from data.canonical import IndicatorSeries
+from data.resilience import SourceGuard
+
+class GuardedAdapter(BaseAdapter):
+    """
+    Sends a real adapter's calls through its source's SourceGuard (rate limit, concurrency cap,
+    circuit breaker). Sits under CachedAdapter, so only upstream calls are limited: cache hits
+    never wait behind a slow provider, and an open breaker falls back to cached data there.
+    """
+
+    def __init__(self, adapter: BaseAdapter, guard: SourceGuard):
+        self.adapter = adapter
+        self.guard = guard
+        self.source = adapter.source
+        self.supports_batch = adapter.supports_batch
+        self.supports_all = adapter.supports_all
+
+    def fetch_data(self, country_code: str, indicator_code: str, start_year: int, end_year: int) -> IndicatorSeries:
+        return self.guard.call(self.adapter.fetch_data, country_code, indicator_code, start_year, end_year)
+
+    def fetch_batch(self, country_codes: List[str], indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        return self.guard.call(self.adapter.fetch_batch, country_codes, indicator_code, start_year, end_year)
+
+    def fetch_all(self, indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        return self.guard.call(self.adapter.fetch_all, indicator_code, start_year, end_year)
@@ -1,101 +1,151 @@
-import requests
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
 from data.adapters.base_adapter import BaseAdapter
-from data.canonical import IndicatorSeries, TimeSeriesPoint
+from data.http_client import HttpClient, get_shared_client
+from data.canonical import IndicatorSeries
+from data.countries import OECD_MEMBERS
+
+BASE_URL = "https://stats.oecd.org/SDMX-JSON/data"
+
+# Our indicator code -> (dataset, SUBJECT member, key dimensions after SUBJECT).
+# The full key is LOCATION.SUBJECT.<rest>, e.g. STLABOUR/USA.HUR.TOT.GT.A.
+# Indicators of the same dataset can share one request: USA+FRA.SUBJ_A+SUBJ_B.<rest>.
+OECD_SERIES = {
+    # Short-Term Labour Statistics: harmonised unemployment rate, total, all ages, annual
+    "HUR": ("STLABOUR", "HUR", "TOT.GT.A"),
+    # Main Economic Indicators, hourly earnings: manufacturing, index (2015=100), annual
+    "EARNINGS": ("EAR_MEI", "LCEAMN01", "IXOB.A"),
+}
+
+# Dimension ids the OECD uses for country and subject (older datasets say LOCATION, newer REF_AREA).
+COUNTRY_DIMS = ("LOCATION", "REF_AREA", "COU", "COUNTRY")
+SUBJECT_DIMS = ("SUBJECT", "INDICATOR", "MEASURE")
 
 class OECDAdapter(BaseAdapter):
+    source = "OECD"
+    supports_batch = True
+    supports_all = True
+
+    def __init__(self, client: HttpClient | None = None):
+        self.client = client or get_shared_client()
+
     def fetch_data(self, country_code: str, indicator_code: str, start_year: int, end_year: int) -> IndicatorSeries:
-        print(f"[OECDAdapter] Fetching {indicator_code} for {country_code}...")
-        
-        # OECD uses different country codes? Usually ISO3 is fine, but sometimes specific.
-        # We will assume ISO3 for now.
-        
-        # API URL Construction (Simplified for 'HUR' - Unemployment)
-        # Structure: https://stats.oecd.org/SDMX-JSON/data/<DATASET>/<COUNTRY>.<INDICATOR>...
-        
-        if indicator_code == "HUR":
-            # STLABOUR = Short-Term Labour Statistics
-            # LREM64TT = Employment Rate? No, let's use the specific endpoint logic.
-            # For simplicity in this learning project, we target the "Harmonised Unemployment" dataset.
-            dataset = "STLABOUR"
-            # Dimension: Country.Indicator.Sex.Age.Frequency
-            # AUS.HUR.L.A = Australia, Harmonized Unemployment, Total, All Ages, Annual
-            dimension = f"{country_code}.HUR.TOT.GT.A" 
-            
-            url = f"https://stats.oecd.org/SDMX-JSON/data/{dataset}/{dimension}/all?startTime={start_year}&endTime={end_year}&dimensionAtObservation=allDimensions"
-        
-        else:
-            raise NotImplementedError(f"OECD Indicator {indicator_code} not fully implemented in adapter yet.")
-
-        try:
-            response = requests.get(url, timeout=15)
+        return self.fetch_many([country_code], [indicator_code], start_year, end_year)[(country_code, indicator_code)]
+
+    def fetch_batch(self, country_codes: List[str], indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        One request for every country: LOCATION is an OR list (USA+FRA+DEU).
+        """
+        fetched = self.fetch_many(country_codes, [indicator_code], start_year, end_year)
+        return [fetched[(country, indicator_code)] for country in country_codes]
+
+    def fetch_all(self, indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Every OECD member in one request.
+        """
+        fetched = self.fetch_many(OECD_MEMBERS, [indicator_code], start_year, end_year)
+        return [series for series in fetched.values() if len(series)]
+
+    def fetch_many(self, country_codes: List[str], indicator_codes: List[str],
+                   start_year: int, end_year: int) -> Dict[Tuple[str, str], IndicatorSeries]:
+        """
+        Every (country, indicator) pair, with one request per OECD dataset involved.
+        Pairs the OECD has no observations for come back as empty series.
+        """
+        unknown = [code for code in indicator_codes if code not in OECD_SERIES]
+        if unknown:
+            raise NotImplementedError(f"OECD indicator(s) {unknown} not supported by the adapter.")
+
+        # Group the requested indicators by dataset (one key per dataset).
+        by_dataset: Dict[Tuple[str, str], Dict[str, str]] = {}
+        for code in indicator_codes:
+            dataset, subject, rest = OECD_SERIES[code]
+            by_dataset.setdefault((dataset, rest), {})[subject] = code
+
+        results = {
+            (country, code): IndicatorSeries(indicator=code, country=country, source=self.source)
+            for country in country_codes for code in indicator_codes
+        }
+        for (dataset, rest), subjects in by_dataset.items():
+            key = f"{'+'.join(country_codes)}.{'+'.join(subjects)}.{rest}"
+            url = (f"{BASE_URL}/{dataset}/{key}/all"
+                   f"?startTime={start_year}&endTime={end_year}&dimensionAtObservation=allDimensions")
+            print(f"[OECDAdapter] Fetching {dataset}/{key} ({start_year}-{end_year})")
+
+            # Transport errors and 5xx (after retries) propagate, so the fetcher logs them
+            # as failures and the cache never stores them as "no data".
+            # OECD answers 404 "NoRecordsFound" when the series simply have no observations.
+            response = self.client.get(url, timeout=15)
+            if response.status_code == 404:
+                print(f"[OECDAdapter] No records for {key}")
+                continue
             response.raise_for_status()
-            data_json = response.json()
-
-            # OECD SDMX-JSON parsing is complex.
-            # The values are usually in dataStructure -> observations
-            
-            # 1. Parse DataPoints
-            observations = data_json.get('dataSets', [{}])[0].get('observations', {})
-            
-            points = []
-            # Observations keys are like "0:0:0:0:0"
-            # We need to map the 'Time' dimension index to the actual Year.
-            
-            structure = data_json.get('structure', {})
-            dimensions = structure.get('dimensions', {}).get('observation', [])
-            
-            # Find the 'Time' dimension
-            time_dim = next((d for d in dimensions if d['id'] == 'TIME_PERIOD'), None)
-            if not time_dim:
-                raise ValueError("Could not find Time dimension in OECD response")
-                
-            time_values = [int(v['id']) for v in time_dim['values']]
-            
-            # Map values
-            for key, val_obj in observations.items():
-                # key might be "0:0:0:0:0". The last digit usually corresponds to Time if we ordered it right.
-                # Actually, in "dimensionAtObservation=allDimensions", the key is the index string.
-                # Let's try a robust flattened read.
-                
-                # IMPORTANT: OECD format varies. For this specific URL, let's debug-parse:
-                # The key is likely just the index of the time period if other dims are fixed.
-                # But to be safe, we iterate carefully.
-                
-                # Simplified approach for "STLABOUR":
-                # The 'key' string's bits map to dimension indices.
-                indices = [int(x) for x in key.split(':')]
-                
-                # We need to know which index position is "Time".
-                # In our request "{country}.HUR.TOT.GT.A", Time is usually the last dimension or separate.
-                # In SDMX-JSON, time is often an observation dimension.
-                
-                # HACK for Learning Project: 
-                # If we get data, we just assume the order matches our requested years.
-                # A production parser uses the 'structure' block to map strictly.
-                
-                # Let's assume the order is sequential years starting from start_year
-                val = val_obj[0]
-                
-                # Find the year index (usually the last number in the key)
-                time_idx = indices[-1] 
-                if time_idx < len(time_values):
-                    year = time_values[time_idx]
-                    points.append(TimeSeriesPoint(year=year, value=float(val)))
-
-            return IndicatorSeries(
-                indicator=indicator_code,
-                country=country_code,
-                source="OECD",
-                data=sorted(points, key=lambda x: x.year)
-            )
-
-        except Exception as e:
-            print(f"[OECD Adapter Error] Failed to fetch/parse: {e}")
-            # Now this returns an empty list, which is ALLOWED by our new Stage 1 contract.
-            # The Analyst Agent will receive this and report "No Data" gracefully.
-            return IndicatorSeries(
-                indicator=indicator_code, 
-                country=country_code, 
-                source="OECD", 
-                data=[]
-            )
\ No newline at end of file
+
+            decoded = decode_sdmx_json(response.json(), [COUNTRY_DIMS, SUBJECT_DIMS])
+            for (country, subject), (years, values) in decoded.items():
+                code = subjects.get(subject)
+                if (country, code) in results:
+                    in_range = (years >= start_year) & (years <= end_year)
+                    results[(country, code)] = IndicatorSeries.from_arrays(
+                        code, country, self.source, years[in_range], values[in_range]
+                    )
+        return results
+
+def decode_sdmx_json(payload: dict, series_dims: Sequence[Sequence[str]]) -> Dict[Tuple[str, ...], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Decodes an SDMX-JSON message (dimensionAtObservation=allDimensions) into series.
+
+    series_dims: for each dimension that identifies a series, the ids it may go by
+    (e.g. ("LOCATION", "REF_AREA")). Returns {(member id, ...): (years int32[], values float64[])},
+    years ascending, missing values dropped.
+
+    The structure block is read once: each dimension's position in the observation key and
+    its index -> member-id table. All observation keys are then split and converted in
+    a single pass and grouped into series with array operations.
+    """
+    observations = (payload.get("dataSets") or [{}])[0].get("observations") or {}
+    dims = payload.get("structure", {}).get("dimensions", {}).get("observation", [])
+    if not observations or not dims:
+        return {}
+
+    # 1. Lookup tables, once per response
+    dim_ids = [d["id"] for d in dims]
+    time_pos = next((i for i, d in enumerate(dims) if d["id"] in ("TIME_PERIOD", "TIME") or d.get("role") == "time"), None)
+    if time_pos is None:
+        raise ValueError("SDMX-JSON response has no time dimension")
+    # "2019", "2019-Q1" and "2019-01" all start with the year.
+    time_lookup = np.array([int(v["id"][:4]) for v in dims[time_pos]["values"]], dtype=np.int32)
+
+    positions = []
+    for aliases in series_dims:
+        pos = next((dim_ids.index(a) for a in aliases if a in dim_ids), None)
+        if pos is None:
+            raise ValueError(f"SDMX-JSON response has none of the dimensions {list(aliases)}")
+        positions.append(pos)
+    member_lookup = [[v["id"] for v in dims[pos]["values"]] for pos in positions]
+
+    # 2. Bulk decode: one split over all keys, one float conversion over all values
+    n_obs, n_dims = len(observations), len(dims)
+    index = np.array(":".join(observations.keys()).split(":"), dtype=np.int32).reshape(n_obs, n_dims)
+    values = np.array([obs[0] if obs else None for obs in observations.values()], dtype=np.float64)
+
+    keep = ~np.isnan(values)
+    if not keep.any():
+        return {}
+    index, values = index[keep], values[keep]
+    years = time_lookup[index[:, time_pos]]
+
+    # 3. Group into series: one integer id per combination of series-dimension members
+    sizes = [len(lookup) for lookup in member_lookup]
+    series_id = np.ravel_multi_index(tuple(index[:, pos] for pos in positions), sizes)
+    order = np.lexsort((years, series_id))
+    series_id, years, values = series_id[order], years[order], values[order]
+    starts = np.flatnonzero(np.r_[True, series_id[1:] != series_id[:-1]])
+    ends = np.r_[starts[1:], len(series_id)]
+
+    decoded = {}
+    for start, end in zip(starts, ends):
+        members = np.unravel_index(series_id[start], sizes)
+        name = tuple(lookup[int(m)] for lookup, m in zip(member_lookup, members))
+        decoded[name] = (years[start:end], values[start:end])
+    return decoded
@@ -1,8 +1,18 @@
-import requests
+from array import array
+from typing import List, Tuple
 from data.adapters.base_adapter import BaseAdapter
-from data.canonical import IndicatorSeries, TimeSeriesPoint
+from data.http_client import HttpClient, get_shared_client
+from data.canonical import IndicatorSeries
+from data.countries import WORLDBANK_AGGREGATES
 
 class WorldBankAdapter(BaseAdapter):
+    source = "WORLDBANK"
+    supports_batch = True
+    supports_all = True
+
+    def __init__(self, client: HttpClient | None = None):
+        self.client = client or get_shared_client()
+
     def fetch_data(self, country_code: str, indicator_code: str, start_year: int, end_year: int) -> IndicatorSeries:
         # 1. Construct the URL (World Bank specific logic)
         # Format: http://api.worldbank.org/v2/country/{country}/indicator/{ind}?format=json&date={start}:{end}
@@ -16,7 +26,7 @@ class WorldBankAdapter(BaseAdapter):
         print(f"[WorldBankAdapter] Fetching: {url} with params {params}")
         
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = self.client.get(url, params=params, timeout=10)
             response.raise_for_status() # Raise error if 404/500
             
             raw_data = response.json()
@@ -30,30 +40,110 @@ class WorldBankAdapter(BaseAdapter):
             wb_records = raw_data[1]
             
             # 2. TRANSFORM (The Critical Step)
-            # Convert their "messy" dict to our "clean" TimeSeriesPoint
-            points = []
-            for record in wb_records:
-                val = record.get("value")
-                year = record.get("date")
-                
-                # Only keep valid numbers
-                if val is not None and year is not None:
-                    points.append(TimeSeriesPoint(
-                        year=int(year),
-                        value=float(val)
-                    ))
-            
-            # Sort by year (ascending)
-            points.sort(key=lambda x: x.year)
+            # Convert their "messy" dicts to our "clean" year/value columns
+            years, values = self._parse_records(wb_records)
             
             # 3. Return Canonical Object
-            return IndicatorSeries(
+            return IndicatorSeries.from_arrays(
                 indicator=indicator_code,
                 country=country_code,
                 source="WORLDBANK",
-                data=points
+                years=years,
+                values=values
             )
             
         except Exception as e:
             print(f"[WorldBankAdapter] Error: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def fetch_batch(self, country_codes: List[str], indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        One paginated request for all countries.
+        The v2 API accepts a semicolon-separated list: /country/IND;CHN;BRA/indicator/...
+        """
+        if len(country_codes) == 1:
+            return [self.fetch_data(country_codes[0], indicator_code, start_year, end_year)]
+
+        url = f"http://api.worldbank.org/v2/country/{';'.join(country_codes)}/indicator/{indicator_code}"
+        params = {
+            "format": "json",
+            "date": f"{start_year}:{end_year}",
+            "per_page": 1000,
+            "page": 1
+        }
+
+        print(f"[WorldBankAdapter] Batch fetching: {url} with params {params}")
+
+        try:
+            # 1. Walk every page (countries x years can exceed a single page)
+            wb_records = self._fetch_pages(url, params)
+            if not wb_records:
+                raise ValueError(f"No data found for {country_codes} - {indicator_code}")
+
+            # 2. Split the combined record list back into one series per country
+            by_country = {code: [] for code in country_codes}
+            for record in wb_records:
+                code = record.get("countryiso3code")
+                if code in by_country:
+                    by_country[code].append(record)
+
+            return [
+                IndicatorSeries.from_arrays(indicator_code, code, "WORLDBANK", *self._parse_records(records))
+                for code, records in by_country.items()
+            ]
+
+        except Exception as e:
+            print(f"[WorldBankAdapter] Batch Error: {e}")
+            raise e
+
+    def fetch_all(self, indicator_code: str, start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Every country in one paginated request: /country/all/indicator/...
+        Regional and income aggregates (WLD, EUU, HIC, ...) are dropped.
+        """
+        url = f"http://api.worldbank.org/v2/country/all/indicator/{indicator_code}"
+        # ~265 economies x a few years: one or two pages.
+        params = {"format": "json", "date": f"{start_year}:{end_year}", "per_page": 20000, "page": 1}
+        print(f"[WorldBankAdapter] Fetching all countries: {url} with params {params}")
+
+        try:
+            by_country = {}
+            for record in self._fetch_pages(url, params):
+                code = record.get("countryiso3code")
+                if code and code not in WORLDBANK_AGGREGATES:
+                    by_country.setdefault(code, []).append(record)
+        except Exception as e:
+            print(f"[WorldBankAdapter] Bulk Error: {e}")
+            raise e
+
+        series_list = [
+            IndicatorSeries.from_arrays(indicator_code, code, "WORLDBANK", *self._parse_records(records))
+            for code, records in by_country.items()
+        ]
+        return [series for series in series_list if len(series)]
+
+    def _fetch_pages(self, url: str, params: dict) -> list:
+        records = []
+        while True:
+            response = self.client.get(url, params=params, timeout=10)
+            response.raise_for_status()
+            raw_data = response.json()
+
+            if len(raw_data) < 2 or not raw_data[1]:
+                break
+            records.extend(raw_data[1])
+
+            if params["page"] >= int(raw_data[0].get("pages", 1)):
+                break
+            params["page"] += 1
+        return records
+
+    @staticmethod
+    def _parse_records(wb_records: list) -> Tuple[array, array]:
+        # Only keep valid numbers
+        valid = [(int(r["date"]), float(r["value"])) for r in wb_records
+                 if r.get("value") is not None and r.get("date") is not None]
+        
+        # Sort by year (ascending). World Bank lists newest first.
+        valid.sort()
+        return array("i", (y for y, _ in valid)), array("d", (v for _, v in valid))
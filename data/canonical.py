@@ -1,5 +1,7 @@
-from pydantic import BaseModel, field_validator
-from typing import List, Literal
+import math
+from array import array
+from typing import Iterable, List, Literal, Optional
+from pydantic import BaseModel
 
 # 1. ENUMS / CONSTANTS
 # We lock our naming conventions here. We don't want someone typing
@@ -10,24 +12,120 @@ class TimeSeriesPoint(BaseModel):
     """
     Represents a single data point in time.
     We strictly enforce yearly granularity (int) and float values.
+    Kept for the compatibility view (IndicatorSeries.data); series are stored as arrays.
     """
     year: int
     value: float
 
-class IndicatorSeries(BaseModel):
+class IndicatorSeries:
     """
     The Master Data Object.
     Once data enters our system, it MUST look like this.
+
+    Stored column-wise: `years` is an array('i'), `values` an array('d'), same length,
+    sorted by year. A 60-year series is two flat buffers instead of 60 Pydantic objects.
+    - to_numpy() / to_arrow() wrap those buffers without copying.
+    - `.data` still returns a list of TimeSeriesPoint for older callers (built on demand).
     """
-    indicator: str   # e.g., "UNEMPLOYMENT_RATE"
-    country: str     # e.g., "USA", "IND" (ISO 3-letter codes preferred)
-    source: str      # e.g., "WORLDBANK" or "OECD"
-    data: List[TimeSeriesPoint]
-
-    # # OPTIONAL LEARNING: Validation logic
-    # # This ensures we never get an empty dataset silently.
-    # @field_validator('data')
-    # def data_must_not_be_empty(cls, v):
-    #     if not v:
-    #         raise ValueError('IndicatorSeries must contain at least one data point')
-    #     return v
\ No newline at end of file
+    __slots__ = ("indicator", "country", "source", "years", "values")
+
+    def __init__(self, indicator: str, country: str, source: str,
+                 data: Optional[Iterable[TimeSeriesPoint]] = None,
+                 years: Optional[Iterable[int]] = None, values: Optional[Iterable[float]] = None):
+        self.indicator = indicator   # e.g., "UNEMPLOYMENT_RATE"
+        self.country = country       # e.g., "USA", "IND" (ISO 3-letter codes preferred)
+        self.source = source         # e.g., "WORLDBANK" or "OECD"
+
+        if data is not None:
+            points = list(data)
+            years = [pt.year for pt in points]
+            values = [pt.value for pt in points]
+
+        # array() does the type checking in bulk (TypeError on a non-int year / non-number value).
+        self.years = _as_array("i", years)
+        self.values = _as_array("d", values)
+        self._validate()
+
+    @classmethod
+    def from_arrays(cls, indicator: str, country: str, source: str,
+                    years: Iterable[int], values: Iterable[float]) -> "IndicatorSeries":
+        return cls(indicator, country, source, years=years, values=values)
+
+    def _validate(self):
+        """
+        Bulk checks once per series (instead of once per point).
+        """
+        if not isinstance(self.indicator, str) or not isinstance(self.country, str) or not isinstance(self.source, str):
+            raise TypeError("IndicatorSeries indicator/country/source must be strings")
+        if len(self.years) != len(self.values):
+            raise ValueError(f"IndicatorSeries {self.country}-{self.indicator}: {len(self.years)} years but {len(self.values)} values")
+
+        # Keep the sorted-by-year invariant; adapters usually deliver sorted data, so this is the cheap path.
+        years = self.years
+        if any(years[i] > years[i + 1] for i in range(len(years) - 1)):
+            order = sorted(range(len(years)), key=years.__getitem__)
+            self.years = array("i", (years[i] for i in order))
+            self.values = array("d", (self.values[i] for i in order))
+
+    # --- Zero-copy views ---
+    def to_numpy(self):
+        """
+        (years int32[], values float64[]) sharing memory with this series.
+        """
+        import numpy as np
+        return (np.frombuffer(self.years, dtype=np.dtype(f"i{self.years.itemsize}")),
+                np.frombuffer(self.values, dtype=np.float64))
+
+    def to_arrow(self):
+        """
+        pyarrow Table(year, value) over the same buffers. Needs the optional pyarrow package.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("IndicatorSeries.to_arrow() requires pyarrow (pip install pyarrow)")
+        n = len(self.years)
+        year_type = pa.int32() if self.years.itemsize == 4 else pa.int64()
+        return pa.Table.from_arrays(
+            [pa.Array.from_buffers(year_type, n, [None, pa.py_buffer(self.years)]),
+             pa.Array.from_buffers(pa.float64(), n, [None, pa.py_buffer(self.values)])],
+            names=["year", "value"]
+        )
+
+    # --- Compatibility with the old Pydantic model ---
+    @property
+    def data(self) -> List[TimeSeriesPoint]:
+        return [TimeSeriesPoint(year=y, value=v) for y, v in zip(self.years, self.values)]
+
+    def model_dump(self) -> dict:
+        return {
+            "indicator": self.indicator,
+            "country": self.country,
+            "source": self.source,
+            # NaN is not valid JSON
+            "data": [{"year": y, "value": None if math.isnan(v) else v} for y, v in zip(self.years, self.values)],
+        }
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, IndicatorSeries):
+            return NotImplemented
+        return (self.indicator, self.country, self.source, self.years, self.values) == \
+               (other.indicator, other.country, other.source, other.years, other.values)
+
+    def __repr__(self) -> str:
+        return f"IndicatorSeries(indicator={self.indicator!r}, country={self.country!r}, source={self.source!r}, points={len(self)})"
+
+def _as_array(typecode: str, seq) -> array:
+    if isinstance(seq, array) and seq.typecode == typecode:
+        return seq
+    if seq is None:
+        return array(typecode)
+    if hasattr(seq, "dtype"):
+        # NumPy input: one memcpy instead of boxing every element.
+        out = array(typecode)
+        out.frombytes(seq.astype(f"{'i' if typecode == 'i' else 'f'}{out.itemsize}", copy=False).tobytes())
+        return out
+    return array(typecode, seq)
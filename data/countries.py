@@ -0,0 +1,102 @@
+# COUNTRY REFERENCE DATA
+# One place that knows how people name countries and which ISO 3-letter code they mean.
+
+# ISO3 -> common English names / aliases (lowercase).
+COUNTRY_NAMES = {
+    "ARG": ["argentina"],
+    "AUS": ["australia"],
+    "AUT": ["austria"],
+    "BEL": ["belgium"],
+    "BGD": ["bangladesh"],
+    "BRA": ["brazil"],
+    "CAN": ["canada"],
+    "CHE": ["switzerland"],
+    "CHL": ["chile"],
+    "CHN": ["china", "prc", "people's republic of china"],
+    "COL": ["colombia"],
+    "CRI": ["costa rica"],
+    "CZE": ["czechia", "czech republic"],
+    "DEU": ["germany"],
+    "DNK": ["denmark"],
+    "EGY": ["egypt"],
+    "ESP": ["spain"],
+    "EST": ["estonia"],
+    "ETH": ["ethiopia"],
+    "FIN": ["finland"],
+    "FRA": ["france"],
+    "GBR": ["united kingdom", "great britain", "britain", "england"],
+    "GRC": ["greece"],
+    "HUN": ["hungary"],
+    "IDN": ["indonesia"],
+    "IND": ["india"],
+    "IRL": ["ireland"],
+    "IRN": ["iran"],
+    "ISL": ["iceland"],
+    "ISR": ["israel"],
+    "ITA": ["italy"],
+    "JPN": ["japan"],
+    "KEN": ["kenya"],
+    "KOR": ["south korea", "republic of korea"],
+    "LTU": ["lithuania"],
+    "LUX": ["luxembourg"],
+    "LVA": ["latvia"],
+    "MEX": ["mexico"],
+    "MYS": ["malaysia"],
+    "NGA": ["nigeria"],
+    "NLD": ["netherlands", "holland"],
+    "NOR": ["norway"],
+    "NZL": ["new zealand"],
+    "PAK": ["pakistan"],
+    "PER": ["peru"],
+    "PHL": ["philippines"],
+    "POL": ["poland"],
+    "PRT": ["portugal"],
+    "RUS": ["russia", "russian federation"],
+    "SAU": ["saudi arabia"],
+    "SGP": ["singapore"],
+    "SVK": ["slovakia", "slovak republic"],
+    "SVN": ["slovenia"],
+    "SWE": ["sweden"],
+    "THA": ["thailand"],
+    "TUR": ["turkey", "turkiye"],
+    "UKR": ["ukraine"],
+    "USA": ["united states", "united states of america"],
+    "VNM": ["vietnam", "viet nam"],
+    "ZAF": ["south africa"],
+}
+
+# The 38 OECD members (the only countries the OECD datasets cover).
+OECD_MEMBERS = [
+    "AUS", "AUT", "BEL", "CAN", "CHE", "CHL", "COL", "CRI", "CZE", "DEU", "DNK", "ESP", "EST",
+    "FIN", "FRA", "GBR", "GRC", "HUN", "IRL", "ISL", "ISR", "ITA", "JPN", "KOR", "LTU", "LUX",
+    "LVA", "MEX", "NLD", "NOR", "NZL", "POL", "PRT", "SVK", "SVN", "SWE", "TUR", "USA",
+]
+
+# Abbreviations only count when written in capitals ("US inflation", not "show us").
+# Same for raw ISO codes: "CAN" is Canada, "can" is a verb.
+UPPERCASE_ALIASES = {
+    **{code: code for code in COUNTRY_NAMES},
+    "US": "USA",
+    "UK": "GBR",
+}
+
+# No bare "america" or "korea": "Latin America" is not the USA, "North Korea" not South Korea.
+# Lowercase name -> ISO3
+NAME_ALIASES = {name: code for code, names in COUNTRY_NAMES.items() for name in names}
+
+# Groups a screening question can name ("which OECD members ...", "top 3 of the G7 ...").
+COUNTRY_GROUPS = {
+    "oecd": OECD_MEMBERS,
+    "g7": ["CAN", "DEU", "FRA", "GBR", "ITA", "JPN", "USA"],
+    "g20": ["ARG", "AUS", "BRA", "CAN", "CHN", "DEU", "FRA", "GBR", "IDN", "IND",
+            "ITA", "JPN", "KOR", "MEX", "RUS", "SAU", "TUR", "USA", "ZAF"],
+}
+
+# World Bank "country/all" also returns regional and income aggregates (World, Euro area,
+# High income, ...). They carry ISO-like codes, so they are filtered out by code.
+WORLDBANK_AGGREGATES = frozenset({
+    "AFE", "AFW", "ARB", "CEB", "CSS", "EAP", "EAR", "EAS", "ECA", "ECS", "EMU", "EUU",
+    "FCS", "HIC", "HPC", "IBD", "IBT", "IDA", "IDB", "IDX", "INX", "LAC", "LCN", "LDC",
+    "LIC", "LMC", "LMY", "LTE", "MEA", "MIC", "MNA", "NAC", "OED", "OSS", "PRE", "PSS",
+    "PST", "SAS", "SSA", "SSF", "SST", "TEA", "TEC", "TLA", "TMN", "TSA", "TSS", "UMC", "WLD",
+})
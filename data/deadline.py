@@ -0,0 +1,170 @@
+import os
+import math
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, List, TypeVar
+
+# DEADLINE SETTINGS
+# Time budget of one query (planning, fetches, analysis and narrative together), in seconds.
+# Clients can ask for their own with the X-Request-Timeout header, up to REQUEST_DEADLINE_MAX.
+# 0 disables the default deadline.
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+REQUEST_DEADLINE_MAX = float(os.getenv("REQUEST_DEADLINE_MAX_SECONDS", "120"))
+
+T = TypeVar("T")
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The request's time budget ran out before this step could finish.
+    """
+
+class Deadline:
+    """
+    When one request has to be answered by (time.monotonic()), and what was left out to make it.
+    A child from reserve() expires earlier but reports what it leaves out to its root.
+    """
+
+    def __init__(self, seconds: float, root: "Deadline | None" = None):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.root = root or self
+        self._omitted: List[str] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def extend(self, other: "Deadline | None"):
+        """
+        Pushes expiry out to `other`'s, if that is later (None: no deadline, so never).
+        """
+        with self._lock:
+            self.expires_at = max(self.expires_at, other.expires_at if other is not None else math.inf)
+
+    def mark_partial(self, what: str):
+        root = self.root
+        with root._lock:
+            if what not in root._omitted:
+                root._omitted.append(what)
+
+    @property
+    def omitted(self) -> List[str]:
+        with self.root._lock:
+            return list(self.root._omitted)
+
+_current: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar("deadline", default=None)
+
+def current() -> Deadline | None:
+    """
+    The deadline of the request being served, if any. Work handed to a pool through
+    tracing.bind (or contextvars.copy_context) sees the caller's.
+    """
+    return _current.get()
+
+def remaining() -> float | None:
+    """
+    Seconds left, or None without a deadline. For timeouts: min(timeout, remaining()).
+    """
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+def expired() -> bool:
+    deadline = _current.get()
+    return deadline is not None and deadline.expired()
+
+def check(what: str):
+    """
+    Raises DeadlineExceeded if the budget is already spent, before starting `what`.
+    """
+    if expired():
+        raise DeadlineExceeded(f"Deadline reached before {what}")
+
+def mark_partial(what: str):
+    """
+    Records that `what` was left out of the answer to meet the deadline.
+    """
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.mark_partial(what)
+
+def omitted() -> List[str]:
+    deadline = _current.get()
+    return deadline.omitted if deadline is not None else []
+
+def shared() -> Deadline:
+    """
+    A deadline for work done on behalf of several requests: the current one's for now;
+    extend() it with each request that joins, so the work runs until the last of them gives up.
+    """
+    deadline = Deadline(0.0)
+    deadline.extend(_current.get())
+    return deadline
+
+def call_with(deadline: Deadline | None, fn: Callable[..., T], *args) -> T:
+    """
+    fn(*args) with `deadline` as the current deadline.
+    """
+    token = _current.set(deadline)
+    try:
+        return fn(*args)
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def scope(seconds: float | None = None) -> Iterator[Deadline | None]:
+    """
+    Starts a deadline `seconds` from now for everything inside. Without seconds, an enclosing
+    deadline is kept (nested entry points share the request's), else REQUEST_DEADLINE applies.
+    0 or less means no deadline.
+    """
+    deadline = _current.get()
+    if seconds is None and deadline is not None:
+        yield deadline
+        return
+    if seconds is None:
+        seconds = REQUEST_DEADLINE
+    token = _current.set(Deadline(seconds) if seconds > 0 else None)
+    try:
+        yield _current.get()
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # async generator closed from another context; that context dies with it
+
+@contextmanager
+def reserve(seconds: float) -> Iterator[Deadline | None]:
+    """
+    Everything inside has to finish `seconds` before the current deadline,
+    to leave that much for the stages after it. No-op without a deadline.
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    token = _current.set(Deadline(max(0.0, parent.remaining() - seconds), root=parent.root))
+    try:
+        yield _current.get()
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass
+
+async def wait_for(aw: Awaitable[T], what: str) -> T:
+    """
+    Awaits `aw` within the current deadline. Once it passes, `aw` is cancelled and
+    DeadlineExceeded raised.
+    """
+    try:
+        return await asyncio.wait_for(aw, remaining())
+    except asyncio.TimeoutError as e:
+        if isinstance(e, DeadlineExceeded) or not expired():
+            raise  # a timeout of aw's own
+        raise DeadlineExceeded(f"Deadline reached during {what}") from e
@@ -0,0 +1,180 @@
+import os
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from data import deadline
+from data.deadline import DeadlineExceeded
+
+# HTTP SETTINGS
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))   # seconds
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))       # seconds
+
+# Throttling and transient server errors are worth another try. 4xx client errors are not.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class HttpClient:
+    """
+    Shared HTTP client for the data adapters.
+    - One keep-alive requests.Session per host, so TCP/TLS handshakes are reused.
+    - Retries 429/5xx and connection errors with jittered exponential backoff,
+      honouring the server's Retry-After header when it sends one.
+    - Never outlives the request's deadline: timeouts are capped by what is left of it,
+      and no retry is started that could not finish in time.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX):
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "failures": 0, "deadline_exceeded": 0}
+        self._listeners: List[Callable[[str, int | str, float, int], None]] = []
+
+    def add_listener(self, listener: Callable[[str, int | str, float, int], None]):
+        """
+        Called after every attempt with (host, status, seconds, response bytes).
+        status is the exception name when no response arrived. Used for metrics.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def get(self, url: str, params: dict | None = None, timeout: float = 10) -> requests.Response:
+        """
+        GET with retries. Returns the final response; callers still call raise_for_status().
+        Raises DeadlineExceeded when the request's deadline passes first.
+        """
+        session = self._session_for(url)
+        attempt = 0
+        while True:
+            budget = self._budget(url)
+            self._count("requests")
+            started = time.perf_counter()
+            try:
+                response = session.get(url, params=params, timeout=timeout if budget is None else min(timeout, budget))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._notify(url, type(e).__name__, time.perf_counter() - started, 0)
+                if deadline.expired():
+                    self._count("deadline_exceeded")
+                    raise DeadlineExceeded(f"Deadline reached waiting for {urlsplit(url).netloc}") from e
+                delay = self._backoff(attempt)
+                if attempt >= self.max_retries or not self._can_wait(delay):
+                    self._count("failures")
+                    raise
+                print(f"[HttpClient] {type(e).__name__} on {url}, retry {attempt + 1} in {delay:.2f}s")
+            else:
+                self._notify(url, response.status_code, time.perf_counter() - started, len(response.content))
+                delay = None
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self._retry_after(response)
+                    if delay is None:
+                        delay = self._backoff(attempt)
+                if delay is None or not self._can_wait(delay):
+                    if response.status_code >= 400:
+                        self._count("failures")
+                    return response
+                print(f"[HttpClient] HTTP {response.status_code} on {url}, retry {attempt + 1} in {delay:.2f}s")
+                response.close()
+
+            self._count("retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self) -> dict:
+        """
+        Counters plus per-host pool numbers. 'reused' > 0 means keep-alive is doing its job.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            sessions = dict(self._sessions)
+
+        hosts = {}
+        for host, session in sessions.items():
+            pool_manager = session.get_adapter(f"https://{host}").poolmanager
+            opened = served = 0
+            for key in pool_manager.pools.keys():
+                pool = pool_manager.pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    served += pool.num_requests
+            hosts[host] = {"connections_opened": opened, "requests": served, "reused": max(served - opened, 0)}
+
+        stats["hosts"] = hosts
+        stats["connections_reused"] = sum(h["reused"] for h in hosts.values())
+        return stats
+
+    def _session_for(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled above (so we can count them), not by urllib3.
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _budget(self, url: str) -> float | None:
+        """
+        Seconds the next attempt may take under the request's deadline (None: no deadline).
+        """
+        budget = deadline.remaining()
+        if budget is not None and budget <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded(f"Deadline reached before calling {urlsplit(url).netloc}")
+        return budget
+
+    def _can_wait(self, delay: float) -> bool:
+        # A retry that only starts after the deadline is pointless; give up with what we have.
+        budget = deadline.remaining()
+        return budget is None or delay < budget
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a random delay up to the exponential cap, so retries don't arrive in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response: requests.Response) -> float | None:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            # HTTP-date form
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.backoff_max)
+
+    def _notify(self, url: str, status: int | str, seconds: float, nbytes: int):
+        for listener in self._listeners:
+            try:
+                listener(urlsplit(url).netloc, status, seconds, nbytes)
+            except Exception as e:
+                print(f"[HttpClient] Listener failed: {e}")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+_shared_client = HttpClient()
+
+def get_shared_client() -> HttpClient:
+    """
+    The process-wide client. Every adapter uses it unless given its own.
+    """
+    return _shared_client
@@ -0,0 +1,14 @@
+# INDICATOR CATALOG
+# Every indicator code the system can plan for, and the source that serves it.
+# Mirrors the metric menu in the PlannerAgent prompt.
+INDICATOR_SOURCES = {
+    "NY.GDP.MKTP.KD.ZG": "WORLDBANK",   # GDP Growth (%)
+    "FP.CPI.TOTL.ZG": "WORLDBANK",      # Inflation (%)
+    "SP.POP.TOTL": "WORLDBANK",         # Population
+    "EN.ATM.CO2E.KT": "WORLDBANK",      # CO2 Emissions
+    "HUR": "OECD",                      # Unemployment Rate (%)
+    "EARNINGS": "OECD",                 # Hourly Earnings
+}
+
+def indicators_for(source: str) -> list:
+    return [code for code, src in INDICATOR_SOURCES.items() if src == source]
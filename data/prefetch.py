@@ -0,0 +1,155 @@
+"""
+Bulk warm-up of the local series cache.
+
+Downloads the full indicator x country matrix for World Bank and OECD into the
+SeriesCache, so the request path is served from local data without network calls.
+
+    python -m data.prefetch                         # everything, planner window
+    python -m data.prefetch --sources WORLDBANK --start 2000 --end 2023
+    python -m data.prefetch --max-age-hours 72      # refresh anything older than 3 days
+
+Resumable and incremental: every batch is committed to the cache as soon as it lands,
+and anything already cached and fresher than --max-age-hours is skipped. An interrupted
+run simply picks up where it stopped.
+
+DuckDB lets only one process write the cache file. While the gateway is running, use
+its in-process schedule instead (PREFETCH_INTERVAL_HOURS, see start_background_prefetch).
+"""
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+import duckdb
+from data.countries import COUNTRY_NAMES, OECD_MEMBERS
+from data.indicators import indicators_for
+from data.series_cache import SeriesCache, DEFAULT_TTLS
+from data.http_client import HttpClient, get_shared_client
+from data.adapters.worldbank_adapter import WorldBankAdapter
+from data.adapters.oecd_adapter import OECDAdapter
+from data.sources import SourceRegistry
+
+# PREFETCH SETTINGS
+# Planner window (orchestrator.schemas.DEFAULT_YEARS).
+DEFAULT_START_YEAR = 2018
+DEFAULT_END_YEAR = 2022
+# Countries per batch request (keeps the URL short).
+BATCH_SIZE = 50
+# Kept below the request path's caps so a warm-up never starves live queries.
+PREFETCH_MAX_IN_FLIGHT = {"WORLDBANK": 4, "OECD": 1}
+
+SOURCE_COUNTRIES = {
+    "WORLDBANK": sorted(COUNTRY_NAMES),
+    "OECD": OECD_MEMBERS,
+}
+
+class Prefetcher:
+    def __init__(self, cache: SeriesCache, client: HttpClient | None = None, workers: int = 4,
+                 max_age: int | None = None, batch_size: int = BATCH_SIZE):
+        client = client or get_shared_client()
+        # max_age: refresh entries older than this even if the cache TTL still calls them fresh,
+        # so scheduled runs renew data before the request path ever sees it expire.
+        # Same source guards as the request path: in-process runs share its rate limits and breakers.
+        self.sources = SourceRegistry()
+        for upstream in (WorldBankAdapter(client), OECDAdapter(client)):
+            self.sources.register(upstream, cache, max_age=max_age)
+        self.adapters = {source.name: source.adapter for source in self.sources}
+        self.workers = workers
+        self.batch_size = batch_size
+        self.limits = {source: threading.BoundedSemaphore(n) for source, n in PREFETCH_MAX_IN_FLIGHT.items()}
+
+    def run(self, sources: List[str], start_year: int, end_year: int) -> Dict[str, int]:
+        """
+        Fetches every (indicator, country chunk) task with bounded concurrency.
+        Returns counters: tasks, failed_tasks, unsupported, series (with data), empty (no data upstream).
+        """
+        tasks = []
+        for source in sources:
+            adapter = self.adapters[source]
+            # Batch-capable sources take many countries per call; others go one country at a time.
+            size = self.batch_size if adapter.supports_batch else 1
+            countries = SOURCE_COUNTRIES[source]
+            for indicator in indicators_for(source):
+                for i in range(0, len(countries), size):
+                    tasks.append((source, indicator, countries[i:i + size]))
+
+        summary = {"tasks": len(tasks), "failed_tasks": 0, "unsupported": 0, "series": 0, "empty": 0}
+        lock = threading.Lock()
+        print(f"[Prefetch] {len(tasks)} tasks for {sources}, years {start_year}-{end_year}")
+
+        def work(source: str, indicator: str, countries: List[str]):
+            try:
+                with self.limits[source]:
+                    series_list = self.adapters[source].fetch_batch(countries, indicator, start_year, end_year)
+            except NotImplementedError:
+                # Listed indicator the adapter cannot fetch yet.
+                with lock:
+                    summary["unsupported"] += 1
+                return
+            except Exception as e:
+                print(f"[Prefetch] FAILED {source} {indicator} {countries[0]}..{countries[-1]}: {e}")
+                with lock:
+                    summary["failed_tasks"] += 1
+                return
+            with lock:
+                for series in series_list:
+                    summary["series" if len(series) else "empty"] += 1
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch") as pool:
+            for task in tasks:
+                pool.submit(work, *task)
+
+        print(f"[Prefetch] Done: {summary}")
+        return summary
+
+def start_background_prefetch(cache: SeriesCache, interval_hours: float,
+                              sources: List[str] | None = None) -> threading.Thread:
+    """
+    Runs the prefetch inside the gateway process every `interval_hours`, against the
+    gateway's own cache connection. Entries are refreshed once older than one interval,
+    so with an interval shorter than the cache TTL the request path never hits a cold series.
+    """
+    sources = sources or list(SOURCE_COUNTRIES)
+    max_age = int(interval_hours * 3600)
+    prefetcher = Prefetcher(cache, max_age=max_age)
+
+    def loop():
+        while True:
+            try:
+                prefetcher.run(sources, DEFAULT_START_YEAR, DEFAULT_END_YEAR)
+            except Exception as e:
+                print(f"[Prefetch] Background run failed: {e}")
+            time.sleep(max_age)
+
+    thread = threading.Thread(target=loop, name="prefetch-scheduler", daemon=True)
+    thread.start()
+    return thread
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m data.prefetch", description="Warm the local series cache.")
+    parser.add_argument("--sources", nargs="+", default=list(SOURCE_COUNTRIES), choices=list(SOURCE_COUNTRIES))
+    parser.add_argument("--start", type=int, default=DEFAULT_START_YEAR)
+    parser.add_argument("--end", type=int, default=DEFAULT_END_YEAR)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent upstream requests (all sources)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="countries per batch request")
+    parser.add_argument("--max-age-hours", type=float, default=None,
+                        help="refetch entries older than this (default: the cache TTL per source)")
+    args = parser.parse_args(argv)
+
+    try:
+        cache = SeriesCache()
+    except duckdb.IOException as e:
+        print(f"[Prefetch] Cannot open the series cache ({e}).\n"
+              f"Is the gateway running? Stop it, or set PREFETCH_INTERVAL_HOURS to prefetch in-process.")
+        return 1
+
+    max_age = int(args.max_age_hours * 3600) if args.max_age_hours is not None else None
+    print(f"[Prefetch] Cache: {cache.path} | TTLs: {max_age or DEFAULT_TTLS}")
+    summary = Prefetcher(cache, workers=args.workers, max_age=max_age, batch_size=args.batch_size).run(
+        args.sources, args.start, args.end
+    )
+    return 1 if summary["failed_tasks"] == summary["tasks"] and summary["tasks"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict
+import requests
+from data import deadline
+from data.deadline import DeadlineExceeded
+
+# UPSTREAM GUARD SETTINGS
+# Per source: request rate (token bucket; 0 = unlimited), burst, and concurrent upstream calls.
+# OECD's public API allows roughly 20 requests a minute per client.
+SOURCE_LIMITS = {
+    "WORLDBANK": {
+        "rate": float(os.getenv("WORLDBANK_RATE_PER_SEC", "20")),
+        "burst": int(os.getenv("WORLDBANK_BURST", "40")),
+        "max_in_flight": int(os.getenv("WORLDBANK_MAX_IN_FLIGHT", "6")),
+    },
+    "OECD": {
+        "rate": float(os.getenv("OECD_RATE_PER_SEC", "0.33")),
+        "burst": int(os.getenv("OECD_BURST", "10")),
+        "max_in_flight": int(os.getenv("OECD_MAX_IN_FLIGHT", "2")),
+    },
+}
+FALLBACK_LIMITS = {"rate": 0.0, "burst": 1, "max_in_flight": 4}
+# Longest a call waits for a concurrency slot or a token before giving up (fail fast, not queue).
+MAX_WAIT = float(os.getenv("SOURCE_MAX_WAIT", "5"))
+# The breaker opens after this many consecutive failures (a call slower than SLOW_CALL counts as one),
+# then lets a single probe through after COOLDOWN seconds.
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+BREAKER_SLOW_CALL = float(os.getenv("BREAKER_SLOW_CALL", "8"))
+# Hedging: an upstream call still running after this percentile of the source's recent call
+# times gets a duplicate (if the source has a free slot and token); the first answer wins.
+# Off by default (0): every hedge is an extra request against the provider's quota.
+HEDGE_PERCENTILE = float(os.getenv("SOURCE_HEDGE_PERCENTILE", "0"))
+HEDGE_MIN_SAMPLES = int(os.getenv("SOURCE_HEDGE_MIN_SAMPLES", "20"))
+
+class SourceUnavailable(Exception):
+    """
+    Raised without calling the upstream: breaker open, or no slot/token within MAX_WAIT
+    (or before the request's deadline).
+    """
+
+class TokenBucket:
+    """
+    `rate` tokens per second, holding at most `burst`. rate <= 0 means unlimited.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        """
+        Takes one token, waiting up to `timeout` seconds for it. False if it would take longer.
+        """
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens if self.rate > 0 else float(self.burst)
+
+    def _refill(self) -> float:
+        # Caller holds the lock.
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+class CircuitBreaker:
+    """
+    closed: calls go through. open: calls are refused until `cooldown` has passed.
+    half_open: one probe goes through; its success closes the breaker, its failure reopens it.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self.state = self.HALF_OPEN
+                print(f"[Breaker] {self.name} half-open: probing the upstream")
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"[Breaker] {self.name} closed: upstream healthy again")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    print(f"[Breaker] {self.name} OPEN after {self.consecutive_failures} failures; "
+                          f"failing fast for {self.cooldown:.0f}s")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """
+        The allowed call never reached the upstream (no slot or token): let another probe try.
+        """
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at)) if self.state == self.OPEN else 0.0
+            return {"state": self.state, "consecutive_failures": self.consecutive_failures,
+                    "trips": self.trips, "retry_in_s": round(retry_in, 1)}
+
+def is_upstream_failure(e: Exception) -> bool:
+    """
+    Transport errors, throttling and 5xx count against the breaker. "No data" answers
+    (ValueError, 404s) and unsupported indicators do not: the upstream responded fine.
+    """
+    if isinstance(e, requests.HTTPError):
+        status = e.response.status_code if e.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(e, requests.RequestException)
+
+class SourceGuard:
+    """
+    Everything between the fetch layer and one upstream: rate limit, concurrency cap,
+    circuit breaker and (optionally) hedging. One per source per process (see get_guard),
+    shared by every adapter that calls that upstream, the background prefetch included.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_in_flight: int, max_wait: float = MAX_WAIT,
+                 slow_call: float = BREAKER_SLOW_CALL, breaker: CircuitBreaker | None = None,
+                 hedge_percentile: float = HEDGE_PERCENTILE):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_wait = max_wait
+        self.slow_call = slow_call
+        self.hedge_percentile = hedge_percentile
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker(name)
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=200)  # seconds, successful calls only
+        self._hedge_pool = None
+        self._counters = {"calls": 0, "failures": 0, "slow_calls": 0, "short_circuited": 0, "rejected": 0,
+                          "deadline_exceeded": 0, "hedged": 0, "hedges_won": 0}
+
+    def call(self, fn: Callable, *args):
+        """
+        fn(*args) against the upstream, or SourceUnavailable straight away when the breaker is open
+        (or after max_wait without a slot/token; never waiting past the request's deadline).
+        """
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise SourceUnavailable(f"{self.name} is unavailable (circuit open, retry in "
+                                    f"{self.breaker.stats()['retry_in_s']}s)")
+
+        budget = deadline.remaining()
+        max_wait = self.max_wait if budget is None else min(self.max_wait, budget)
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=max_wait):
+            self._refuse(f"{self.name} is at its {self.max_in_flight} concurrent requests")
+        if not self.bucket.acquire(max(0.0, started + max_wait - time.monotonic())):
+            self._slots.release()
+            self._refuse(f"{self.name} rate limit reached")
+        # The slot is released by _run once the upstream call returns.
+        return self._timed_call(fn, *args)
+
+    def _refuse(self, reason: str):
+        self.breaker.release()
+        if deadline.expired():
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded(f"Deadline reached waiting for {self.name}")
+        self._count("rejected")
+        raise SourceUnavailable(reason)
+
+    def _timed_call(self, fn: Callable, *args):
+        started = time.monotonic()
+        hedge_after = self.hedge_after()
+        try:
+            result = self._run(fn, *args) if hedge_after is None else self._hedged(hedge_after, fn, *args)
+        except DeadlineExceeded:
+            # Our budget ran out, not necessarily the upstream's patience: no verdict for the breaker.
+            self._count("deadline_exceeded")
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if is_upstream_failure(e):
+                self._count("failures")
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        elapsed = time.monotonic() - started
+        if elapsed > self.slow_call:
+            # Answers this slow hold slots and drag the p99 of every query; treat them as failures.
+            self._count("slow_calls")
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        with self._lock:
+            self._latencies.append(elapsed)
+        return result
+
+    def _run(self, fn: Callable, *args):
+        # One upstream call, holding one slot (acquired by the caller) until it returns.
+        with self._lock:
+            self._in_flight += 1
+            self._counters["calls"] += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def hedge_after(self) -> float | None:
+        """
+        Seconds after which a call gets a duplicate: the hedge percentile of recent call times.
+        None when hedging is off or there are too few samples yet.
+        """
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))]
+
+    def _hedged(self, hedge_after: float, fn: Callable, *args):
+        """
+        Runs fn on the hedge pool; if it has not answered after hedge_after seconds and the source has
+        a free slot and token right now, starts a duplicate. Returns the first success (or the last error).
+        The slower call is not interrupted; it finishes in the background and frees its slot then.
+        """
+        with self._lock:
+            if self._hedge_pool is None:
+                # Every call on the pool holds a slot, so max_in_flight threads never queue.
+                self._hedge_pool = ThreadPoolExecutor(self.max_in_flight, thread_name_prefix=f"hedge-{self.name.lower()}")
+        pending = {self._hedge_pool.submit(contextvars.copy_context().run, self._run, fn, *args)}
+        backup = None
+        done, _ = wait(pending, timeout=hedge_after)
+        if not done and self._slots.acquire(blocking=False):
+            if self.bucket.acquire(0):
+                self._count("hedged")
+                backup = self._hedge_pool.submit(contextvars.copy_context().run, self._run, fn, *args)
+                pending.add(backup)
+            else:
+                self._slots.release()
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedges_won")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = self._in_flight
+        hedge_after = self.hedge_after()
+        stats.update(max_in_flight=self.max_in_flight, rate_per_s=self.bucket.rate,
+                     tokens=round(self.bucket.available(), 2), breaker=self.breaker.stats(),
+                     hedge_after_ms=round(hedge_after * 1000, 1) if hedge_after is not None else None)
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+_guards: Dict[str, SourceGuard] = {}
+_guards_lock = threading.Lock()
+
+def get_guard(source: str) -> SourceGuard:
+    """
+    The process-wide guard for a source, built from SOURCE_LIMITS on first use.
+    """
+    with _guards_lock:
+        guard = _guards.get(source)
+        if guard is None:
+            guard = _guards[source] = SourceGuard(source, **SOURCE_LIMITS.get(source, FALLBACK_LIMITS))
+        return guard
@@ -0,0 +1,278 @@
+import os
+import time
+import threading
+from typing import Dict, List, Tuple
+import duckdb
+from data.canonical import IndicatorSeries
+from data.store import SHARED_STORE_PATH, is_sqlite_path, connect_sqlite
+
+# CACHE SETTINGS
+# Annual indicators barely move, so the TTLs are long. OECD publishes monthly, so it gets a shorter one.
+# DuckDB by default (one process). A .sqlite path switches to SQLite, which several
+# gateway workers can share; multi-worker deployments get the shared store automatically.
+CACHE_PATH = os.getenv("SERIES_CACHE_PATH") or SHARED_STORE_PATH or os.path.join("data", "cache", "series.duckdb")
+DEFAULT_TTLS = {
+    "WORLDBANK": int(os.getenv("SERIES_CACHE_TTL_WORLDBANK", str(7 * 24 * 3600))),
+    "OECD": int(os.getenv("SERIES_CACHE_TTL_OECD", str(24 * 3600))),
+}
+FALLBACK_TTL = 24 * 3600
+# Expired data is kept this much longer, to be served while an upstream is down (see CachedAdapter).
+STALE_GRACE = int(os.getenv("SERIES_CACHE_STALE_GRACE", str(7 * 24 * 3600)))
+# Pseudo-country of the coverage row that marks "every country of the source was fetched".
+ALL_COUNTRIES = "*"
+MAX_ROWS = int(os.getenv("SERIES_CACHE_MAX_ROWS", "500000"))
+
+YearRange = Tuple[int, int]
+
+class SeriesCache:
+    """
+    Local DuckDB store for fetched series.
+    - series_points: one row per (source, country, indicator, year).
+    - series_coverage: one row per fetched year range, so we know which years
+      were actually asked for (a year can be covered and still have no value).
+    Same tables and queries on SQLite (for .sqlite/.db paths), which is safe across processes.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttls: Dict[str, int] | None = None, max_rows: int = MAX_ROWS,
+                 stale_grace: int = STALE_GRACE):
+        self.path = path
+        self.ttls = ttls or DEFAULT_TTLS
+        self.max_rows = max_rows
+        self.stale_grace = stale_grace
+
+        # One connection per process. DuckDB connections are not safe to share
+        # across threads without serialising, and the fetcher runs a thread pool.
+        # (Across processes, SQLite's own file lock serialises the writers.)
+        self._lock = threading.Lock()
+        self.sqlite = is_sqlite_path(path)
+        if self.sqlite:
+            self._conn = connect_sqlite(path)
+            # Take the write lock when the transaction starts, not halfway through it.
+            self._begin = "BEGIN IMMEDIATE"
+        else:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = duckdb.connect(path)
+            self._begin = "BEGIN TRANSACTION"
+            # DuckDB imports pandas (~0.5s) on the first parameterised query. Pay that here
+            # (the gateway builds its agents off the request path), not on the first lookup.
+            self._conn.execute("SELECT ?", [0])
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS series_points (
+                source VARCHAR, country VARCHAR, indicator VARCHAR,
+                year INTEGER, value DOUBLE,
+                PRIMARY KEY (source, country, indicator, year)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS series_coverage (
+                source VARCHAR, country VARCHAR, indicator VARCHAR,
+                start_year INTEGER, end_year INTEGER,
+                fetched_at DOUBLE, last_used DOUBLE,
+                PRIMARY KEY (source, country, indicator, start_year, end_year)
+            )
+        """)
+
+    def ttl_for(self, source: str) -> int:
+        return self.ttls.get(source, FALLBACK_TTL)
+
+    def stale_age(self, source: str) -> int:
+        """
+        max_age that also accepts expired data still within the grace period.
+        """
+        return self.ttl_for(source) + self.stale_grace
+
+    def lookup(self, source: str, country: str, indicator: str, start_year: int, end_year: int,
+               max_age: int | None = None) -> Tuple[IndicatorSeries, List[YearRange]]:
+        """
+        Returns (cached part of the series, missing year ranges) for the requested window.
+        Only coverage younger than the source TTL (or max_age, if stricter callers pass one) counts as a hit.
+        """
+        now = time.time()
+        fresh_after = now - (max_age if max_age is not None else self.ttl_for(source))
+        key = [source, country, indicator]
+
+        with self._lock:
+            ranges = self._conn.execute("""
+                SELECT start_year, end_year FROM series_coverage
+                WHERE source = ? AND country = ? AND indicator = ?
+                  AND fetched_at >= ? AND end_year >= ? AND start_year <= ?
+            """, key + [fresh_after, start_year, end_year]).fetchall()
+
+            if not ranges:
+                return IndicatorSeries(indicator, country, source), [(start_year, end_year)]
+
+            self._conn.execute("""
+                UPDATE series_coverage SET last_used = ?
+                WHERE source = ? AND country = ? AND indicator = ?
+                  AND fetched_at >= ? AND end_year >= ? AND start_year <= ?
+            """, [now] + key + [fresh_after, start_year, end_year])
+
+            rows = self._conn.execute("""
+                SELECT year, value FROM series_points
+                WHERE source = ? AND country = ? AND indicator = ? AND year BETWEEN ? AND ?
+                ORDER BY year
+            """, key + [start_year, end_year]).fetchall()
+
+        covered = set()
+        for lo, hi in ranges:
+            covered.update(range(max(lo, start_year), min(hi, end_year) + 1))
+
+        rows = [row for row in rows if row[0] in covered]
+        series = IndicatorSeries.from_arrays(
+            indicator, country, source,
+            years=[year for year, _ in rows], values=[value for _, value in rows]
+        )
+        missing_years = [y for y in range(start_year, end_year + 1) if y not in covered]
+        return series, _to_ranges(missing_years)
+
+    def lookup_all(self, source: str, indicator: str, start_year: int, end_year: int,
+                   max_age: int | None = None) -> List[IndicatorSeries] | None:
+        """
+        Every country's series for the window, if a bulk fetch (store_many(..., all_countries=True))
+        covering it is still fresh; None otherwise. Countries without data are left out.
+        """
+        now = time.time()
+        fresh_after = now - (max_age if max_age is not None else self.ttl_for(source))
+
+        with self._lock:
+            covered = self._conn.execute("""
+                SELECT count(*) FROM series_coverage
+                WHERE source = ? AND country = ? AND indicator = ?
+                  AND fetched_at >= ? AND start_year <= ? AND end_year >= ?
+            """, [source, ALL_COUNTRIES, indicator, fresh_after, start_year, end_year]).fetchone()[0]
+            if not covered:
+                return None
+
+            # Keep the per-country ranges as recently used as the marker, so LRU eviction
+            # does not thin out a universe that is still being served.
+            self._conn.execute("""
+                UPDATE series_coverage SET last_used = ?
+                WHERE source = ? AND indicator = ? AND start_year <= ? AND end_year >= ?
+            """, [now, source, indicator, start_year, end_year])
+
+            rows = self._conn.execute("""
+                SELECT country, year, value FROM series_points
+                WHERE source = ? AND indicator = ? AND year BETWEEN ? AND ?
+                ORDER BY country, year
+            """, [source, indicator, start_year, end_year]).fetchall()
+
+        by_country: Dict[str, Tuple[list, list]] = {}
+        for country, year, value in rows:
+            years, values = by_country.setdefault(country, ([], []))
+            years.append(year)
+            values.append(value)
+        return [IndicatorSeries.from_arrays(indicator, country, source, years, values)
+                for country, (years, values) in by_country.items()]
+
+    def store(self, series: IndicatorSeries, start_year: int, end_year: int):
+        """
+        Records a fetched year range and its points, then enforces the size budget.
+        """
+        self.store_many([series], start_year, end_year)
+
+    def store_many(self, series_list: List[IndicatorSeries], start_year: int, end_year: int,
+                   all_countries: bool = False):
+        """
+        store() for many series in one transaction. all_countries=True records that the list is
+        every country the source has for this indicator (a bulk fetch), which lookup_all relies on.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(self._begin)
+            try:
+                for series in series_list:
+                    key = [series.source, series.country, series.indicator]
+                    # Refetched years replace whatever was there before (values do get revised).
+                    self._conn.execute("""
+                        DELETE FROM series_points
+                        WHERE source = ? AND country = ? AND indicator = ? AND year BETWEEN ? AND ?
+                    """, key + [start_year, end_year])
+                    if len(series):
+                        self._conn.executemany(
+                            "INSERT INTO series_points VALUES (?, ?, ?, ?, ?)",
+                            [key + [year, value] for year, value in zip(series.years, series.values)]
+                        )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO series_coverage VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        key + [start_year, end_year, now, now]
+                    )
+                if all_countries and series_list:
+                    first = series_list[0]
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO series_coverage VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [first.source, ALL_COUNTRIES, first.indicator, start_year, end_year, now, now]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self._evict(now)
+
+    def _evict(self, now: float):
+        """
+        Size-based eviction (caller holds the lock).
+        1. Coverage past its TTL and the stale grace period goes first.
+        2. If still over budget, drop least-recently-used ranges until we fit.
+        """
+        expired = 0
+        for source, ttl in self.ttls.items():
+            expired += self._deleted(self._conn.execute(
+                "DELETE FROM series_coverage WHERE source = ? AND fetched_at < ?", [source, now - ttl - self.stale_grace]
+            ))
+        if expired:
+            self._drop_orphans()
+
+        total = self._conn.execute("SELECT count(*) FROM series_points").fetchone()[0]
+        while total > self.max_rows:
+            ranges = self._conn.execute("SELECT count(*) FROM series_coverage").fetchone()[0]
+            victims = self._conn.execute("""
+                SELECT source, country, indicator, start_year, end_year FROM series_coverage
+                ORDER BY last_used LIMIT ?
+            """, [max(1, ranges // 10)]).fetchall()
+            if not victims:
+                break
+            self._conn.executemany("""
+                DELETE FROM series_coverage
+                WHERE source = ? AND country = ? AND indicator = ? AND start_year = ? AND end_year = ?
+            """, [list(v) for v in victims])
+            # A bulk fetch's members share one last_used, so a batch can take some of them and leave
+            # the ALL_COUNTRIES marker behind. Drop the marker with them: lookup_all would serve a partial universe.
+            markers = [[source, ALL_COUNTRIES, indicator, hi, lo]
+                       for source, country, indicator, lo, hi in victims if country != ALL_COUNTRIES]
+            if markers:
+                self._conn.executemany("""
+                    DELETE FROM series_coverage
+                    WHERE source = ? AND country = ? AND indicator = ? AND start_year <= ? AND end_year >= ?
+                """, markers)
+            self._drop_orphans()
+            total = self._conn.execute("SELECT count(*) FROM series_points").fetchone()[0]
+
+    def _drop_orphans(self):
+        # Points that no remaining coverage range vouches for.
+        self._conn.execute("""
+            DELETE FROM series_points WHERE NOT EXISTS (
+                SELECT 1 FROM series_coverage c
+                WHERE c.source = series_points.source AND c.country = series_points.country
+                  AND c.indicator = series_points.indicator
+                  AND series_points.year BETWEEN c.start_year AND c.end_year
+            )
+        """)
+
+    def _deleted(self, cursor) -> int:
+        # DuckDB returns the count as a row; sqlite3 exposes it as rowcount.
+        return cursor.rowcount if self.sqlite else cursor.fetchone()[0]
+
+def _to_ranges(years: List[int]) -> List[YearRange]:
+    """
+    [2018, 2019, 2021] -> [(2018, 2019), (2021, 2021)]
+    """
+    ranges = []
+    for year in years:
+        if ranges and year == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], year)
+        else:
+            ranges.append((year, year))
+    return ranges
@@ -0,0 +1,51 @@
+from typing import Callable, Dict, Iterator, List
+from data.adapters.base_adapter import BaseAdapter
+from data.adapters.cached_adapter import CachedAdapter
+from data.adapters.guarded_adapter import GuardedAdapter
+from data.resilience import SourceGuard, get_guard
+from data.series_cache import SeriesCache
+
+class Source:
+    """
+    One registered upstream.
+    - adapter:  what the fetch layer calls (local cache -> guard -> upstream adapter).
+    - upstream: the real adapter (HTTP client, parsing).
+    - guard:    its rate limit, concurrency cap and circuit breaker.
+    """
+
+    def __init__(self, name: str, adapter: BaseAdapter, upstream: BaseAdapter, guard: SourceGuard):
+        self.name = name
+        self.adapter = adapter
+        self.upstream = upstream
+        self.guard = guard
+
+class SourceRegistry:
+    """
+    Source name (plan.source) -> Source. Adding a provider means registering its adapter,
+    not another branch in the fetcher.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, Source] = {}
+
+    def register(self, upstream: BaseAdapter, cache: SeriesCache, max_age: int | None = None,
+                 on_lookup: Callable[[str], None] | None = None) -> Source:
+        guard = get_guard(upstream.source)
+        adapter = CachedAdapter(GuardedAdapter(upstream, guard), cache, max_age=max_age, on_lookup=on_lookup)
+        source = self._sources[upstream.source] = Source(upstream.source, adapter, upstream, guard)
+        return source
+
+    def get(self, name: str) -> Source | None:
+        return self._sources.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._sources)
+
+    def __iter__(self) -> Iterator[Source]:
+        return iter(list(self._sources.values()))
+
+    def stats(self) -> dict:
+        """
+        Live guard state per source: breaker state, in-flight calls, tokens left, counters.
+        """
+        return {source.name: source.guard.stats() for source in self}
@@ -0,0 +1,46 @@
+# SHARED STORE
+# With several gateway workers (uvicorn/gunicorn WEB_CONCURRENCY > 1) every cache must live
+# in one file all worker processes can read and write. SQLite in WAL mode does that:
+# readers never block, writers take the file lock in turn (waiting up to BUSY_TIMEOUT).
+import os
+import sqlite3
+
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+SHARED_STORE_PATH = os.getenv("SHARED_STORE_PATH") or (
+    os.path.join("data", "cache", "shared.sqlite") if WORKERS > 1 else None
+)
+BUSY_TIMEOUT = float(os.getenv("SHARED_STORE_BUSY_TIMEOUT", "30"))  # seconds
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+def is_sqlite_path(path: str) -> bool:
+    return path.endswith(SQLITE_SUFFIXES)
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """
+    Autocommit connection (callers open their own transactions) safe to share across
+    threads behind a lock, and across processes through SQLite's file locking.
+    """
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def acquire_leader_lock(name: str, directory: str = os.path.join("data", "cache")):
+    """
+    Non-blocking exclusive lock on <directory>/<name>.lock, for jobs only one worker
+    should run (e.g. the background prefetch). Returns the open lock file, which must
+    stay referenced for as long as the lock is held, or None if another process has it.
+    The OS drops the lock when the holder exits, so a crashed worker never wedges it.
+    """
+    import fcntl
+    os.makedirs(directory, exist_ok=True)
+    handle = open(os.path.join(directory, f"{name}.lock"), "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
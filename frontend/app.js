@@ -1,9 +1,14 @@
 const API_URL = "http://127.0.0.1:8000/api/v1/query";
+const STREAM_URL = `${API_URL}/stream`;
 
 // Global Chart Instances (to destroy them before re-rendering)
 let lineChartInstance = null;
 let barChartInstance = null;
 
+// Answers already shown, by question text: { etag, source, analysis, narrative }.
+// Asking again sends the ETag, and the backend replies 304 while the answer is unchanged.
+const answers = new Map();
+
 async function submitQuery() {
     const query = document.getElementById('queryInput').value;
     if (!query) return;
@@ -12,61 +17,73 @@ async function submitQuery() {
     document.getElementById('results').classList.add('hidden');
     document.getElementById('error').classList.add('hidden');
     document.getElementById('loading').classList.remove('hidden');
+    document.getElementById('narrativeText').innerHTML = "";
     
     // Interactive Loading Text
     const statusText = document.getElementById('status-text');
     statusText.innerText = "Planner Agent: Dispatching Analysis Tasks...";
 
     try {
-        // --- 2. SEND REQUEST ---
-        const response = await fetch(API_URL, {
+        // --- 2a. SEEN BEFORE? REVALIDATE INSTEAD OF RE-DOWNLOADING ---
+        if (answers.has(query) && await revalidate(query)) return;
+
+        // --- 2. SEND REQUEST (streamed: one JSON event per line) ---
+        const response = await fetch(STREAM_URL, {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({ text: query })
         });
+        if (!response.ok) {
+            throw new Error(`Backend responded with HTTP ${response.status}`);
+        }
 
-        const data = await response.json();
+        // --- 3. CONSUME EVENTS AS THEY ARRIVE ---
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let narrative = "";
+        let seriesCount = 0;
+        let answer = null;
 
-        // Handle explicit backend errors
-        if (data.status === "error" || (data.result && data.result.type === "error")) {
-            throw new Error(data.result.message || "Unknown error from backend.");
-        }
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
 
-        // --- 3. EXTRACT DATA ---
-        // Structure: response -> result -> data -> analysis
-        const result = data.result.data; 
-        const analysis = result.analysis; 
-
-        // --- 4. RENDER METRICS (The Analytics Grid) ---
-        // A. Average
-        document.getElementById('valAvg').innerText = analysis.average ?? "N/A";
-        
-        // B. Net Change (The Fix: No hardcoded %, adds '+' for positive)
-        let growthVal = analysis.growth_rate ?? 0;
-        let growthSign = growthVal > 0 ? "+" : ""; 
-        document.getElementById('valGrowth').innerText = `${growthSign}${growthVal}`;
-        
-        // C. Min/Max
-        document.getElementById('valMin').innerText = analysis.min_value ?? "N/A";
-        document.getElementById('valMax').innerText = analysis.max_value ?? "N/A";
-
-        // --- 5. RENDER CITATION BADGE ---
-        const datasetLabel = analysis.chart_data && analysis.chart_data.datasets.length > 0 
-                             ? analysis.chart_data.datasets[0].label 
-                             : "Data";
-        document.getElementById('sourceBadge').innerText = `${result.source} [${datasetLabel}]`;
-
-        // --- 6. RENDER NARRATIVE ---
-        // Uses Marked.js to turn Markdown (##, **) into HTML
-        document.getElementById('narrativeText').innerHTML = marked.parse(result.narrative);
-
-        // --- 7. RENDER DUAL CHARTS ---
-        renderLineChart(analysis.chart_data);
-        renderBarChart(analysis.summary_chart_data);
-
-        // --- 8. REVEAL UI ---
-        document.getElementById('loading').classList.add('hidden');
-        document.getElementById('results').classList.remove('hidden');
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split("\n");
+            buffer = lines.pop(); // Keep the incomplete tail for the next chunk
+
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const event = JSON.parse(line);
+
+                if (event.type === "error") {
+                    throw new Error(event.message || "Unknown error from backend.");
+                } else if (event.type === "plan") {
+                    statusText.innerText = `Fetcher Agent: Retrieving ${event.data.target_indicators.length} indicator(s) for ${event.data.target_countries.join(", ")}...`;
+                } else if (event.type === "data") {
+                    seriesCount += 1;
+                    statusText.innerText = `Fetcher Agent: ${seriesCount} series received (${event.data.country})...`;
+                } else if (event.type === "analysis") {
+                    // Charts and metrics are ready: show them before the narrative exists
+                    answer = { source: event.data.source, analysis: event.data.analysis };
+                    renderAnalysis(event.data.source, event.data.analysis);
+                    document.getElementById('narrativeText').innerHTML = "<em>Narrator Agent: Writing summary...</em>";
+                } else if (event.type === "narrative") {
+                    narrative += event.data;
+                    document.getElementById('narrativeText').innerHTML = marked.parse(narrative);
+                } else if (event.type === "done") {
+                    // Cut short by the request deadline: say what is missing (partial answers are never cached)
+                    if (event.partial) {
+                        document.getElementById('narrativeText').innerHTML = marked.parse(narrative) +
+                            `<p><em>Partial answer: ${event.omitted.join(", ")} did not make the time limit.</em></p>`;
+                    }
+                    if (event.etag && answer) {
+                        answers.set(query, { ...answer, narrative, etag: event.etag });
+                    }
+                }
+            }
+        }
 
     } catch (err) {
         document.getElementById('loading').classList.add('hidden');
@@ -77,6 +94,63 @@ async function submitQuery() {
     }
 }
 
+// Conditional POST /query with the stored ETag. Returns false if the caller should stream instead.
+async function revalidate(query) {
+    const known = answers.get(query);
+    const response = await fetch(API_URL, {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "If-None-Match": known.etag },
+        body: JSON.stringify({ text: query })
+    });
+    if (response.status === 304) {
+        showAnswer(known);
+        return true;
+    }
+    const payload = response.ok ? await response.json() : null;
+    if (!payload || !payload.result || payload.result.type !== "success") {
+        answers.delete(query);
+        return false;
+    }
+    const answer = { ...payload.result.data, etag: response.headers.get("ETag") };
+    if (answer.etag) answers.set(query, answer); else answers.delete(query);
+    showAnswer(answer);
+    return true;
+}
+
+function showAnswer(answer) {
+    renderAnalysis(answer.source, answer.analysis);
+    document.getElementById('narrativeText').innerHTML = marked.parse(answer.narrative || "");
+}
+
+function renderAnalysis(source, analysis) {
+    // --- 4. RENDER METRICS (The Analytics Grid) ---
+    // A. Average
+    document.getElementById('valAvg').innerText = analysis.average ?? "N/A";
+    
+    // B. Net Change (The Fix: No hardcoded %, adds '+' for positive)
+    let growthVal = analysis.growth_rate ?? 0;
+    let growthSign = growthVal > 0 ? "+" : ""; 
+    document.getElementById('valGrowth').innerText = `${growthSign}${growthVal}`;
+    
+    // C. Min/Max
+    document.getElementById('valMin').innerText = analysis.min_value ?? "N/A";
+    document.getElementById('valMax').innerText = analysis.max_value ?? "N/A";
+
+    // --- 5. RENDER CITATION BADGE ---
+    const datasetLabel = analysis.chart_data && analysis.chart_data.datasets.length > 0 
+                         ? analysis.chart_data.datasets[0].label 
+                         : "Data";
+    document.getElementById('sourceBadge').innerText = `${source} [${datasetLabel}]`;
+
+    // --- 6. REVEAL UI (charts need a visible canvas to size themselves) ---
+    document.getElementById('loading').classList.add('hidden');
+    document.getElementById('results').classList.remove('hidden');
+
+    // --- 7. RENDER DUAL CHARTS ---
+    renderLineChart(analysis.chart_data);
+    renderBarChart(analysis.summary_chart_data, analysis.screening);
+}
+
 // --- CHART 1: TREND LINE ---
 function renderLineChart(chartData) {
     const ctx = document.getElementById('lineChart').getContext('2d');
@@ -133,7 +207,7 @@ function renderLineChart(chartData) {
 }
 
 // --- CHART 2: COMPARISON BAR (NEW) ---
-function renderBarChart(chartData) {
+function renderBarChart(chartData, screening) {
     // If no summary data exists, just return (prevents crash on single-point data)
     if (!chartData) return;
     
@@ -148,7 +222,7 @@ function renderBarChart(chartData) {
         data: {
             labels: chartData.labels, // Country Names
             datasets: [{
-                label: 'Period Average',
+                label: screening ? chartData.datasets[0].label : 'Period Average', // screens chart their ranking metric
                 data: chartData.datasets[0].data,
                 backgroundColor: barColors,
                 borderRadius: 4
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from data.store import SHARED_STORE_PATH
+from orchestrator.cache import DiskStore
+
+# JOB SETTINGS
+NARRATION_WORKERS = int(os.getenv("NARRATION_WORKERS", "4"))
+JOB_TTL = int(os.getenv("NARRATION_JOB_TTL", "900"))  # seconds a finished job stays fetchable
+
+class NarrativeJobs:
+    """
+    In-memory job table for deferred narration.
+    /query returns the analysis straight away; the narrative is written on a
+    worker pool and picked up later through /query/{query_id}.
+    With a store_path, jobs are also written to the shared store, so with several
+    gateway workers the poll can land on a different worker than the one narrating.
+    """
+
+    def __init__(self, max_workers: int = NARRATION_WORKERS, ttl: int = JOB_TTL,
+                 store_path: str | None = SHARED_STORE_PATH):
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="narrator")
+        self.store = DiskStore(store_path, "narrative_jobs") if store_path else None
+        self._jobs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, query_id: str, result: dict, narrate: Callable[[], str],
+               on_success: Callable[[dict], None] | None = None):
+        """
+        result: the packaged pipeline result, with narrative still None.
+        narrate: blocking callable that produces the narrative text.
+        on_success: called with the completed result once the narrative is in (e.g. to cache it).
+        """
+        self._purge_expired()
+        with self._lock:
+            self._jobs[query_id] = {"status": "pending", "result": result, "expires_at": time.time() + self.ttl}
+        self._persist(query_id, "pending", result)
+
+        future = self.executor.submit(narrate)
+        future.add_done_callback(lambda f: self._finish(query_id, f, on_success))
+
+    def get(self, query_id: str) -> Optional[dict]:
+        """
+        Returns {"status", "result"} or None if the job is unknown or expired.
+        """
+        self._purge_expired()
+        with self._lock:
+            job = self._jobs.get(query_id)
+            if job is not None:
+                return {"status": job["status"], "result": job["result"]}
+        # Submitted on another worker?
+        return self.store.get(query_id) if self.store is not None else None
+
+    def _finish(self, query_id: str, future, on_success: Callable[[dict], None] | None = None):
+        try:
+            narrative, status = future.result(), "success"
+        except Exception as e:
+            narrative, status = f"Error generation narrative: {str(e)}", "error"
+
+        with self._lock:
+            job = self._jobs.get(query_id)
+            if job is None:
+                return
+            # A new result, not an update: the pending one went out as the /query response
+            # and may still be being serialised.
+            pending = job["result"]
+            result = job["result"] = {**pending, "data": {**pending["data"], "narrative": narrative}}
+            job["status"] = status
+            # The expiry clock starts once the narrative is ready to be collected.
+            job["expires_at"] = time.time() + self.ttl
+        self._persist(query_id, status, result)
+
+        if status == "success" and on_success is not None:
+            try:
+                on_success(result)
+            except Exception as e:
+                print(f"[NarrativeJobs] Completion hook failed for job {query_id}: {e}")
+
+    def _persist(self, query_id: str, status: str, result: dict):
+        if self.store is None:
+            return
+        try:
+            self.store.set(query_id, {"status": status, "result": result}, self.ttl)
+        except Exception as e:
+            # The local worker can still serve the job; only cross-worker polls miss it.
+            print(f"[NarrativeJobs] Could not persist job {query_id}: {e}")
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [qid for qid, job in self._jobs.items() if job["expires_at"] < now]
+            for query_id in expired:
+                del self._jobs[query_id]
+        if expired and self.store is not None:
+            self.store.purge_expired()
@@ -1,11 +1,28 @@
-from fastapi import FastAPI
+# .env is read once, here, before any module reads its settings at import time.
+from dotenv import load_dotenv
+load_dotenv()
+
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware # <--- NEW IMPORT
+from fastapi.responses import PlainTextResponse, JSONResponse
+from gateway import routes
 from gateway.routes import router
+from orchestrator.tracing import render_metrics, record_startup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Agents and Gemini load in the background: "/" answers at once, "/ready" once they are up.
+    record_startup("imported")
+    threading.Thread(target=routes.warm_up, name="warm-up", daemon=True).start()
+    yield
 
 app = FastAPI(
     title="Agentic Open Data Analyst",
     description="API Gateway for the Multi-Agent Data Analysis System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # --- ENABLE CORS (Allow Frontend to talk to Backend) ---
@@ -15,10 +32,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Cache"],  # app.js reads the ETag to revalidate repeat questions
 )
 
 app.include_router(router, prefix="/api/v1")
 
+_first_request_seen = False
+
+@app.middleware("http")
+async def track_first_request(request: Request, call_next):
+    # Cold start is measured up to the first API request actually served.
+    global _first_request_seen
+    response = await call_next(request)
+    if not _first_request_seen and request.url.path.startswith("/api/"):
+        _first_request_seen = True
+        record_startup("first_request")
+    return response
+
 @app.get("/")
 def health_check():
-    return {"status": "online", "system": "Agentic Analyst Gateway"}
\ No newline at end of file
+    """
+    Liveness: the process is up (agents may still be loading).
+    """
+    return {"status": "online", "system": "Agentic Analyst Gateway"}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Readiness: 200 once the agents and the Gemini client are loaded, 503 before (or if loading failed).
+    """
+    status_code = 200 if routes.readiness["status"] == "ready" else 503
+    return JSONResponse(dict(routes.readiness), status_code=status_code)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus scrape target: stage, adapter, upstream and LLM latency histograms,
+    response sizes, token counts and cache lookups.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from typing import Awaitable, Callable, Optional
+from data.store import SHARED_STORE_PATH
+from orchestrator.cache import TTLCache
+
+# RESPONSE CACHE SETTINGS
+# Whole answers, keyed on the resolved plan: every phrasing that plans the same countries,
+# indicators and years gets the same response. Fresh for RESPONSE_CACHE_FRESH seconds; after
+# that it is still served (for up to RESPONSE_CACHE_STALE more) while one refresh runs in the background.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_FRESH = int(os.getenv("RESPONSE_CACHE_FRESH", "900"))
+RESPONSE_CACHE_STALE = int(os.getenv("RESPONSE_CACHE_STALE", str(24 * 3600)))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH") or SHARED_STORE_PATH
+
+# The narrator reports failures as text; such answers are not worth keeping.
+NARRATIVE_ERROR = "Error generation narrative"
+
+class ResponseCache:
+    """
+    Packaged pipeline results ({"type": "success", "data": ...}) with an ETag each,
+    so clients that already hold the answer can be told 304 Not Modified.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, fresh: float = RESPONSE_CACHE_FRESH,
+                 stale: float = RESPONSE_CACHE_STALE, disk_path: str | None = RESPONSE_CACHE_PATH):
+        self.fresh = fresh
+        self.cache = TTLCache("responses", max_entries=max_entries, ttl=fresh + stale, disk_path=disk_path)
+        self._refreshing = set()
+        self._tasks = set()  # strong references: the loop only keeps weak ones
+        self._lock = threading.Lock()
+        self._counters = {"stale_served": 0, "refreshes": 0, "refresh_errors": 0, "not_modified": 0}
+
+    @staticmethod
+    def key(plan) -> str:
+        # The query text is left out on purpose; everything that changes the answer is in the plan.
+        fingerprint = json.dumps(plan.model_dump(exclude={"original_query"}), sort_keys=True)
+        return hashlib.sha256(f"{type(plan).__name__}\n{fingerprint}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        {"result", "etag", "stored_at", "stale"} or None.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        stale = time.time() - entry["stored_at"] > self.fresh
+        if stale:
+            self._count("stale_served")
+        return {**entry, "stale": stale}
+
+    def set(self, key: str, result: dict) -> Optional[str]:
+        """
+        Stores a result and returns its ETag; errors, empty or partial analyses and failed narratives are skipped (None).
+        """
+        if not cacheable(result):
+            return None
+        etag = make_etag(result)
+        self.cache.set(key, {"result": result, "etag": etag, "stored_at": time.time()})
+        return etag
+
+    def revalidate(self, key: str, refresh: Callable[[], Awaitable[dict]]):
+        """
+        Runs refresh() in the background and stores its result, at most once at a time per key
+        (per worker). A failed refresh keeps the stale entry.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        async def run():
+            try:
+                if self.set(key, await refresh()) is not None:
+                    self._count("refreshes")
+                else:
+                    self._count("refresh_errors")
+            except Exception as e:
+                print(f"[ResponseCache] Refresh failed: {e}")
+                self._count("refresh_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def not_modified(self):
+        self._count("not_modified")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.cache.stats(), **self._counters, "refreshing": len(self._refreshing)}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+def cacheable(result: dict) -> bool:
+    if not result or result.get("type") != "success":
+        return False
+    data = result["data"]
+    # no_data usually means an upstream failed just now; ask again next time.
+    # Likewise for answers cut short by a deadline.
+    if data["analysis"].get("trend_direction") == "no_data" or data.get("partial"):
+        return False
+    return not (data.get("narrative") or "").startswith(NARRATIVE_ERROR)
+
+def make_etag(result: dict) -> str:
+    digest = hashlib.sha256(json.dumps(result, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    If-None-Match check: "*", or any listed tag (weak or strong) equal to ours.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
@@ -1,26 +1,125 @@
-from fastapi import APIRouter, HTTPException
-from gateway.schemas import QueryRequest, QueryResponse
-from orchestrator.main import AgentOrchestrator # <--- IMPORT THE BRAIN
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from gateway.schemas import QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse
+from gateway.jobs import NarrativeJobs
+from gateway.response_cache import ResponseCache, etag_matches
+from data.store import WORKERS, acquire_leader_lock
+from data import deadline
+from orchestrator import tracing
+import os
 import uuid
+import json
+import asyncio
+import threading
 
 router = APIRouter()
 
-# Initialize the brain once (Singleton pattern)
-orchestrator = AgentOrchestrator()
+# The brain is built once per worker, on first use or by warm_up() at startup, not at import:
+# the process answers "/" straight away, and a bad config shows up in /ready instead of a crash loop.
+orchestrator = None
+_orchestrator_lock = threading.Lock()
+readiness = {"status": "starting", "error": None}
+narrative_jobs = NarrativeJobs()
+response_cache = ResponseCache()
+
+def get_orchestrator():
+    global orchestrator
+    if orchestrator is None:
+        with _orchestrator_lock:
+            if orchestrator is None:
+                from orchestrator.main import AgentOrchestrator  # numpy, duckdb, requests: deferred with it
+                built = AgentOrchestrator()
+                _start_prefetch(built)
+                orchestrator = built
+    return orchestrator
+
+async def aget_orchestrator():
+    # While warm_up() is still building, wait for it off the event loop.
+    return orchestrator if orchestrator is not None else await asyncio.to_thread(get_orchestrator)
+
+def warm_up():
+    """
+    Builds the agents and sets up Gemini (the slow imports), then marks the worker ready.
+    Run on a background thread at startup; /ready reports the outcome.
+    """
+    try:
+        brain = get_orchestrator()
+        brain.planner.model, brain.narrator.model  # first access imports and configures genai
+        readiness.update(status="ready", error=None)
+        tracing.record_startup("ready")
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        readiness.update(status="error", error=str(e))
+
+_prefetch_lock = None
+
+def _start_prefetch(brain):
+    # Optional warm-up schedule. Runs in-process because the gateway holds the cache file's write lock.
+    # With several workers sharing the store, only the worker that wins the leader lock runs it.
+    global _prefetch_lock
+    if os.getenv("PREFETCH_INTERVAL_HOURS"):
+        _prefetch_lock = acquire_leader_lock("prefetch") if WORKERS > 1 else True
+        if _prefetch_lock:
+            from data.prefetch import start_background_prefetch
+            start_background_prefetch(brain.fetcher.cache, float(os.getenv("PREFETCH_INTERVAL_HOURS")))
+
+def _timeout(x_request_timeout: float | None) -> float:
+    """
+    The request's time budget in seconds: the X-Request-Timeout header if sent
+    (capped at REQUEST_DEADLINE_MAX), else REQUEST_DEADLINE.
+    """
+    if x_request_timeout is None:
+        return deadline.REQUEST_DEADLINE
+    return min(x_request_timeout, deadline.REQUEST_DEADLINE_MAX)
 
 @router.post("/query", response_model=QueryResponse)
-async def submit_query(request: QueryRequest):
+async def submit_query(request: QueryRequest, response: Response,
+                       if_none_match: str | None = Header(default=None),
+                       x_request_timeout: float | None = Header(default=None, gt=0)):
     """
     Endpoint to receive analysis requests.
+    Answers are cached per resolved plan and carry an ETag; send it back as
+    If-None-Match to get 304 Not Modified while the answer is unchanged.
+    X-Request-Timeout (seconds) sets the time budget: whatever is not ready by then is left
+    out and the result says "partial": true.
     """
+    with deadline.scope(_timeout(x_request_timeout)):
+        return await _answer_query(request, response, if_none_match)
+
+async def _answer_query(request: QueryRequest, response: Response, if_none_match: str | None):
     query_id = str(uuid.uuid4())
     print(f"Received Request {query_id}: {request.text}")
 
     # --- REAL INTEGRATION ---
     try:
-        # Pass the text to the brain
-        result = orchestrator.run_pipeline(request.text)
-        
+        # Pass the text to the brain (awaited, so the event loop keeps serving other requests)
+        brain = await aget_orchestrator()
+        try:
+            plan = await brain.aplan(request.text, query_id)
+        except Exception as e:
+            print(f"Error: {e}")
+            return QueryResponse(query_id=query_id, status="success", result={"type": "error", "message": str(e)})
+
+        # Cache hits are complete answers, so deferred requests get status "success" straight away.
+        key = response_cache.key(plan)
+        cached = _cached_response(brain, key, plan)
+        if cached is not None:
+            headers = {"ETag": cached["etag"], "X-Cache": "STALE" if cached["stale"] else "HIT"}
+            if etag_matches(if_none_match, cached["etag"]):
+                response_cache.not_modified()
+                return Response(status_code=304, headers=headers)
+            response.headers.update(headers)
+            return QueryResponse(query_id=query_id, status="success", result=cached["result"])
+
+        if request.defer_narrative:
+            return await _submit_deferred(query_id, request.text, plan, key)
+
+        result = await brain.arun_pipeline(request.text, query_id, plan=plan)
+        etag = response_cache.set(key, result)
+        response.headers["X-Cache"] = "MISS"
+        if etag is not None:
+            response.headers["ETag"] = etag
+
         return QueryResponse(
             query_id=query_id,
             status="success",
@@ -32,4 +131,189 @@ async def submit_query(request: QueryRequest):
             query_id=query_id,
             status="error",
             result={"error": str(e)}
-        )
\ No newline at end of file
+        )
+
+def _cached_response(brain, key: str, plan):
+    """
+    Cached answer for this plan, if any. Stale answers are still served; they trigger
+    one background refresh so the next caller gets a fresh one.
+    """
+    cached = response_cache.get(key)
+    if cached is not None and cached["stale"]:
+        text = plan.original_query
+        # A budget of its own: the refresh outlives the request that triggered it.
+        response_cache.revalidate(key, lambda: brain.arun_pipeline(text, str(uuid.uuid4()), plan=plan,
+                                                                   timeout=deadline.REQUEST_DEADLINE))
+    return cached
+
+async def _submit_deferred(query_id: str, text: str, plan=None, key: str | None = None) -> QueryResponse:
+    """
+    Runs plan/fetch/analysis now, hands narration to the job pool, and returns
+    the analysis with status "pending" and narrative None.
+    With a response-cache key, the finished answer is cached once the narrative is in.
+    """
+    try:
+        brain = await aget_orchestrator()
+        plan, stats = await brain.arun_analysis(text, query_id, plan=plan)
+    except Exception as e:
+        print(f"Error: {e}")
+        return QueryResponse(query_id=query_id, status="success", result={"type": "error", "message": str(e)})
+
+    result = brain.package_result(plan, stats, None)
+    with tracing.query_scope(query_id):
+        # bind(): the job's spans and logs keep this query_id on the pool thread.
+        narrative_jobs.submit(query_id, result, tracing.bind(brain.narrate, plan, stats),
+                              on_success=(lambda answer: response_cache.set(key, answer)) if key else None)
+    return QueryResponse(query_id=query_id, status="pending", result=result)
+
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def submit_batch(request: BatchQueryRequest,
+                       x_request_timeout: float | None = Header(default=None, gt=0)):
+    """
+    Many questions in one request. Planning is one LLM call (chunked for long batches),
+    every unique series is fetched once for the whole batch, and each question is then
+    analysed and narrated on its own. Cached answers are reused and new ones stored.
+    X-Request-Timeout applies to the batch as a whole.
+    """
+    with deadline.scope(_timeout(x_request_timeout)):
+        return await _answer_batch(request)
+
+async def _answer_batch(request: BatchQueryRequest) -> BatchQueryResponse:
+    batch_id = str(uuid.uuid4())
+    print(f"Received Batch {batch_id}: {len(request.texts)} questions")
+
+    brain = await aget_orchestrator()
+    plans = await brain.aplan_many(request.texts, batch_id)
+
+    results = [None] * len(plans)
+    todo = {}  # response cache key -> indexes of the questions with that plan
+    for i, plan in enumerate(plans):
+        if isinstance(plan, Exception):
+            results[i] = {"type": "error", "message": str(plan)}
+            continue
+        key = response_cache.key(plan)
+        cached = _cached_response(brain, key, plan)
+        if cached is not None:
+            results[i] = cached["result"]
+        else:
+            todo.setdefault(key, []).append(i)
+
+    # Questions that resolved to the same plan are answered once.
+    keys = list(todo)
+    try:
+        answers = await brain.arun_batch([plans[todo[key][0]] for key in keys], batch_id)
+    except Exception as e:
+        print(f"Error: {e}")
+        answers = [{"type": "error", "message": str(e)}] * len(keys)
+    for key, result in zip(keys, answers):
+        response_cache.set(key, result)
+        for i in todo[key]:
+            results[i] = result
+
+    return BatchQueryResponse(
+        batch_id=batch_id,
+        status="success",
+        results=[QueryResponse(query_id=f"{batch_id}-{i}", status="success", result=result)
+                 for i, result in enumerate(results)]
+    )
+
+@router.get("/query/{query_id}", response_model=QueryResponse)
+def query_status(query_id: str):
+    """
+    Status of a deferred query: "pending" until the narrative is ready, then "success".
+    """
+    job = narrative_jobs.get(query_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired query_id")
+    return QueryResponse(query_id=query_id, status=job["status"], result=job["result"])
+
+@router.post("/query/stream")
+async def stream_query(request: QueryRequest,
+                       x_request_timeout: float | None = Header(default=None, gt=0)):
+    """
+    Streaming version of /query (NDJSON, one JSON event per line).
+    Events: plan, data (per series), analysis, narrative (text chunks), done | error.
+    Shares /query's response cache: a cached answer is replayed as plan, analysis, one
+    narrative event and done. "done" carries the answer's ETag when it is cached, and
+    partial=True when the X-Request-Timeout budget cut the answer short.
+    """
+    query_id = str(uuid.uuid4())
+    timeout = _timeout(x_request_timeout)
+    print(f"Received Streaming Request {query_id}: {request.text}")
+
+    async def event_lines():
+        with deadline.scope(timeout):
+            async for line in _stream_lines(request, query_id):
+                yield line
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+async def _stream_lines(request: QueryRequest, query_id: str):
+    yield json.dumps({"type": "query_id", "data": query_id}) + "\n"
+    brain = await aget_orchestrator()
+    try:
+        plan = await brain.aplan(request.text, query_id)
+    except Exception as e:
+        print(f"Error: {e}")
+        yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+        return
+
+    key = response_cache.key(plan)
+    cached = _cached_response(brain, key, plan)
+    if cached is not None:
+        for event in _replay(plan, cached):
+            yield json.dumps(event) + "\n"
+        return
+
+    analysis, narrative = None, []
+    async for event in brain.astream_pipeline(request.text, query_id, plan=plan):
+        if event["type"] == "analysis":
+            analysis = event["data"]
+        elif event["type"] == "narrative":
+            narrative.append(event["data"])
+        elif event["type"] == "done" and analysis is not None:
+            result = {"type": "success", "data": {**analysis, "narrative": "".join(narrative).strip(),
+                                                  "partial": event["partial"], "omitted": event["omitted"]}}
+            event = {**event, "etag": response_cache.set(key, result)}
+        yield json.dumps(event) + "\n"
+
+def _replay(plan, cached: dict):
+    data = cached["result"]["data"]
+    yield {"type": "plan", "data": plan.model_dump()}
+    yield {"type": "analysis", "data": {"source": data["source"], "analysis": data["analysis"]}}
+    yield {"type": "narrative", "data": data["narrative"]}
+    yield {"type": "done", "etag": cached["etag"], "cached": True, "partial": False, "omitted": []}
+
+@router.get("/upstream/stats")
+def upstream_stats():
+    """
+    Connection reuse and retry counters of the shared HTTP client.
+    """
+    return get_orchestrator().fetcher.http.stats()
+
+@router.get("/sources")
+def source_stats():
+    """
+    Per upstream: circuit breaker state (closed / open / half_open), in-flight calls against
+    the cap, tokens left in the rate limiter, and call / failure / rejection counters.
+    """
+    return get_orchestrator().fetcher.sources.stats()
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """
+    Hit/miss counters of the in-process caches, and how many identical in-flight calls were shared.
+    """
+    brain = get_orchestrator()
+    return {
+        "plans": brain.planner.plan_cache.stats(),
+        "narratives": brain.narrator.cache.stats(),
+        "responses": response_cache.stats(),
+        "planning": brain.planning_stats(),
+        "coalescing": {
+            "fetches": brain.fetcher.flights.stats(),
+            "plans": brain.planner.flights.stats(),
+            "plans_async": brain.planner.async_flights.stats(),
+        },
+    }
@@ -1,12 +1,15 @@
 from pydantic import BaseModel, Field
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Annotated, List, Optional
 class QueryRequest(BaseModel):
     """
     What the user sends us.
     Example: {"text": "Show me GDP growth in India vs China"}
     """
     text: str = Field(..., min_length=5, max_length=300, description="The analysis question")
+    # True: return the analysis immediately and generate the narrative in the background
+    # (poll GET /query/{query_id} for it).
+    defer_narrative: bool = False
 
 class QueryResponse(BaseModel):
     """
@@ -15,6 +18,23 @@ class QueryResponse(BaseModel):
     query_id: str
     status: str
     result: dict | None = None
+
+class BatchQueryRequest(BaseModel):
+    """
+    Many questions at once (reporting jobs).
+    Example: {"texts": ["GDP growth India vs China", "US inflation"]}
+    """
+    texts: List[Annotated[str, Field(min_length=5, max_length=300)]] = Field(
+        ..., min_length=1, max_length=100, description="The analysis questions"
+    )
+
+class BatchQueryResponse(BaseModel):
+    """
+    One QueryResponse per question, in request order.
+    """
+    batch_id: str
+    status: str
+    results: List[QueryResponse]
     
 class AnalysisPlan(BaseModel):
     original_query: str
@@ -1,95 +1,178 @@
-import statistics
 from typing import List
+import numpy as np
 from data.canonical import IndicatorSeries
-from orchestrator.schemas import AnalysisResult, ChartData, ChartDataset
+from orchestrator.schemas import AnalysisResult, ChartData, ChartDataset, SeriesStats, ScreeningPlan, ScreeningSummary
+from orchestrator.alignment import AlignedSeries, align_series, DEFAULT_GAP_POLICY
 from orchestrator.logger import get_logger
 
 logger = get_logger("AnalystAgent")
 
+CODE_MAP = {
+    "NY.GDP.MKTP.KD.ZG": "GDP Growth (%)",
+    "FP.CPI.TOTL.ZG": "Inflation (%)",
+    "SP.POP.TOTL": "Population",
+    "EN.ATM.CO2E.KT": "CO2 Emissions",
+    "HUR": "Unemployment (%)",
+    "EARNINGS": "Hourly Earnings"
+}
+
+# Rates are compared as a point difference; levels as a percentage change.
+RATE_MARKERS = ["ZG", "HUR", "CPI"]
+
+# Screening metric -> (_column_stats key, bar chart label)
+SCREEN_METRICS = {
+    "average": ("mean", "Period Average"),
+    "change": ("growth", "Change over Period"),
+    "latest": ("last", "Latest Value"),
+}
+
 class AnalystAgent:
+    def __init__(self, gap_policy: str = DEFAULT_GAP_POLICY):
+        self.gap_policy = gap_policy
+
     def analyze(self, data_list: List[IndicatorSeries]) -> AnalysisResult:
         logger.info(f"Analyzing {len(data_list)} datasets.")
-        
+
+        data_list = [series for series in data_list if len(series)]
         if not data_list:
             logger.warning("No datasets to analyze. Returning empty result.")
             return AnalysisResult(
-                min_value=0, max_value=0, average=0, trend_direction="no_data", 
+                min_value=0, max_value=0, average=0, trend_direction="no_data",
                 growth_rate=0, chart_data=None, summary_chart_data=None, data_sources=[]
             )
 
-        CODE_MAP = {
-            "NY.GDP.MKTP.KD.ZG": "GDP Growth (%)",
-            "FP.CPI.TOTL.ZG": "Inflation (%)",
-            "SP.POP.TOTL": "Population",
-            "EN.ATM.CO2E.KT": "CO2 Emissions",
-            "HUR": "Unemployment (%)",
-            "EARNINGS": "Hourly Earnings"
-        }
+        # 1. ALIGN: every series outer-joined on year, once. Charts and stats both read this.
+        aligned = align_series(data_list, self.gap_policy)
+
+        # 2. STATS: one vectorized pass over all columns (observed values only, never interpolated).
+        stats = self._column_stats(data_list, aligned)
 
-        # 1. Prepare Line Chart
-        line_datasets = []
-        bar_values = []
+        # 3. Per-series results + chart inputs
+        labels = []
+        series_stats = []
         all_sources = []
-        colors = ["#6366f1", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#06b6d4"]
-        
-        for idx, series in enumerate(data_list):
-            values = [pt.value for pt in series.data]
-            if not values: continue
-            
+        for col, series in enumerate(data_list):
             metric_name = CODE_MAP.get(series.indicator, series.indicator)
             label = f"{series.country} - {metric_name}"
+            labels.append(label)
             all_sources.append(f"{series.source}: {metric_name} ({series.country})")
-            
-            # Line Chart Data
-            line_datasets.append(ChartDataset(
+            series_stats.append(SeriesStats(
                 label=label,
-                data=values,
-                borderColor=colors[idx % len(colors)],
-                fill=False
+                country=series.country,
+                indicator=series.indicator,
+                source=series.source,
+                min_value=round(float(stats["min"][col]), 2),
+                max_value=round(float(stats["max"][col]), 2),
+                average=round(float(stats["mean"][col]), 2),
+                trend_direction=stats["trend"][col],
+                growth_rate=round(float(stats["growth"][col]), 2),
+                start_year=int(stats["start_year"][col]),
+                end_year=int(stats["end_year"][col]),
+                points=int(stats["count"][col])
             ))
 
-            # Bar Chart Data (Average)
-            bar_values.append(statistics.mean(values))
-
-        # 2. Stats (Primary)
-        primary = data_list[0]
-        p_vals = [pt.value for pt in primary.data]
-        
-        min_val = min(p_vals) if p_vals else 0
-        max_val = max(p_vals) if p_vals else 0
-        avg_val = statistics.mean(p_vals) if p_vals else 0
-        
-        trend = "stable"
-        if p_vals:
-            if p_vals[-1] > p_vals[0]: trend = "increasing"
-            elif p_vals[-1] < p_vals[0]: trend = "decreasing"
-            
-        growth = 0.0
-        if p_vals:
-            is_rate = any(k in primary.indicator for k in ["ZG", "HUR", "CPI"])
-            if is_rate:
-                growth = p_vals[-1] - p_vals[0] # Point difference
-            elif p_vals[0] != 0:
-                growth = ((p_vals[-1] - p_vals[0]) / abs(p_vals[0])) * 100
-
-        # 3. Packaging
-        years = [str(pt.year) for pt in primary.data] if primary.data else []
-        
-        # Dual Charts
-        line_chart = ChartData(labels=years, datasets=line_datasets)
-        
+        # 4. Packaging
+        # Line chart: one shared year axis, every dataset aligned to it (None marks a gap).
+        colors = ["#6366f1", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#06b6d4"]
+        line_datasets = [
+            ChartDataset(
+                label=labels[col],
+                data=aligned.column(col),
+                borderColor=colors[col % len(colors)],
+                fill=False
+            )
+            for col in range(len(data_list))
+        ]
+        line_chart = ChartData(labels=aligned.labels, datasets=line_datasets)
+
+        # Bar chart: period averages
         summary_chart = ChartData(
-            labels=[d.label for d in line_datasets],
-            datasets=[ChartDataset(label="Average", data=bar_values, borderColor="#fff", fill=True)]
+            labels=labels,
+            datasets=[ChartDataset(label="Average", data=stats["mean"].tolist(), borderColor="#fff", fill=True)]
         )
 
+        # Headline numbers describe the primary series.
+        primary = series_stats[0]
         return AnalysisResult(
-            min_value=round(min_val, 2),
-            max_value=round(max_val, 2),
-            average=round(avg_val, 2),
-            trend_direction=trend,
-            growth_rate=round(growth, 2),
+            min_value=primary.min_value,
+            max_value=primary.max_value,
+            average=primary.average,
+            trend_direction=primary.trend_direction,
+            growth_rate=primary.growth_rate,
             chart_data=line_chart,
             summary_chart_data=summary_chart,
-            data_sources=all_sources
-        )
\ No newline at end of file
+            data_sources=all_sources,
+            series_stats=series_stats
+        )
+
+    def screen(self, plan: ScreeningPlan, data_list: List[IndicatorSeries]) -> AnalysisResult:
+        """
+        Ranking mode: scores every series on plan.metric in one vectorized pass (all countries
+        aligned into one matrix), applies the trend filter, and keeps the top N in rank order.
+        The top N then get the usual charts; the bar chart shows the ranking metric.
+        """
+        data_list = [series for series in data_list if len(series)]
+        logger.info(f"Screening {len(data_list)} series on {plan.metric} ({plan.order}).")
+        stat_key, metric_label = SCREEN_METRICS[plan.metric]
+
+        ranked = np.array([], dtype=int)
+        score = np.array([])
+        if data_list:
+            aligned = align_series(data_list, self.gap_policy)
+            stats = self._column_stats(data_list, aligned)
+            score = np.asarray(stats[stat_key], dtype=float)
+            keep = ~np.isnan(score)
+            if plan.trend:
+                keep &= np.asarray(stats["trend"]) == plan.trend
+            matched = np.flatnonzero(keep)
+            order = np.argsort(score[matched] if plan.order == "asc" else -score[matched], kind="stable")
+            ranked = matched[order]
+
+        top = ranked[:plan.top_n]
+        result = self.analyze([data_list[i] for i in top])
+        if len(top):
+            result.summary_chart_data = ChartData(
+                labels=[data_list[i].country for i in top],
+                datasets=[ChartDataset(label=metric_label, data=[round(float(v), 2) for v in score[top]],
+                                       borderColor="#fff", fill=True)]
+            )
+        result.screening = ScreeningSummary(
+            universe=plan.universe, metric=plan.metric, order=plan.order, trend=plan.trend,
+            candidates=len(data_list), matched=len(ranked), shown=len(top)
+        )
+        return result
+
+    def _column_stats(self, data_list: List[IndicatorSeries], aligned: AlignedSeries) -> dict:
+        """
+        min / max / mean / first / last / trend / growth for every column at once.
+        Every column has at least one value (empty series were dropped earlier).
+        """
+        years, matrix = aligned.years, aligned.observed
+        valid = ~np.isnan(matrix)
+        n_rows, n_cols = matrix.shape
+        col_idx = np.arange(n_cols)
+
+        first_row = valid.argmax(axis=0)
+        last_row = n_rows - 1 - valid[::-1].argmax(axis=0)
+        first = matrix[first_row, col_idx]
+        last = matrix[last_row, col_idx]
+
+        trend = np.where(last > first, "increasing", np.where(last < first, "decreasing", "stable"))
+
+        is_rate = np.array([any(k in s.indicator for k in RATE_MARKERS) for s in data_list])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct = np.where(first != 0, (last - first) / np.abs(first) * 100, 0.0)
+        growth = np.where(is_rate, last - first, pct)
+
+        return {
+            "min": np.nanmin(matrix, axis=0),
+            "max": np.nanmax(matrix, axis=0),
+            "mean": np.nanmean(matrix, axis=0),
+            "count": valid.sum(axis=0),
+            "start_year": years[first_row],
+            "end_year": years[last_row],
+            "first": first,
+            "last": last,
+            "trend": trend.tolist(),
+            "growth": growth,
+        }
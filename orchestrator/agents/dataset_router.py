@@ -1,8 +1,69 @@
-from typing import List, Literal
+import os
+import re
+from typing import List, Literal, Optional, Tuple
+from orchestrator.schemas import AnalysisPlan, ScreeningPlan, DEFAULT_YEARS
+from orchestrator.query_normalizer import extract_countries, has_region_qualifier
+from data.indicators import INDICATOR_SOURCES
+from data.countries import COUNTRY_GROUPS, OECD_MEMBERS
+from orchestrator.agents.analyst import RATE_MARKERS
 
 # Type alias for our supported sources (keeps things safe)
 DataSource = Literal["WORLDBANK", "OECD"]
 
+# FAST PATH SETTINGS
+# Below this confidence the query goes to the LLM planner instead.
+FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+
+# Keyword -> indicator code. Mirrors the metric menu in the PlannerAgent prompt.
+INDICATOR_KEYWORDS = {
+    "gdp": "NY.GDP.MKTP.KD.ZG",
+    "economic growth": "NY.GDP.MKTP.KD.ZG",
+    "inflation": "FP.CPI.TOTL.ZG",
+    "cpi": "FP.CPI.TOTL.ZG",
+    "consumer prices": "FP.CPI.TOTL.ZG",
+    "population": "SP.POP.TOTL",
+    "co2": "EN.ATM.CO2E.KT",
+    "carbon": "EN.ATM.CO2E.KT",
+    "emissions": "EN.ATM.CO2E.KT",
+    "unemployment": "HUR",
+    "jobless": "HUR",
+    "earnings": "EARNINGS",
+    "wages": "EARNINGS",
+}
+
+# Questions the rule engine cannot express as a plain (countries x indicators) plan.
+COMPLEX_MARKERS = ["top", "rank", "highest", "lowest", "which", "forecast", "predict", "why", "correlat", "impact"]
+# Variants of an indicator the keyword table cannot tell apart ("GDP per capita" is not GDP growth).
+QUALIFIER_MARKERS = ["per capita", "per person", "per head", "real", "nominal", "ppp", "purchasing power",
+                     "constant", "dollars", "usd", "core", "youth", "female", "male", "women", "men",
+                     "monthly", "quarterly"]
+# Countries each source covers; a source missing here covers every country.
+SOURCE_COUNTRIES = {"OECD": set(OECD_MEMBERS)}
+
+# SCREENING SETTINGS
+# Ranking questions ("top 10 countries by GDP growth since 2018") are answered over every country.
+SCREEN_TOP_N = int(os.getenv("SCREEN_TOP_N", "10"))
+SCREEN_MAX_TOP_N = 50
+
+_SCREEN_RE = re.compile(r"\b(top|bottom|rank|ranked|ranking|highest|lowest|most(?! recent)|least|fastest|slowest|best|worst|which)\b")
+_TOP_N_RE = re.compile(r"\b(?:top|bottom|best|worst|highest|lowest)\s+(\d{1,3})\b")
+_ASCENDING_RE = re.compile(r"\b(bottom|lowest|least|slowest|worst|smallest)\b")
+_RISING_RE = re.compile(r"\b(rising|increasing|climbing|going up|on the rise)\b")
+_FALLING_RE = re.compile(r"\b(falling|declining|decreasing|dropping|shrinking|going down)\b")
+_LATEST_RE = re.compile(r"\b(latest|current|currently|now|today|most recent)\b")
+_CHANGE_RE = re.compile(r"\b(change|changed|increase|decrease|fastest|slowest)\b")
+_GROWTH_RE = re.compile(r"\b(grew|grow|grows|growing|growth)\b")
+_SINCE_RE = re.compile(r"\bsince\s+((?:19|20)\d{2})\b")
+_RANGE_RE = re.compile(r"\b(?:from|between)\s+((?:19|20)\d{2})\s*(?:to|and|-)\s*((?:19|20)\d{2})\b")
+_IN_YEAR_RE = re.compile(r"\bin\s+((?:19|20)\d{2})\b")
+_GROUP_RE = re.compile(r"\b(oecd|g-?7|g-?20)\b")
+
+_KEYWORD_RE = re.compile(r"\b(" + "|".join(sorted(INDICATOR_KEYWORDS, key=len, reverse=True)) + r")\b")
+_COMPLEX_RE = re.compile(r"\b(" + "|".join(COMPLEX_MARKERS) + r")")
+_QUALIFIER_RE = re.compile(r"\b(" + "|".join(QUALIFIER_MARKERS) + r")\b")
+# Any explicit period: the fast path only knows DEFAULT_YEARS.
+_PERIOD_RE = re.compile(r"\b((?:19|20)\d{2}|decades?|(?:last|past|previous|next)\s+(?:\d+|few|several|ten|five)\s+years?)\b")
+
 class DatasetRouterAgent:
     def __init__(self):
         # RULE ENGINE: Simple keyword mapping
@@ -37,4 +98,133 @@ class DatasetRouterAgent:
         # 3. Default Fallback
         # If we don't know, we default to World Bank (it has more general data)
         print(f"[Router] No keywords matched. Defaulting to WORLDBANK.")
-        return ["WORLDBANK"]
\ No newline at end of file
+        return ["WORLDBANK"]
+
+    def plan(self, query: str) -> Tuple[Optional[AnalysisPlan], float]:
+        """
+        Rule-based planning: countries from the alias table, indicators from keywords.
+        Returns (plan, confidence). The plan is None when confidence is below the threshold,
+        meaning the caller should ask the LLM planner instead.
+        """
+        query_lower = query.lower()
+        countries = extract_countries(query)
+
+        indicators = []
+        for keyword in _KEYWORD_RE.findall(query_lower):
+            code = INDICATOR_KEYWORDS[keyword]
+            if code not in indicators:
+                indicators.append(code)
+        sources = {INDICATOR_SOURCES[code] for code in indicators}
+
+        # 1. SCORE: every doubt costs confidence.
+        confidence = 1.0
+        if not countries:
+            confidence -= 0.5
+        if not indicators:
+            confidence -= 0.5
+        if len(sources) > 1:
+            confidence -= 0.5   # a plan has exactly one source
+        if _COMPLEX_RE.search(query_lower):
+            confidence -= 0.5
+        if _PERIOD_RE.search(query_lower):
+            confidence -= 0.5   # "since 2010", "over the last 5 years"
+        if _QUALIFIER_RE.search(query_lower):
+            confidence -= 0.5   # "per capita", "real", ...: a different series than the keyword's
+        if has_region_qualifier(query):
+            confidence -= 0.5   # "New Mexico", "Latin America": not the country the alias table finds
+        covered = [SOURCE_COUNTRIES.get(source) for source in sources]
+        if any(members is not None and not members.issuperset(countries) for members in covered):
+            confidence -= 0.5   # e.g. India has no OECD unemployment series
+        confidence = max(confidence, 0.0)
+
+        if confidence < FAST_PATH_MIN_CONFIDENCE:
+            return None, confidence
+
+        # 2. CONTEXT: same rule as the LLM prompt, GDP/Unemployment get Inflation as secondary.
+        # Inflation is a World Bank series, so it can only be added to World Bank plans.
+        source = sources.pop()
+        if source == "WORLDBANK" and indicators[0] == "NY.GDP.MKTP.KD.ZG" and "FP.CPI.TOTL.ZG" not in indicators:
+            indicators.append("FP.CPI.TOTL.ZG")
+
+        return AnalysisPlan(
+            original_query=query,
+            source=source,
+            topic="economic_analysis",
+            target_countries=countries,
+            target_indicators=indicators,
+            years=list(DEFAULT_YEARS)
+        ), confidence
+
+    def screen(self, query: str) -> Optional[ScreeningPlan]:
+        """
+        Rule-based parse of ranking / screening questions:
+        "top 10 countries by GDP growth since 2018", "which OECD members have rising unemployment".
+        Returns None when the question is not one (or names a single country, or several indicators).
+        """
+        query_lower = query.lower()
+        if not _SCREEN_RE.search(query_lower):
+            return None
+
+        # 1. ONE indicator. "Which G7 economy grew fastest" means GDP growth.
+        indicators = list(dict.fromkeys(INDICATOR_KEYWORDS[k] for k in _KEYWORD_RE.findall(query_lower)))
+        if not indicators and _GROWTH_RE.search(query_lower):
+            indicators = ["NY.GDP.MKTP.KD.ZG"]
+        if len(indicators) != 1:
+            return None
+        indicator = indicators[0]
+
+        # 2. UNIVERSE: a named group, several named countries, or everyone.
+        group = _GROUP_RE.search(query_lower)
+        countries = extract_countries(query)
+        if group:
+            universe = group.group(1).replace("-", "")
+            countries = list(COUNTRY_GROUPS[universe])
+        elif len(countries) >= 2:
+            universe = "custom"
+        elif countries:
+            return None   # "highest inflation in India" is a single-country question
+        else:
+            universe = "all"
+
+        # 3. WINDOW
+        years = list(DEFAULT_YEARS)
+        single_year = False
+        if m := _RANGE_RE.search(query_lower):
+            start, end = sorted(int(y) for y in m.groups())
+            years = list(range(start, end + 1))
+        elif m := _SINCE_RE.search(query_lower):
+            start = int(m.group(1))
+            years = list(range(start, max(max(DEFAULT_YEARS), start) + 1))
+        elif m := _IN_YEAR_RE.search(query_lower):
+            years, single_year = [int(m.group(1))], True
+
+        # 4. METRIC, FILTER, ORDER
+        trend = "increasing" if _RISING_RE.search(query_lower) else "decreasing" if _FALLING_RE.search(query_lower) else None
+        is_rate = any(marker in indicator for marker in RATE_MARKERS)
+        if trend:
+            metric = "change"
+        elif single_year or _LATEST_RE.search(query_lower):
+            metric = "latest"
+        elif _CHANGE_RE.search(query_lower) and not is_rate:
+            metric = "change"   # "fastest-growing population"; a growth rate is already a change
+        else:
+            metric = "average"
+        ascending = bool(_ASCENDING_RE.search(query_lower)) or trend == "decreasing"
+
+        top_n = SCREEN_TOP_N
+        if m := _TOP_N_RE.search(query_lower):
+            top_n = min(max(int(m.group(1)), 1), SCREEN_MAX_TOP_N)
+
+        return ScreeningPlan(
+            original_query=query,
+            source=INDICATOR_SOURCES[indicator],
+            topic="screening",
+            target_countries=countries if universe != "all" else [],
+            target_indicators=[indicator],
+            years=years,
+            universe=universe,
+            metric=metric,
+            order="asc" if ascending else "desc",
+            trend=trend,
+            top_n=top_n,
+        )
@@ -1,44 +1,351 @@
-from typing import List
-from orchestrator.schemas import AnalysisPlan
+import os
+import asyncio
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Hashable, List, Set, Tuple
+from orchestrator.schemas import AnalysisPlan, ScreeningPlan
 from data.canonical import IndicatorSeries
+from data.series_cache import SeriesCache
+from data.http_client import get_shared_client
+from data.adapters.base_adapter import BaseAdapter
 from data.adapters.worldbank_adapter import WorldBankAdapter
 from data.adapters.oecd_adapter import OECDAdapter
+from data.sources import SourceRegistry
+from data import deadline
+from orchestrator.singleflight import SingleFlight
+from orchestrator import tracing
 from orchestrator.logger import get_logger
 
 logger = get_logger("FetcherAgent")
 
+# CONCURRENCY SETTINGS
+# The pool bounds the total number of fetches in flight for this process.
+# Per-upstream caps, rate limits and circuit breakers live in data.resilience (SOURCE_LIMITS).
+MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+
 class FetcherAgent:
-    def __init__(self):
-        self.wb_adapter = WorldBankAdapter()
-        self.oecd_adapter = OECDAdapter()
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        # Every source shares one pooled HTTP client and reads through the same local series cache.
+        # Upstream calls go through the source's guard (rate limit, concurrency cap, circuit breaker).
+        self.http = get_shared_client()
+        self.http.add_listener(tracing.record_upstream)
+        self.cache = SeriesCache()
+        self.sources = SourceRegistry()
+        for upstream in (WorldBankAdapter(self.http), OECDAdapter(self.http)):
+            self.sources.register(upstream, self.cache, on_lookup=functools.partial(
+                tracing.record_cache_lookup, f"series_{upstream.source.lower()}"))
+
+        # Shared across requests, so the pool bound holds for the whole process, not per query.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetcher")
+        # Identical fetches already in flight (from other requests) are shared, not repeated.
+        self.flights = SingleFlight("fetches")
 
     def execute_plan(self, plan: AnalysisPlan) -> List[IndicatorSeries]:
-        results = []
+        fetched = {}
+        for result in self._wait(self._dispatch(plan)):
+            fetched.update(result or {})
+        return self.collect(plan, fetched)
+
+    async def aexecute_plan(self, plan: AnalysisPlan) -> List[IndicatorSeries]:
+        """
+        Async twin of execute_plan. The fetches still run on the shared pool
+        (same per-source caps, sessions and cache); the event loop only awaits them.
+        """
+        fetched = {}
+        for result in await self._await(self._dispatch(plan)):
+            fetched.update(result or {})
+        return self.collect(plan, fetched)
+
+    async def aiter_plan(self, plan: AnalysisPlan) -> AsyncIterator[Dict[Tuple[str, str], IndicatorSeries]]:
+        """
+        Yields each task's {(country, indicator): series} as soon as it completes (completion order).
+        Callers that need the plan order pass the merged dict to collect() at the end.
+        Stops at the request's deadline; fetches not back by then are cut (see _cut).
+        """
+        futures = self._dispatch(plan)
+        pending = {asyncio.wrap_future(future): future for future in futures}
+        lost = 0
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for waiter in done:
+                del pending[waiter]
+                result = self._outcome(waiter, True)
+                if result is None:
+                    lost += 1
+                else:
+                    yield result
+        self._cut(lost + len(pending), len(futures), pending)
+
+    async def aexecute_plans(self, plans: List[AnalysisPlan]) -> Tuple[List[List[IndicatorSeries] | Exception], Set[int]]:
+        """
+        Batch twin of aexecute_plan: merges the plans into one deduplicated fetch set, i.e. per
+        source, year window and indicator, a single fetch covering every country any plan wants,
+        then hands each plan its own series (in its own order). Screens over a whole universe
+        add one bulk fetch each; a screen that cannot run gets its exception instead.
+        Returns (results, cut): the indexes in `cut` lost fetches to the request's deadline.
+        """
+        merged: Dict[Tuple[str, int, int], Dict[str, set]] = {}
+        screens: Dict[int, Future | Exception] = {}
+        for i, plan in enumerate(plans):
+            if isinstance(plan, ScreeningPlan) and plan.universe != "custom":
+                try:
+                    screens[i] = self._dispatch_all(plan)
+                except ValueError as e:
+                    screens[i] = e
+                continue
+            by_indicator = merged.setdefault(_window(plan), {})
+            for indicator in plan.target_indicators:
+                by_indicator.setdefault(indicator, set()).update(plan.target_countries)
+
+        # (source, start, end, indicator) for merged fetches, the plan index for bulk screens.
+        keyed: List[Tuple[Hashable, Future]] = [
+            ((source, start_year, end_year, indicator), future)
+            for (source, start_year, end_year), by_indicator in merged.items()
+            for indicator, countries in by_indicator.items()
+            for future in self._dispatch(AnalysisPlan(
+                original_query="batch", source=source, topic="batch", target_countries=sorted(countries),
+                target_indicators=[indicator], years=list(range(start_year, end_year + 1))
+            ))
+        ]
+        keyed += [(i, future) for i, future in screens.items() if isinstance(future, Future)]
+        logger.info(f"Batch fetch: {len(plans)} plans merged into {len(keyed)} fetches.")
+
+        fetched: Dict[Tuple[str, int, int], Dict[Tuple[str, str], IndicatorSeries]] = {}
+        bulk: Dict[int, List[IndicatorSeries]] = {}
+        cut_keys = set()
+        for (key, _), result in zip(keyed, await self._await([future for _, future in keyed])):
+            if result is None:
+                cut_keys.add(key)
+            elif isinstance(key, int):
+                bulk[key] = result
+            else:
+                fetched.setdefault(key[:3], {}).update(result)
+
+        results, cut = [], set()
+        for i, plan in enumerate(plans):
+            if i in screens:
+                screen = screens[i]
+                results.append(screen if isinstance(screen, Exception) else self._screen_universe(plan, bulk.get(i, [])))
+                lost = i in cut_keys
+            else:
+                results.append(self.collect(plan, fetched.get(_window(plan), {})))
+                lost = any((*_window(plan), indicator) in cut_keys for indicator in plan.target_indicators)
+            if lost:
+                cut.add(i)
+        return results, cut
+
+    def execute_screen(self, plan: ScreeningPlan) -> List[IndicatorSeries]:
+        """
+        Every country's series for the screened indicator (one bulk fetch), narrowed to
+        plan.target_countries when the universe is a group. Custom universes are a normal plan.
+        """
+        if plan.universe == "custom":
+            return self.execute_plan(plan)
+        return self._screen_universe(plan, self._wait([self._dispatch_all(plan)])[0] or [])
+
+    async def aexecute_screen(self, plan: ScreeningPlan) -> List[IndicatorSeries]:
+        if plan.universe == "custom":
+            return await self.aexecute_plan(plan)
+        return self._screen_universe(plan, (await self._await([self._dispatch_all(plan)]))[0] or [])
+
+    def _wait(self, futures: List[Future]) -> List[Any | None]:
+        """
+        Each future's result, in order, waiting no longer than the request's deadline.
+        Futures cut by the deadline (still running, or stopped by it) give None.
+        """
+        done, pending = wait(futures, timeout=deadline.remaining())
+        results = [self._outcome(future, future in done) for future in futures]
+        self._cut(results.count(None), len(futures), pending)
+        return results
+
+    async def _await(self, futures: List[Future]) -> List[Any | None]:
+        """
+        Async twin of _wait.
+        """
+        if not futures:
+            return []
+        wrapped = [asyncio.wrap_future(future) for future in futures]
+        done, _ = await asyncio.wait(wrapped, timeout=deadline.remaining())
+        results = [self._outcome(waiter, waiter in done) for waiter in wrapped]
+        # Cancel the waiters, not the futures: a waiter passes the cancel on, and one cancelled
+        # cannot be handed a fetch that fails just after we stopped waiting (nobody would read it).
+        self._cut(results.count(None), len(futures), [waiter for waiter in wrapped if waiter not in done])
+        return results
+
+    def _outcome(self, future: Future | asyncio.Future, finished: bool) -> Any | None:
+        if not finished or future.cancelled() or isinstance(future.exception(), deadline.DeadlineExceeded):
+            return None
+        return future.result()
+
+    def _cut(self, lost: int, total: int, pending):
+        """
+        Deadline reached: stops waiting for the pending fetches and marks the answer partial.
+        Cancelling detaches this request; a fetch still queued is dropped once no other request
+        waits on it, and one already running stops at the last waiting request's deadline
+        inside the guard / HTTP client.
+        """
+        for future in pending:
+            future.cancel()
+        if lost:
+            logger.warning(f"Deadline reached: answering without {lost} of {total} fetches.")
+            deadline.mark_partial(f"fetch ({lost} of {total} fetches)")
+
+    def _dispatch_all(self, plan: ScreeningPlan) -> Future:
+        adapter = self._adapter_for(plan.source)
+        if adapter is None or not adapter.supports_all:
+            raise ValueError(f"{plan.source} cannot list every country; name the countries to compare.")
+        indicator = plan.target_indicators[0]
+        start_year, end_year = min(plan.years), max(plan.years)
+        logger.info(f"Screening {indicator} across {plan.universe} countries from {plan.source}.")
+        return self.flights.submit(
+            (plan.source, "*", indicator, start_year, end_year),
+            self.executor,
+            self._fetch_all, adapter, plan.source, indicator, start_year, end_year
+        )
+
+    def _screen_universe(self, plan: ScreeningPlan, series_list: List[IndicatorSeries]) -> List[IndicatorSeries]:
+        if plan.target_countries:
+            members = set(plan.target_countries)
+            series_list = [series for series in series_list if series.country in members]
+        return [series for series in series_list if len(series)]
+
+    def _adapter_for(self, name: str) -> BaseAdapter | None:
+        source = self.sources.get(name)
+        return source.adapter if source is not None else None
+
+    def _dispatch(self, plan: AnalysisPlan) -> List[Future]:
+        """
+        FAN OUT: submits every fetch of the plan to the pool at once
+        (or joins an identical fetch another request already has in flight).
+        Each future resolves to {(country, indicator): IndicatorSeries}.
+        """
         logger.info(f"Executing fetch loop for {len(plan.target_countries)} countries and {len(plan.target_indicators)} indicators.")
-        
+
+        adapter = self._adapter_for(plan.source)
+        if adapter is None:
+            logger.warning(f"Unknown source: {plan.source}")
+            return []
+
+        start_year, end_year = min(plan.years), max(plan.years)
+
+        # Several countries + a batch-capable source: one request per indicator covers every country.
+        # Otherwise: one task per (country, indicator) pair.
+        # Keys ignore country order: the result is a dict, so "USA;CHN" and "CHN;USA" are the same fetch.
+        if len(plan.target_countries) > 1 and adapter.supports_batch:
+            return [
+                self.flights.submit(
+                    (plan.source, tuple(sorted(plan.target_countries)), indicator, start_year, end_year),
+                    self.executor,
+                    self._fetch_batch, adapter, plan.source, plan.target_countries, indicator, start_year, end_year
+                )
+                for indicator in plan.target_indicators
+            ]
+        return [
+            self.flights.submit(
+                (plan.source, country, indicator, start_year, end_year),
+                self.executor,
+                self._fetch_pair, adapter, plan.source, country, indicator, start_year, end_year
+            )
+            for country in plan.target_countries for indicator in plan.target_indicators
+        ]
+
+    def collect(self, plan: AnalysisPlan, fetched: Dict[Tuple[str, str], IndicatorSeries]) -> List[IndicatorSeries]:
+        """
+        FAN IN: walks the plan order so the output order matches the serial loop.
+        """
+        results = []
         for country in plan.target_countries:
             for indicator in plan.target_indicators:
-                try:
-                    logger.debug(f"Fetching {country} - {indicator} from {plan.source}")
-                    
-                    if plan.source == "WORLDBANK":
-                        data = self.wb_adapter.fetch_data(
-                            country, indicator, min(plan.years), max(plan.years)
-                        )
-                    elif plan.source == "OECD":
-                        data = self.oecd_adapter.fetch_data(
-                            country, indicator, min(plan.years), max(plan.years)
-                        )
-                    else:
-                        logger.warning(f"Unknown source: {plan.source}")
-                        continue 
-                    
-                    if data.data:
-                        results.append(data)
-                    else:
-                        logger.warning(f"No data returned for {country} - {indicator}")
-
-                except Exception as e:
-                    logger.error(f"Fetch Error [{country}-{indicator}]: {e}")
-                    
-        return results
\ No newline at end of file
+                data = fetched.get((country, indicator))
+                if data is None:
+                    continue
+                if len(data):
+                    results.append(data)
+                else:
+                    logger.warning(f"No data returned for {country} - {indicator}")
+
+        return results
+
+    def _fetch_pair(self, adapter: BaseAdapter, source: str, country: str, indicator: str,
+                    start_year: int, end_year: int) -> Dict[Tuple[str, str], IndicatorSeries]:
+        """
+        Runs on a worker thread. Failures are isolated per pair:
+        an error is logged and nothing is returned instead of failing the whole plan.
+        Running out of time is not a failure; DeadlineExceeded goes back to the waiting request.
+        """
+        try:
+            logger.debug(f"Fetching {country} - {indicator} from {source}")
+            series = self._timed_fetch(adapter, source, country, indicator, start_year, end_year)
+            return {(country, indicator): series}
+        except deadline.DeadlineExceeded:
+            raise  # cut, not failed: the caller accounts for it
+        except Exception as e:
+            logger.error(f"Fetch Error [{country}-{indicator}]: {e}")
+            return {}
+
+    def _fetch_batch(self, adapter: BaseAdapter, source: str, countries: List[str], indicator: str,
+                     start_year: int, end_year: int) -> Dict[Tuple[str, str], IndicatorSeries]:
+        """
+        Batch counterpart of _fetch_pair. A failed batch (e.g. one code the source rejects fails
+        the whole request) is retried country by country, so only the bad country is dropped.
+        """
+        try:
+            logger.debug(f"Batch fetching {indicator} for {countries} from {source}")
+            series_list = self._timed_batch(adapter, source, countries, indicator, start_year, end_year)
+            return {(series.country, indicator): series for series in series_list}
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Batch Fetch Error [{indicator}]: {e}. Retrying per country.")
+
+        # On this worker, one after another: queueing them on the (possibly full) pool could deadlock.
+        fetched = {}
+        for country in countries:
+            fetched.update(self._fetch_pair(adapter, source, country, indicator, start_year, end_year))
+        return fetched
+
+    def _fetch_all(self, adapter: BaseAdapter, source: str, indicator: str,
+                   start_year: int, end_year: int) -> List[IndicatorSeries]:
+        """
+        Bulk counterpart of _fetch_batch (every country). A failure screens nothing.
+        """
+        try:
+            return self._timed_all(adapter, source, indicator, start_year, end_year)
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Bulk Fetch Error [{indicator}]: {e}")
+            return []
+
+    def _timed_fetch(self, adapter: BaseAdapter, source: str, country: str, indicator: str,
+                     start_year: int, end_year: int) -> IndicatorSeries:
+        # Cache included. Waiting for the source's slots/tokens only happens on a miss, inside the adapter,
+        # and neither that wait nor the HTTP call outlasts the fetch's deadline (the latest of the requests
+        # waiting on it, see SingleFlight.submit).
+        with tracing.span("adapter.fetch", tracing.ADAPTER_SECONDS, (source, "pair"),
+                          source=source, country=country, indicator=indicator) as span:
+            series = adapter.fetch_data(country, indicator, start_year, end_year)
+            span["points"] = len(series)
+        return series
+
+    def _timed_batch(self, adapter: BaseAdapter, source: str, countries: List[str], indicator: str,
+                     start_year: int, end_year: int) -> List[IndicatorSeries]:
+        with tracing.span("adapter.fetch_batch", tracing.ADAPTER_SECONDS, (source, "batch"),
+                          source=source, countries=countries, indicator=indicator) as span:
+            series_list = adapter.fetch_batch(countries, indicator, start_year, end_year)
+            span["points"] = sum(len(series) for series in series_list)
+        return series_list
+
+    def _timed_all(self, adapter: BaseAdapter, source: str, indicator: str,
+                   start_year: int, end_year: int) -> List[IndicatorSeries]:
+        with tracing.span("adapter.fetch_all", tracing.ADAPTER_SECONDS, (source, "all"),
+                          source=source, indicator=indicator) as span:
+            series_list = adapter.fetch_all(indicator, start_year, end_year)
+            span["points"] = sum(len(series) for series in series_list)
+            span["countries"] = len(series_list)
+        return series_list
+
+def _window(plan: AnalysisPlan) -> Tuple[str, int, int]:
+    return plan.source, min(plan.years), max(plan.years)
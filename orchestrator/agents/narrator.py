@@ -1,21 +1,34 @@
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import json
+import hashlib
+from typing import AsyncIterator
 
 from orchestrator.logger import get_logger
+from orchestrator.llm import LazyModel, DEFAULT_MODEL, request_options
+from orchestrator.cache import TTLCache
+from orchestrator import tracing
+from data.store import SHARED_STORE_PATH
+from data import deadline
 
-load_dotenv()
 logger = get_logger("NarratorAgent")
 
+# NARRATIVE CACHE SETTINGS
+# The key covers the rendered prompt and the full stats (chart data included), so refreshed
+# series with revised values get a fresh narrative, while identical data reuses the old one.
+NARRATIVE_CACHE_SIZE = int(os.getenv("NARRATIVE_CACHE_SIZE", "512"))
+NARRATIVE_CACHE_TTL = int(os.getenv("NARRATIVE_CACHE_TTL", str(24 * 3600)))
+NARRATIVE_CACHE_PATH = os.getenv("NARRATIVE_CACHE_PATH") or SHARED_STORE_PATH
+
 class NarratorAgent:
+    # Gemini is set up on the first narrative, not at startup.
+    model = LazyModel()
+
     def __init__(self):
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
            logger.warning("GEMINI_API_KEY missing. Narrator disabled.")
-           self.model = None
-        else:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-flash-latest')
+        self.cache = TTLCache("narratives", max_entries=NARRATIVE_CACHE_SIZE, ttl=NARRATIVE_CACHE_TTL,
+                              disk_path=NARRATIVE_CACHE_PATH)
 
     def summarize(self, country: list | str, indicator: list | str, stats: dict) -> str:
         """
@@ -26,6 +39,93 @@ class NarratorAgent:
         if not self.model:
             return "Narrator disabled."
 
+        prompt = self._build_prompt(country, indicator, stats)
+        key = self._cache_key(prompt, stats)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # 3. GENERATE
+        try:
+            with tracing.span("llm.narrator", tracing.LLM_SECONDS, ("narrator",)) as span:
+                response = self.model.generate_content(prompt, request_options=request_options())
+                tracing.record_llm_usage("narrator", response, span)
+            return self._store(key, response.text.strip())
+        except Exception as e:
+            self._check_deadline(e)
+            logger.error(f"Narrator failed: {e}")
+            return f"Error generation narrative: {str(e)}"
+
+    async def asummarize(self, country: list | str, indicator: list | str, stats: dict) -> str:
+        """
+        Async twin of summarize: the Gemini call does not block the event loop.
+        """
+        if not self.model:
+            return "Narrator disabled."
+
+        prompt = self._build_prompt(country, indicator, stats)
+        key = self._cache_key(prompt, stats)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            with tracing.span("llm.narrator", tracing.LLM_SECONDS, ("narrator",)) as span:
+                response = await self.model.generate_content_async(prompt, request_options=request_options())
+                tracing.record_llm_usage("narrator", response, span)
+            return self._store(key, response.text.strip())
+        except Exception as e:
+            self._check_deadline(e)
+            logger.error(f"Narrator failed: {e}")
+            return f"Error generation narrative: {str(e)}"
+
+    async def astream_summary(self, country: list | str, indicator: list | str, stats: dict) -> AsyncIterator[str]:
+        """
+        Streams the narrative as Gemini produces it, chunk by chunk.
+        """
+        if not self.model:
+            yield "Narrator disabled."
+            return
+
+        prompt = self._build_prompt(country, indicator, stats)
+        key = self._cache_key(prompt, stats)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        try:
+            with tracing.span("llm.narrator", tracing.LLM_SECONDS, ("narrator",), stream=True) as span:
+                response = await self.model.generate_content_async(prompt, stream=True, request_options=request_options())
+                chunks = []
+                async for chunk in response:
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield chunk.text
+                # Usage is only complete once the stream is drained.
+                tracing.record_llm_usage("narrator", response, span)
+            self._store(key, "".join(chunks).strip())
+        except Exception as e:
+            self._check_deadline(e)
+            logger.error(f"Narrator failed: {e}")
+            yield f"Error generation narrative: {str(e)}"
+
+    def _check_deadline(self, e: Exception):
+        # Out of time is not a narrator failure: the orchestrator answers without a narrative instead.
+        if deadline.expired():
+            raise deadline.DeadlineExceeded("Deadline reached while writing the narrative") from e
+
+    def _cache_key(self, prompt: str, stats: dict) -> str:
+        fingerprint = json.dumps(stats, sort_keys=True, default=str)
+        return hashlib.sha256(f"{DEFAULT_MODEL}\n{prompt}\n{fingerprint}".encode()).hexdigest()
+
+    def _store(self, key: str, narrative: str) -> str:
+        # Failures are returned above as error text and never cached; neither are empty answers.
+        if narrative:
+            self.cache.set(key, narrative)
+        return narrative
+
+    def _build_prompt(self, country: list | str, indicator: list | str, stats: dict) -> str:
         # 1. DETECT MODE (Single vs Multi)
         # We look at the data_sources to see how many unique countries we actually have data for.
         sources = stats.get('data_sources', [])
@@ -46,13 +146,13 @@ class NarratorAgent:
 
         is_comparison = len(unique_countries) > 1
         
-        # Get primary country name for the prompt
-        primary_country = list(unique_countries)[0] if unique_countries else "the target region"
+        # Get primary country name for the prompt (sorted: set order would change the prompt, and the cache key, per process)
+        primary_country = sorted(unique_countries)[0] if unique_countries else "the target region"
         logger.info(f"Generating narrative. Mode: {'COMPARISON' if is_comparison else 'DEEP_DIVE'}")
         # 2. SELECT PROMPT
         if is_comparison:
             # --- MODE A: COMPARATIVE (New Logic) ---
-            print(f"[Narrator] Detected Comparison between {unique_countries}")
+            print(f"[Narrator] Detected Comparison between {sorted(unique_countries)}")
             prompt = f"""
             You are a Senior Economic Analyst.
             
@@ -100,10 +200,4 @@ class NarratorAgent:
             Combine the facts and context into a smooth, professional paragraph and bullet points. Use Markdown formatting (###, **, -).
             """
 
-        # 3. GENERATE
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
-        except Exception as e:
-            logger.error(f"Narrator failed: {e}")
-            return f"Error generation narrative: {str(e)}"
\ No newline at end of file
+        return prompt
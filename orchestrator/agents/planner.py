@@ -1,30 +1,30 @@
 import os
 import json
-import google.generativeai as genai
-from dotenv import load_dotenv
-from orchestrator.schemas import AnalysisPlan
+import asyncio
+from typing import Dict, List, Tuple
+from orchestrator.schemas import AnalysisPlan, DEFAULT_YEARS
+from orchestrator.cache import TTLCache
+from orchestrator.singleflight import SingleFlight, AsyncSingleFlight
+from orchestrator import tracing
+from orchestrator.query_normalizer import normalize_query, extract_countries
 from orchestrator.logger import get_logger
+from orchestrator.llm import LazyModel, request_options
+from data.store import SHARED_STORE_PATH
+from data import deadline
 
-load_dotenv()
 logger = get_logger("PlannerAgent")
 
-class PlannerAgent:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            logger.critical("GEMINI_API_KEY is missing!")
-            raise ValueError("GEMINI_API_KEY required for Planner")
-        
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-flash-latest')
-
-    def create_plan(self, query: str) -> AnalysisPlan:
-        logger.info(f"Designing plan for query: '{query}'")
-
-        prompt = f"""
-        You are an Expert Data Planner.
-        USER QUERY: "{query}"
+# PLAN CACHE SETTINGS
+# PLAN_CACHE_PATH enables the on-disk tier (plans then survive restarts).
+# With several workers it defaults to the shared store, so a plan made by one worker serves all.
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", "1024"))
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", str(24 * 3600)))
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH") or SHARED_STORE_PATH
+# Batch planning: questions per LLM call (larger chunks risk truncated or misaligned JSON).
+PLAN_BATCH_SIZE = int(os.getenv("PLAN_BATCH_SIZE", "20"))
 
+# What the model can pick from, shared by the single and the batch prompt.
+PLANNING_GUIDE = """
         AVAILABLE METRICS:
         1. WORLDBANK:
            - GDP Growth: "NY.GDP.MKTP.KD.ZG"
@@ -41,7 +41,159 @@ class PlannerAgent:
         3. **Indicators**: Pick the most relevant indicator code.
         4. **Context**: If GDP/Unemployment is asked, ALWAYS add "FP.CPI.TOTL.ZG" (Inflation) as secondary.
         5. **Source**: Choose WORLDBANK or OECD.
+"""
+
+class PlannerAgent:
+    # Gemini is set up on the first LLM plan, not at startup.
+    model = LazyModel()
+
+    def __init__(self):
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            # The rule-based router and cached plans still work; only LLM planning is refused.
+            logger.critical("GEMINI_API_KEY is missing! Only rule-based plans are available.")
+
+        self.plan_cache = TTLCache("plans", max_entries=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL, disk_path=PLAN_CACHE_PATH)
+        # Same key as the cache: a burst of identical questions makes one LLM call, not one each.
+        self.flights = SingleFlight("plans")
+        self.async_flights = AsyncSingleFlight("plans_async")
+
+    def create_plan(self, query: str) -> AnalysisPlan:
+        # 1. Near-identical phrasings share one cache entry, so repeats skip the LLM entirely.
+        key = normalize_query(query)
+        cached = self.plan_cache.get(key)
+        if cached is not None:
+            logger.info(f"Plan cache HIT for '{query}' (key: '{key}')")
+            return self._from_cache(cached, query)
+
+        # 2. Concurrent misses for the same key wait for the first caller's LLM call.
+        def plan_and_cache() -> dict:
+            plan = self._plan_with_llm(query).model_dump(exclude={"original_query"})
+            self.plan_cache.set(key, plan)
+            return plan
+
+        return self._from_cache(self.flights.do(key, plan_and_cache), query)
+
+    async def acreate_plan(self, query: str) -> AnalysisPlan:
+        """
+        Async twin of create_plan: the Gemini call does not block the event loop.
+        """
+        key = normalize_query(query)
+        cached = self.plan_cache.get(key)
+        if cached is not None:
+            logger.info(f"Plan cache HIT for '{query}' (key: '{key}')")
+            return self._from_cache(cached, query)
+
+        async def plan_and_cache() -> dict:
+            plan = (await self._aplan_with_llm(query)).model_dump(exclude={"original_query"})
+            self.plan_cache.set(key, plan)
+            return plan
+
+        return self._from_cache(await self.async_flights.do(key, plan_and_cache), query)
+
+    async def acreate_plans(self, queries: List[str]) -> List[AnalysisPlan | Exception]:
+        """
+        Plans many questions with as few LLM calls as possible: cache hits first, then the
+        distinct misses in chunks of PLAN_BATCH_SIZE, one JSON-mode call per chunk (run concurrently).
+        Returns, in order, each question's plan or its planning error.
+        """
+        keys = [normalize_query(query) for query in queries]
+        planned: Dict[str, dict | Exception] = {}
+        misses: Dict[str, str] = {}  # key -> first question with that key
+        for query, key in zip(queries, keys):
+            if key in planned or key in misses:
+                continue
+            cached = self.plan_cache.get(key)
+            if cached is not None:
+                planned[key] = cached
+            else:
+                misses[key] = query
+
+        pending = list(misses.items())
+        chunks = [pending[i:i + PLAN_BATCH_SIZE] for i in range(0, len(pending), PLAN_BATCH_SIZE)]
+        if chunks:
+            logger.info(f"Batch planning: {len(queries)} questions, {len(pending)} to plan in {len(chunks)} LLM call(s).")
+        for result in await asyncio.gather(*(self._aplan_chunk(chunk) for chunk in chunks)):
+            planned.update(result)
+
+        return [planned[key] if isinstance(planned[key], Exception) else self._from_cache(planned[key], query)
+                for query, key in zip(queries, keys)]
+
+    async def _aplan_chunk(self, chunk: List[Tuple[str, str]]) -> Dict[str, dict | Exception]:
+        """
+        One LLM call for a chunk of (key, question). A failed call fails every question in it;
+        a bad entry only its own question.
+        """
+        try:
+            self._require_model()
+        except ValueError as e:
+            return {key: e for key, _ in chunk}
+        try:
+            with tracing.span("llm.planner", tracing.LLM_SECONDS, ("planner",), questions=len(chunk)) as span:
+                response = await self.model.generate_content_async(
+                    self._build_batch_prompt([query for _, query in chunk]),
+                    generation_config={"response_mime_type": "application/json"},
+                    request_options=request_options()
+                )
+                tracing.record_llm_usage("planner", response, span)
+            entries = self._parse_batch(response.text, len(chunk))
+        except Exception as e:
+            error = self._planning_error(e)
+            return {key: error for key, _ in chunk}
+
+        planned = {}
+        for (key, query), entry in zip(chunk, entries):
+            try:
+                plan = self._plan_from_data(query, entry).model_dump(exclude={"original_query"})
+            except Exception as e:
+                planned[key] = self._planning_error(e)
+                continue
+            self.plan_cache.set(key, plan)
+            planned[key] = plan
+        return planned
+
+    def _from_cache(self, cached: dict, query: str) -> AnalysisPlan:
+        """
+        Rebuilds a cached (or shared in-flight) plan for this exact query.
+        The key ignores word order, so follow the order the countries are mentioned in this time.
+        """
+        countries = cached["target_countries"]
+        mentioned = extract_countries(query)
+        if set(mentioned) == set(countries):
+            countries = mentioned
+        return AnalysisPlan(**{**cached, "original_query": query, "target_countries": countries})
+
+    def _plan_with_llm(self, query: str) -> AnalysisPlan:
+        logger.info(f"Designing plan for query: '{query}'")
+        self._require_model()
+        try:
+            with tracing.span("llm.planner", tracing.LLM_SECONDS, ("planner",)) as span:
+                response = self.model.generate_content(self._build_prompt(query), request_options=request_options())
+                tracing.record_llm_usage("planner", response, span)
+            return self._parse_plan(query, response.text)
+        except Exception as e:
+            raise self._planning_error(e)
+
+    async def _aplan_with_llm(self, query: str) -> AnalysisPlan:
+        logger.info(f"Designing plan for query: '{query}'")
+        self._require_model()
+        try:
+            with tracing.span("llm.planner", tracing.LLM_SECONDS, ("planner",)) as span:
+                response = await self.model.generate_content_async(self._build_prompt(query), request_options=request_options())
+                tracing.record_llm_usage("planner", response, span)
+            return self._parse_plan(query, response.text)
+        except Exception as e:
+            raise self._planning_error(e)
+
+    def _require_model(self):
+        if self.model is None:
+            raise ValueError("GEMINI_API_KEY required for the Planner. Try a simpler question (e.g. 'GDP growth India vs China').")
 
+    def _build_prompt(self, query: str) -> str:
+        return f"""
+        You are an Expert Data Planner.
+        USER QUERY: "{query}"
+{PLANNING_GUIDE}
         RETURN JSON ONLY:
         {{
             "target_countries": ["ISO_CODE_1", "ISO_CODE_2"], 
@@ -51,33 +203,73 @@ class PlannerAgent:
         }}
         """
 
-        try:
-            response = self.model.generate_content(prompt)
-            clean_json = response.text.strip().replace("```json", "").replace("```", "")
-            data = json.loads(clean_json)
-
-            logger.info(f"AI Plan Generated: {data}")
-
-            # VALIDATION CHECK
-            # If the AI couldn't find any countries, we shouldn't default to USA.
-            # We should tell the user to be more specific.
-            if not data.get("target_countries"):
-                raise ValueError("No valid countries found in query. Please mention a country (e.g., 'India', 'France').")
-
-            return AnalysisPlan(
-                original_query=query,
-                source=data["source"],
-                topic=data["topic"],
-                target_countries=data["target_countries"],
-                target_indicators=data["target_indicators"],
-                years=[2018, 2019, 2020, 2021, 2022]
-            )
-
-        except json.JSONDecodeError:
+    def _build_batch_prompt(self, queries: List[str]) -> str:
+        numbered = "\n".join(f'        {i}. {json.dumps(query)}' for i, query in enumerate(queries, 1))
+        return f"""
+        You are an Expert Data Planner. Plan each of these questions independently.
+        USER QUERIES:
+{numbered}
+{PLANNING_GUIDE}
+        RETURN A JSON ARRAY ONLY, one object per question, in the same order:
+        [
+            {{
+                "index": 1,
+                "target_countries": ["ISO_CODE_1", "ISO_CODE_2"],
+                "target_indicators": ["PRIMARY_CODE", "CONTEXT_CODE"],
+                "source": "WORLDBANK_OR_OECD",
+                "topic": "economic_analysis"
+            }}
+        ]
+        """
+
+    def _parse_plan(self, query: str, response_text: str) -> AnalysisPlan:
+        clean_json = response_text.strip().replace("```json", "").replace("```", "")
+        return self._plan_from_data(query, json.loads(clean_json))
+
+    def _parse_batch(self, response_text: str, count: int) -> List[dict]:
+        """
+        The batch answer as one dict per question (an empty dict where the model skipped one).
+        Entries are matched on "index" when the model gives it, otherwise by position.
+        """
+        clean_json = response_text.strip().replace("```json", "").replace("```", "")
+        data = json.loads(clean_json)
+        if isinstance(data, dict):
+            data = data.get("plans", [])
+        entries = [{} for _ in range(count)]
+        for position, entry in enumerate(data):
+            if not isinstance(entry, dict):
+                continue
+            index = entry.get("index", position + 1)
+            if isinstance(index, int) and 1 <= index <= count:
+                entries[index - 1] = entry
+        return entries
+
+    def _plan_from_data(self, query: str, data: dict) -> AnalysisPlan:
+        logger.info(f"AI Plan Generated: {data}")
+
+        # VALIDATION CHECK
+        # If the AI couldn't find any countries, we shouldn't default to USA.
+        # We should tell the user to be more specific.
+        if not data.get("target_countries"):
+            raise ValueError("No valid countries found in query. Please mention a country (e.g., 'India', 'France').")
+
+        return AnalysisPlan(
+            original_query=query,
+            source=data["source"],
+            topic=data["topic"],
+            target_countries=data["target_countries"],
+            target_indicators=data["target_indicators"],
+            years=list(DEFAULT_YEARS)
+        )
+
+    def _planning_error(self, e: Exception) -> Exception:
+        if deadline.expired():
+            logger.error(f"Planning ran out of time: {e}")
+            return deadline.DeadlineExceeded("Deadline reached while planning the query.")
+        if isinstance(e, json.JSONDecodeError):
             logger.error("Planner failed to parse AI response.")
-            raise ValueError("System Error: Planner AI returned invalid JSON. Please try again.")
-            
-        except Exception as e:
-            logger.error(f"Planning failed: {e}", exc_info=True)
-            # STOP THE FALLBACK. Raise the error so the Frontend sees it.
-            raise ValueError(f"Could not plan query: {str(e)}")
\ No newline at end of file
+            return ValueError("System Error: Planner AI returned invalid JSON. Please try again.")
+
+        logger.error(f"Planning failed: {e}", exc_info=True)
+        # STOP THE FALLBACK. Raise the error so the Frontend sees it.
+        return ValueError(f"Could not plan query: {str(e)}")
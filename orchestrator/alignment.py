@@ -0,0 +1,82 @@
+import os
+from typing import List, Optional
+import numpy as np
+from data.canonical import IndicatorSeries
+
+# How chart lines treat a year that a series has no value for:
+# - "null": leave a gap (Chart.js breaks the line there)
+# - "interpolate": straight line between the neighbouring observations (edges stay null)
+GAP_POLICIES = ("null", "interpolate")
+DEFAULT_GAP_POLICY = os.getenv("GAP_POLICY", "null")
+
+class AlignedSeries:
+    """
+    All series outer-joined on year: one row per year that any series has,
+    one column per series.
+    - observed: raw values, NaN where a series has no observation (what the stats use)
+    - filled:   observed with gaps treated per the gap policy (what the charts use)
+    """
+
+    def __init__(self, years: np.ndarray, observed: np.ndarray, filled: np.ndarray, gap_policy: str):
+        self.years = years
+        self.observed = observed
+        self.filled = filled
+        self.gap_policy = gap_policy
+
+    @property
+    def labels(self) -> List[str]:
+        return [str(year) for year in self.years.tolist()]
+
+    def column(self, col: int) -> List[Optional[float]]:
+        """
+        One series as a chart-ready list, None for gaps.
+        """
+        values = self.filled[:, col]
+        return [None if np.isnan(v) else v for v in values.tolist()]
+
+def align_series(data_list: List[IndicatorSeries], gap_policy: str = DEFAULT_GAP_POLICY) -> AlignedSeries:
+    """
+    Single pass over all points, O(total points + years x series).
+    Years are small integers, so each point is placed by offset from the earliest year
+    instead of sorting or hashing.
+    """
+    if gap_policy not in GAP_POLICIES:
+        raise ValueError(f"Unknown gap policy '{gap_policy}'. Expected one of {GAP_POLICIES}")
+
+    arrays = [series.to_numpy() for series in data_list]
+    year_arr = np.concatenate([years for years, _ in arrays]).astype(np.int64)
+    value_arr = np.concatenate([values for _, values in arrays])
+    cols = np.repeat(np.arange(len(data_list)), [len(series) for series in data_list])
+
+    # 1. Scatter every point into a dense [year offset, series] grid.
+    first_year = int(year_arr.min())
+    span = int(year_arr.max()) - first_year + 1
+    grid = np.full((span, len(data_list)), np.nan)
+    grid[year_arr - first_year, cols] = value_arr
+
+    # 2. Drop years no series has (keeps the chart axis to real years).
+    has_value = np.zeros(span, dtype=bool)
+    has_value[year_arr - first_year] = True
+    years = np.arange(first_year, first_year + span)[has_value]
+    observed = grid[has_value]
+
+    # 3. Fill gaps for charting.
+    filled = observed if gap_policy == "null" else _interpolate(years, observed)
+    return AlignedSeries(years, observed, filled, gap_policy)
+
+def _interpolate(years: np.ndarray, observed: np.ndarray) -> np.ndarray:
+    """
+    Linear interpolation of interior gaps, column by column. Leading/trailing gaps stay NaN.
+    """
+    filled = observed.copy()
+    for col in range(observed.shape[1]):
+        valid = ~np.isnan(observed[:, col])
+        if valid.sum() < 2:
+            continue
+        idx = np.flatnonzero(valid)
+        interior = np.zeros_like(valid)
+        interior[idx[0]:idx[-1] + 1] = True
+        gaps = interior & ~valid
+        if gaps.any():
+            filled[gaps, col] = np.interp(years[gaps], years[valid], observed[valid, col])
+    return filled
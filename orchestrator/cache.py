@@ -0,0 +1,111 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from data.store import connect_sqlite
+from orchestrator import tracing
+
+class DiskStore:
+    """
+    Tiny SQLite key/value table with per-entry expiry.
+    Values must be JSON-serialisable. Several processes can share one file (WAL mode).
+    """
+
+    def __init__(self, path: str, namespace: str):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT, key TEXT, value TEXT, expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time() + ttl)
+            )
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time())
+            )
+
+class TTLCache:
+    """
+    In-memory LRU cache where entries also expire after `ttl` seconds.
+    Optionally backed by a DiskStore, which survives restarts: a memory miss
+    falls through to disk, and disk hits are promoted back into memory.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl: float = 3600, disk_path: str | None = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk = DiskStore(disk_path, name) if disk_path else None
+
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    tracing.record_cache_lookup(self.name, "hit")
+                    return value
+                del self._entries[key]
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self._put(key, value, now + self.ttl)
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                tracing.record_cache_lookup(self.name, "disk_hit")
+                return value
+
+        with self._lock:
+            self._counters["misses"] += 1
+        tracing.record_cache_lookup(self.name, "miss")
+        return None
+
+    def set(self, key: str, value: Any):
+        self._put(key, value, time.time() + self.ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, self.ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _put(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
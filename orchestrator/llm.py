@@ -0,0 +1,56 @@
+import threading
+from typing import Any, Dict
+from data import deadline
+
+# google.generativeai is imported on first use: it is the slowest import in the app
+# (~0.9s) and the gateway should answer health checks before it is needed.
+
+DEFAULT_MODEL = "gemini-flash-latest"
+
+_lock = threading.Lock()
+_configured_key: str | None = None
+_models: Dict[str, Any] = {}
+
+def get_model(api_key: str, name: str = DEFAULT_MODEL):
+    """
+    Process-wide Gemini model. genai.configure runs once per process (i.e. once per
+    gateway worker), and every agent that asks for the same model shares one instance.
+    """
+    global _configured_key
+    with _lock:
+        import google.generativeai as genai
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            _models.clear()
+        model = _models.get(name)
+        if model is None:
+            model = _models[name] = genai.GenerativeModel(name)
+        return model
+
+class LazyModel:
+    """
+    Agent attribute that resolves to get_model(agent.api_key) on first access
+    (None without a key). Plain assignment still works, e.g. to swap in a stub.
+    """
+
+    def __set_name__(self, owner, name: str):
+        self.attr = f"_{name}"
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        model = agent.__dict__.get(self.attr)
+        if model is None and agent.api_key:
+            model = agent.__dict__[self.attr] = get_model(agent.api_key)
+        return model
+
+    def __set__(self, agent, model):
+        agent.__dict__[self.attr] = model
+
+def request_options() -> dict:
+    """
+    Per-call Gemini options: the call's timeout is what is left of the request's deadline.
+    """
+    budget = deadline.remaining()
+    return {"timeout": max(budget, 0.1)} if budget is not None else {}
@@ -1,6 +1,10 @@
 import logging
 import sys
 import json
+import contextvars
+
+# The request being served (set by orchestrator.tracing.query_scope). Stamped on every line.
+query_id_var = contextvars.ContextVar("query_id", default=None)
 
 class JsonFormatter(logging.Formatter):
     """
@@ -15,6 +19,12 @@ class JsonFormatter(logging.Formatter):
             "module": record.module,
             "function": record.funcName
         }
+        query_id = query_id_var.get()
+        if query_id is not None:
+            log_record["query_id"] = query_id
+        # Timing spans (orchestrator.tracing) ride along as a structured field
+        if hasattr(record, "span"):
+            log_record["span"] = record.span
         # If there is an exception, capture the stack trace
         if record.exc_info:
             log_record["exception"] = self.formatException(record.exc_info)
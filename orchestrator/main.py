@@ -1,53 +1,371 @@
+import os
+import asyncio
+import threading
+from typing import AsyncIterator, List
+from orchestrator.agents.dataset_router import DatasetRouterAgent
 from orchestrator.agents.planner import PlannerAgent
 from orchestrator.agents.fetcher import FetcherAgent
 from orchestrator.agents.analyst import AnalystAgent
 from orchestrator.agents.narrator import NarratorAgent
+from orchestrator.schemas import ScreeningPlan
+from data import deadline
+from data.deadline import DeadlineExceeded
 from orchestrator.logger import get_logger
+from orchestrator import tracing
 
 # Initialize Logger
 logger = get_logger("Orchestrator")
 
+# BATCH SETTINGS
+# Narratives written at once for one batch (Gemini rate limits, not CPU, are the constraint).
+BATCH_NARRATION_CONCURRENCY = int(os.getenv("BATCH_NARRATION_CONCURRENCY", "4"))
+
+# DEADLINE SETTINGS
+# Seconds of a query's budget held back for the narrative: fetching stops this long before the
+# deadline (or halfway, for short budgets), so a slow upstream costs some series, not the answer.
+NARRATION_RESERVE = float(os.getenv("DEADLINE_NARRATION_RESERVE", "5"))
+
 class AgentOrchestrator:
     def __init__(self):
         logger.info("Initializing Agent Orchestrator...")
+        self.router = DatasetRouterAgent()
         self.planner = PlannerAgent()
         self.fetcher = FetcherAgent()
         self.analyst = AnalystAgent()
         self.narrator = NarratorAgent()
         logger.info("All agents initialized successfully.")
 
-    def run_pipeline(self, user_query: str):
-        logger.info(f"Received Query: {user_query}")
-        
-        try:
+        # How each query got its plan: rule-based fast path or screening, or the (cached) LLM planner.
+        self._plan_paths = {"fast_path": 0, "screening": 0, "planner": 0}
+        self._plan_paths_lock = threading.Lock()
+
+    def run_pipeline(self, user_query: str, query_id: str | None = None, timeout: float | None = None):
+        # Every log line and span below carries the same query_id, and every stage shares one deadline
+        # (timeout seconds, else the enclosing request's, else REQUEST_DEADLINE).
+        with tracing.query_scope(query_id), deadline.scope(timeout), tracing.stage("total"):
+            logger.info(f"Received Query: {user_query}")
+
+            try:
+                # 1. Planning
+                with tracing.stage("plan"):
+                    plan = self._plan(user_query)
+                logger.info(f"Plan Created | Source: {plan.source} | Targets: {plan.target_countries}")
+
+                # 2. Fetching
+                with tracing.stage("fetch") as span, self._fetch_budget():
+                    raw_data_list = self._fetch(plan)
+                    span["series"] = len(raw_data_list)
+                logger.info(f"Fetching Complete | Datasets Retrieved: {len(raw_data_list)}")
+
+                # 3. Analysis
+                with tracing.stage("analyze"):
+                    stats = self._analyze(plan, raw_data_list)
+                logger.info(f"Analysis Complete | Trend: {stats.trend_direction}")
+
+                # 4. Narration
+                with tracing.stage("narrate"):
+                    try:
+                        deadline.check("narration")
+                        narrative = self.narrator.summarize(**self._narration_subject(plan, stats))
+                        logger.info("Narration Generated.")
+                    except DeadlineExceeded:
+                        narrative = self._out_of_time()
+
+                return self.package_result(plan, stats, narrative)
+            except Exception as e:
+                logger.error(f"Pipeline Critical Failure: {str(e)}", exc_info=True)
+                return {"type": "error", "message": str(e)}
+
+    async def arun_pipeline(self, user_query: str, query_id: str | None = None, plan=None, timeout: float | None = None):
+        """
+        Same pipeline as run_pipeline, but every I/O stage is awaited,
+        so one slow query does not freeze the other requests on this worker.
+        A plan already resolved by aplan() skips stage 1.
+        At the deadline, outstanding fetches are dropped and the narrative skipped:
+        the answer is whatever arrived in time, flagged "partial".
+        """
+        with tracing.query_scope(query_id), deadline.scope(timeout), tracing.stage("total"):
+            try:
+                plan, stats = await self.arun_analysis(user_query, plan=plan)
+
+                # 4. Narration
+                with tracing.stage("narrate"):
+                    try:
+                        narrative = await deadline.wait_for(
+                            self.narrator.asummarize(**self._narration_subject(plan, stats)), "narration")
+                        logger.info("Narration Generated.")
+                    except DeadlineExceeded:
+                        narrative = self._out_of_time()
+
+                return self.package_result(plan, stats, narrative)
+            except Exception as e:
+                logger.error(f"Pipeline Critical Failure: {str(e)}", exc_info=True)
+                return {"type": "error", "message": str(e)}
+
+    async def arun_analysis(self, user_query: str, query_id: str | None = None, plan=None, timeout: float | None = None):
+        """
+        Stages 1-3 (plan, fetch, analyze) without narration. Returns (plan, stats); errors propagate.
+        Used directly when the narrative is generated later as a background job.
+        """
+        with tracing.query_scope(query_id), deadline.scope(timeout):
+            logger.info(f"Received Query: {user_query}")
+
             # 1. Planning
-            plan = self.planner.create_plan(user_query)
-            logger.info(f"Plan Created | Source: {plan.source} | Targets: {plan.target_countries}")
-            
+            if plan is None:
+                plan = await self.aplan(user_query)
+
             # 2. Fetching
-            raw_data_list = self.fetcher.execute_plan(plan)
+            with tracing.stage("fetch") as span, self._fetch_budget():
+                raw_data_list = await self._afetch(plan)
+                span["series"] = len(raw_data_list)
             logger.info(f"Fetching Complete | Datasets Retrieved: {len(raw_data_list)}")
-            
-            # 3. Analysis
-            stats = self.analyst.analyze(raw_data_list)
+
+            # 3. Analysis (CPU only, a few milliseconds)
+            with tracing.stage("analyze"):
+                stats = self._analyze(plan, raw_data_list)
             logger.info(f"Analysis Complete | Trend: {stats.trend_direction}")
-            
-            # 4. Narration
-            narrative = self.narrator.summarize(
-                country=plan.target_countries,
-                indicator=plan.target_indicators,
-                stats=stats.model_dump()
-            )
-            logger.info("Narration Generated.")
-            
-            return {
-                "type": "success",
-                "data": {
-                    "source": plan.source,
-                    "narrative": narrative,
-                    "analysis": stats.model_dump()
-                }
+
+            return plan, stats
+
+    async def aplan(self, user_query: str, query_id: str | None = None, timeout: float | None = None):
+        """
+        Stage 1 on its own. The gateway resolves the plan first to key its response cache on it.
+        Raises DeadlineExceeded if the planner is still busy at the deadline.
+        """
+        with tracing.query_scope(query_id), deadline.scope(timeout):
+            with tracing.stage("plan"):
+                plan = await deadline.wait_for(self._aplan(user_query), "planning")
+            logger.info(f"Plan Created | Source: {plan.source} | Targets: {plan.target_countries}")
+            return plan
+
+    async def aplan_many(self, user_queries: List[str], query_id: str | None = None, timeout: float | None = None) -> list:
+        """
+        Stage 1 for a batch: rule-based plans where possible, and one planner call
+        (chunked for long batches) for all the rest. Failed questions get their error instead of a plan.
+        """
+        with tracing.query_scope(query_id), deadline.scope(timeout), tracing.stage("batch_plan", questions=len(user_queries)):
+            plans = [self._rule_plan(query) for query in user_queries]
+            pending = [i for i, plan in enumerate(plans) if plan is None]
+            if pending:
+                try:
+                    planned = await deadline.wait_for(
+                        self.planner.acreate_plans([user_queries[i] for i in pending]), "planning")
+                except DeadlineExceeded as e:
+                    planned = [e] * len(pending)
+                for i, plan in zip(pending, planned):
+                    plans[i] = plan
+            logger.info(f"Batch Planned | {len(user_queries)} questions, {len(pending)} sent to the planner")
+            return plans
+
+    async def arun_batch(self, plans: list, query_id: str | None = None, timeout: float | None = None) -> List[dict]:
+        """
+        Stages 2-4 for many resolved plans: one merged fetch (each unique series once),
+        then analysis and narration per plan. Returns one packaged result per plan, in order;
+        a failing plan gets an error result without failing the others.
+        The whole batch shares one deadline; each answer says whether it was cut short by it.
+        """
+        with tracing.query_scope(query_id), deadline.scope(timeout), tracing.stage("batch", questions=len(plans)):
+            with tracing.stage("batch_fetch") as span, self._fetch_budget():
+                fetched, cut = await self.fetcher.aexecute_plans(plans)
+                span["series"] = sum(len(data) for data in fetched if not isinstance(data, Exception))
+
+            analysed = []
+            with tracing.stage("batch_analyze"):
+                for plan, data in zip(plans, fetched):
+                    try:
+                        if isinstance(data, Exception):
+                            raise data
+                        analysed.append(self._analyze(plan, data))
+                    except Exception as e:
+                        logger.error(f"Batch Analysis Failed [{plan.original_query}]: {e}")
+                        analysed.append(e)
+
+            limit = asyncio.Semaphore(BATCH_NARRATION_CONCURRENCY)
+
+            async def narrate(i, plan, stats) -> dict:
+                if isinstance(stats, Exception):
+                    return {"type": "error", "message": str(stats)}
+                omitted = ["fetch"] if i in cut else []
+                async with limit:
+                    try:
+                        narrative = await deadline.wait_for(
+                            self.narrator.asummarize(**self._narration_subject(plan, stats)), "narration")
+                    except DeadlineExceeded:
+                        narrative = None
+                        omitted.append("narrative")
+                return self.package_result(plan, stats, narrative, omitted=omitted)
+
+            with tracing.stage("batch_narrate"):
+                results = await asyncio.gather(*(narrate(i, plan, stats)
+                                                 for i, (plan, stats) in enumerate(zip(plans, analysed))))
+            logger.info(f"Batch Complete | {len(plans)} plans")
+            return list(results)
+
+    def narrate(self, plan, stats) -> str:
+        """
+        Stage 4 on its own (blocking). Runs on the background narration pool,
+        with a budget of its own: the request that asked for it has already been answered.
+        """
+        with deadline.scope(deadline.REQUEST_DEADLINE), tracing.stage("narrate"):
+            narrative = self.narrator.summarize(**self._narration_subject(plan, stats))
+        logger.info("Narration Generated.")
+        return narrative
+
+    async def astream_pipeline(self, user_query: str, query_id: str | None = None, plan=None,
+                               timeout: float | None = None) -> AsyncIterator[dict]:
+        """
+        Streaming variant of arun_pipeline. Yields one event per stage as soon as it is ready:
+        plan -> data (one per series) -> analysis -> narrative (text chunks) -> done.
+        Errors end the stream with an "error" event. At the deadline the stream skips ahead:
+        "done" then carries partial=True and what was left out.
+        """
+        with tracing.query_scope(query_id), deadline.scope(timeout):
+            logger.info(f"Received Streaming Query: {user_query}")
+
+            try:
+                # 1. Planning
+                if plan is None:
+                    plan = await self.aplan(user_query)
+                yield {"type": "plan", "data": plan.model_dump()}
+
+                # 2. Fetching: push each series the moment its fetch lands
+                # (screens fetch the whole universe in one go; only the ranking is worth streaming)
+                if isinstance(plan, ScreeningPlan):
+                    with tracing.stage("fetch"), self._fetch_budget():
+                        raw_data_list = await self.fetcher.aexecute_screen(plan)
+                else:
+                    fetched = {}
+                    with tracing.stage("fetch"), self._fetch_budget():
+                        async for result in self.fetcher.aiter_plan(plan):
+                            fetched.update(result)
+                            for series in result.values():
+                                if len(series):
+                                    yield {"type": "data", "data": series.model_dump()}
+                    raw_data_list = self.fetcher.collect(plan, fetched)
+                logger.info(f"Fetching Complete | Datasets Retrieved: {len(raw_data_list)}")
+
+                # 3. Analysis: charts can be drawn from here on
+                with tracing.stage("analyze"):
+                    stats = self._analyze(plan, raw_data_list)
+                logger.info(f"Analysis Complete | Trend: {stats.trend_direction}")
+                yield {"type": "analysis", "data": {"source": plan.source, "analysis": stats.model_dump()}}
+
+                # 4. Narration, token by token (each chunk has to arrive before the deadline)
+                with tracing.stage("narrate", stream=True):
+                    chunks = self.narrator.astream_summary(**self._narration_subject(plan, stats))
+                    while True:
+                        try:
+                            text = await deadline.wait_for(anext(chunks), "narration")
+                        except StopAsyncIteration:
+                            logger.info("Narration Streamed.")
+                            break
+                        except DeadlineExceeded:
+                            self._out_of_time()
+                            break
+                        yield {"type": "narrative", "data": text}
+
+                omitted = deadline.omitted()
+                yield {"type": "done", "partial": bool(omitted), "omitted": omitted}
+            except Exception as e:
+                logger.error(f"Pipeline Critical Failure: {str(e)}", exc_info=True)
+                yield {"type": "error", "message": str(e)}
+
+    def package_result(self, plan, stats, narrative: str | None, omitted: List[str] | None = None) -> dict:
+        """
+        omitted: what was left out to meet the deadline (by default, what the current request's deadline
+        recorded). Any at all makes the answer "partial".
+        """
+        omitted = deadline.omitted() if omitted is None else omitted
+        return {
+            "type": "success",
+            "data": {
+                "source": plan.source,
+                "narrative": narrative,
+                "analysis": stats.model_dump(),
+                "partial": bool(omitted),
+                "omitted": omitted
             }
-        except Exception as e:
-            logger.error(f"Pipeline Critical Failure: {str(e)}", exc_info=True)
-            return {"type": "error", "message": str(e)}
\ No newline at end of file
+        }
+
+    def _fetch_budget(self):
+        """
+        Fetching has to stop in time for the narrative: NARRATION_RESERVE seconds before the deadline,
+        or half the budget for short ones.
+        """
+        current = deadline.current()
+        return deadline.reserve(min(NARRATION_RESERVE, current.root.budget / 2) if current is not None else 0)
+
+    def _out_of_time(self) -> None:
+        logger.warning("Deadline reached before the narrative was ready; answering without it.")
+        deadline.mark_partial("narrative")
+        return None
+
+    def _fetch(self, plan):
+        if isinstance(plan, ScreeningPlan):
+            return self.fetcher.execute_screen(plan)
+        return self.fetcher.execute_plan(plan)
+
+    async def _afetch(self, plan):
+        if isinstance(plan, ScreeningPlan):
+            return await self.fetcher.aexecute_screen(plan)
+        return await self.fetcher.aexecute_plan(plan)
+
+    def _analyze(self, plan, raw_data_list):
+        if isinstance(plan, ScreeningPlan):
+            return self.analyst.screen(plan, raw_data_list)
+        return self.analyst.analyze(raw_data_list)
+
+    def _narration_subject(self, plan, stats) -> dict:
+        """
+        Narrator arguments. A screen is narrated about the countries it ranked, not its universe.
+        """
+        countries = plan.target_countries
+        if isinstance(plan, ScreeningPlan):
+            countries = [series.country for series in stats.series_stats]
+        return {"country": countries, "indicator": plan.target_indicators, "stats": stats.model_dump()}
+
+    def _plan(self, user_query: str):
+        """
+        Tries the rule-based router first (microseconds), and only falls back
+        to the LLM planner when the router is not confident.
+        """
+        plan = self._rule_plan(user_query)
+        return plan if plan is not None else self.planner.create_plan(user_query)
+
+    async def _aplan(self, user_query: str):
+        plan = self._rule_plan(user_query)
+        return plan if plan is not None else await self.planner.acreate_plan(user_query)
+
+    def _rule_plan(self, user_query: str):
+        """
+        Screening plan for ranking questions ("top 10 countries by ..."), else the router's
+        fast-path plan, else None (the LLM planner's turn). The path is recorded either way.
+        """
+        screen = self.router.screen(user_query)
+        if screen is not None:
+            self._record_path("screening", 1.0)
+            return screen
+        plan, confidence = self.router.plan(user_query)
+        self._record_path("fast_path" if plan is not None else "planner", confidence)
+        return plan
+
+    def _record_path(self, path: str, confidence: float):
+        with self._plan_paths_lock:
+            self._plan_paths[path] += 1
+        logger.info(f"Planning Path: {path} | Router Confidence: {confidence:.2f}")
+
+    def planning_stats(self) -> dict:
+        """
+        Fraction of queries that never reached Gemini (fast path, screening and plan cache hits).
+        """
+        with self._plan_paths_lock:
+            paths = dict(self._plan_paths)
+        cache = self.planner.plan_cache.stats()
+        total = paths["fast_path"] + paths["screening"] + paths["planner"]
+        avoided = paths["fast_path"] + paths["screening"] + cache["hits"] + cache["disk_hits"]
+        return {
+            **paths,
+            "plan_cache_hits": cache["hits"] + cache["disk_hits"],
+            "llm_calls_avoided": avoided,
+            "llm_avoided_ratio": round(avoided / total, 3) if total else 0.0,
+        }
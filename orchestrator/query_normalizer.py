@@ -0,0 +1,57 @@
+import re
+from typing import List
+from data.countries import UPPERCASE_ALIASES, NAME_ALIASES
+
+# Words that change the phrasing but not the plan.
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "in", "for", "to", "vs", "versus", "v", "between",
+    "compare", "comparison", "show", "me", "what", "is", "was", "how", "has", "been", "please",
+}
+
+# Words that turn a name into a different place: "New Mexico", "Northern Ireland", "Latin America".
+REGION_WORDS = {"north", "south", "east", "west", "northern", "southern", "eastern", "western", "latin", "central", "new"}
+
+# Longest alias first, so "united states of america" wins over "united states".
+_UPPER_RE = re.compile(r"\b(" + "|".join(sorted(UPPERCASE_ALIASES, key=len, reverse=True)) + r")\b")
+_NAME_RE = re.compile(r"\b(" + "|".join(re.escape(n) for n in sorted(NAME_ALIASES, key=len, reverse=True)) + r")\b")
+_NON_WORD_RE = re.compile(r"[^\w@]+")
+
+def _tokens(query: str) -> List[str]:
+    """
+    Case-folded word tokens with every country mention replaced by '@ISO3'.
+    """
+    # 1. Capitalised abbreviations / ISO codes must be matched before case-folding.
+    text = _UPPER_RE.sub(lambda m: f" @{UPPERCASE_ALIASES[m.group(1)].lower()} ", query)
+    # 2. Country names, case-insensitively.
+    text = _NAME_RE.sub(lambda m: f" @{NAME_ALIASES[m.group(1)].lower()} ", text.casefold())
+    # 3. Drop punctuation, collapse whitespace.
+    return _NON_WORD_RE.sub(" ", text).split()
+
+def extract_countries(query: str) -> List[str]:
+    """
+    ISO3 codes in order of first mention. "India vs the US" -> ["IND", "USA"]
+    """
+    found = []
+    for token in _tokens(query):
+        if token.startswith("@"):
+            code = token[1:].upper()
+            if code not in found:
+                found.append(code)
+    return found
+
+def has_region_qualifier(query: str) -> bool:
+    """
+    True when a region or compass word precedes a place name outside the alias table
+    ("New Mexico", "Latin America"). Words of an alias ("South Africa") are not counted.
+    """
+    tokens = _tokens(query)
+    return any(token in REGION_WORDS for token in tokens[:-1])
+
+def normalize_query(query: str) -> str:
+    """
+    Cache key for a query. Phrasings that differ only in case, spacing, word order,
+    filler words or country spelling collapse to the same key:
+    "GDP growth India vs China" == "india vs china gdp growth" == "GDP growth of IND and CHN"
+    """
+    tokens = {t for t in _tokens(query) if t not in STOPWORDS}
+    return " ".join(sorted(tokens))
@@ -12,6 +12,9 @@ class QueryResponse(BaseModel):
     status: str
     result: dict | None = None
 
+# Analysis window used by every plan (LLM or rule-based).
+DEFAULT_YEARS = [2018, 2019, 2020, 2021, 2022]
+
 class AnalysisPlan(BaseModel):
     original_query: str
     source: str
@@ -20,9 +23,20 @@ class AnalysisPlan(BaseModel):
     target_indicators: List[str]  # e.g. ["NY.GDP.MKTP.KD.ZG"]
     years: List[int]
 
+class ScreeningPlan(AnalysisPlan):
+    """
+    Rank every country (or a group) on one indicator instead of comparing named countries.
+    target_countries is the universe; empty means every country the source covers.
+    """
+    universe: str = "all"          # "all", a group ("oecd", "g7", "g20") or "custom"
+    metric: str = "average"        # "average" | "change" | "latest", over the plan's years
+    order: str = "desc"            # "desc": highest first, "asc": lowest first
+    trend: Optional[str] = None    # keep only "increasing" / "decreasing" series
+    top_n: int = 10
+
 class ChartDataset(BaseModel):
     label: str
-    data: List[float]
+    data: List[Optional[float]]  # None = no observation for that year (gap)
     borderColor: str
     fill: bool = False
 
@@ -30,6 +44,29 @@ class ChartData(BaseModel):
     labels: List[str]
     datasets: List[ChartDataset]
 
+class SeriesStats(BaseModel):
+    label: str            # e.g. "IND - GDP Growth (%)"
+    country: str
+    indicator: str
+    source: str
+    min_value: float
+    max_value: float
+    average: float
+    trend_direction: str
+    growth_rate: float
+    start_year: int
+    end_year: int
+    points: int
+
+class ScreeningSummary(BaseModel):
+    universe: str
+    metric: str
+    order: str
+    trend: Optional[str] = None
+    candidates: int   # countries with data in the window
+    matched: int      # after the trend filter
+    shown: int        # top-N actually returned
+
 class AnalysisResult(BaseModel):
     min_value: float
     max_value: float
@@ -40,4 +77,6 @@ class AnalysisResult(BaseModel):
     data_sources: List[str] # Essential for the Narrator to know what it's looking at
     chart_data: Optional[ChartData] = None
     summary_chart_data: Optional[ChartData] = None # <--- Add this
-    data_sources: List[str]
\ No newline at end of file
+    data_sources: List[str]
+    series_stats: List[SeriesStats] = [] # One entry per series, same order as data_sources
+    screening: Optional[ScreeningSummary] = None # Set for ranking questions; series are in rank order
\ No newline at end of file
@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Executor, Future, InvalidStateError
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from data import deadline
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+    The first caller (the leader) runs the work; everyone who asks for the same key
+    while it is still running shares its result instead of starting another call.
+    Once the work finishes the key is released, so later calls run again
+    (and normally hit a cache the leader just filled).
+
+    Thread-based: use do() from blocking code and submit() to run the work on a pool.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, "_Flight"] = {}
+        # Reentrant: a flight cancelled under it releases its key (which takes it again) on the same thread.
+        self._lock = threading.RLock()
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Blocking: returns fn()'s result (or raises its error), running fn at most once per in-flight key.
+        """
+        with self._lock:
+            self._counters["calls"] += 1
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight(Future(), self._lock)
+                self._counters["executions"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            try:
+                return flight.future.result()
+            except deadline.DeadlineExceeded:
+                if deadline.expired():
+                    raise
+                return fn()  # the leader's budget ran out; this caller still has time of its own
+
+        try:
+            flight.future.set_result(fn())
+        except BaseException as e:
+            flight.future.set_exception(e)
+        finally:
+            self._release(key, flight)
+        return flight.future.result()
+
+    def submit(self, key: Hashable, executor: Executor, fn: Callable[..., Any], *args) -> Future:
+        """
+        Non-blocking: returns a Future for fn(*args) run on `executor`, shared with any identical call in flight.
+        Every caller gets its own Future. Cancelling it only detaches that caller;
+        the underlying call is cancelled once every caller has detached (if it has not started yet).
+
+        fn runs in a copy of the leader's context, but under a deadline of its own: the latest of
+        its callers' (see deadline.shared). Each caller still stops waiting at its own deadline.
+        """
+        with self._lock:
+            self._counters["calls"] += 1
+            flight = self._in_flight.get(key)
+            # A flight everyone left is cancelled; its key is released once the leader's callback is in.
+            leader = flight is None or flight.future.cancelled()
+            if leader:
+                shared = deadline.shared()
+                future = executor.submit(contextvars.copy_context().run, deadline.call_with, shared, fn, *args)
+                flight = self._in_flight[key] = _Flight(future, self._lock, shared)
+                self._counters["executions"] += 1
+            else:
+                flight.deadline.extend(deadline.current())
+                self._counters["coalesced"] += 1
+            child = flight.follow()
+
+        # Outside the lock: a call that already finished runs the callback right here.
+        if leader:
+            flight.future.add_done_callback(lambda _, k=key, f=flight: self._release(k, f))
+        return child
+
+    def _release(self, key: Hashable, flight: "_Flight"):
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = len(self._in_flight)
+        return {
+            "name": self.name,
+            **counters,
+            "in_flight": in_flight,
+            "coalesced_ratio": round(counters["coalesced"] / counters["calls"], 3) if counters["calls"] else 0.0,
+        }
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines on the event loop: concurrent awaits of the same key share one task.
+    A waiter being cancelled does not cancel the shared task (other waiters still need it).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._counters["calls"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._in_flight[key] = task
+            self._counters["executions"] += 1
+            task.add_done_callback(lambda t, k=key: self._in_flight.pop(k, None) if self._in_flight.get(k) is t else None)
+        else:
+            self._counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        counters = dict(self._counters)
+        return {
+            "name": self.name,
+            **counters,
+            "in_flight": len(self._in_flight),
+            "coalesced_ratio": round(counters["coalesced"] / counters["calls"], 3) if counters["calls"] else 0.0,
+        }
+
+class _Flight:
+    """
+    One in-flight call plus the per-caller Futures that mirror it.
+    """
+
+    def __init__(self, future: Future, lock: threading.RLock, shared: deadline.Deadline | None = None):
+        self.future = future
+        self.deadline = shared
+        self._followers = 0
+        # The SingleFlight's lock: joining and abandoning a flight cannot interleave.
+        self._lock = lock
+
+    def follow(self) -> Future:
+        child = Future()
+        with self._lock:
+            self._followers += 1
+
+        def copy_result(source: Future):
+            try:
+                if source.cancelled():
+                    child.cancel()
+                elif source.exception() is not None:
+                    child.set_exception(source.exception())
+                else:
+                    child.set_result(source.result())
+            except InvalidStateError:
+                pass  # this caller cancelled in the meantime
+
+        def detach(c: Future):
+            if c.cancelled():
+                with self._lock:
+                    self._followers -= 1
+                    if self._followers == 0:
+                        self.future.cancel()
+
+        child.add_done_callback(detach)
+        self.future.add_done_callback(copy_result)
+        return child
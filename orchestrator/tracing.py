@@ -0,0 +1,213 @@
+import os
+import time
+import uuid
+import bisect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from orchestrator.logger import get_logger, query_id_var
+
+logger = get_logger("Tracing")
+
+# 1. METRICS
+# Just enough of the Prometheus text format for histograms, counters and gauges,
+# so /metrics needs no extra dependency.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1_000, 2_000, 4_000, 8_000)
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"{bound}\"}} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{{{base}{',' if base else ''}le=\"+Inf\"}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_labels(self.labelnames, labels)}}} {value}")
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{{{_labels(self.labelnames, labels)}}} {value}")
+        return lines
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+
+STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Time spent in each pipeline stage.", ["stage"], LATENCY_BUCKETS)
+ADAPTER_SECONDS = Histogram("adapter_fetch_seconds", "Adapter calls, cache included.", ["source", "mode"], LATENCY_BUCKETS)
+UPSTREAM_SECONDS = Histogram("upstream_request_seconds", "Upstream HTTP attempts.", ["host", "status"], LATENCY_BUCKETS)
+UPSTREAM_BYTES = Histogram("upstream_response_bytes", "Upstream HTTP response body size.", ["host"], BYTES_BUCKETS)
+LLM_SECONDS = Histogram("llm_request_seconds", "Gemini calls.", ["agent"], LATENCY_BUCKETS)
+LLM_TOKENS = Histogram("llm_tokens", "Tokens per Gemini call.", ["agent", "kind"], TOKEN_BUCKETS)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by result.", ["cache", "result"])
+STARTUP_SECONDS = Gauge("startup_seconds", "Seconds from process start to each startup milestone.", ["milestone"])
+
+METRICS = [STAGE_SECONDS, ADAPTER_SECONDS, UPSTREAM_SECONDS, UPSTREAM_BYTES, LLM_SECONDS, LLM_TOKENS, CACHE_LOOKUPS,
+           STARTUP_SECONDS]
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+_IMPORTED_AT = time.time()
+
+def process_age() -> float:
+    """
+    Seconds since this process started (interpreter start-up included, read from /proc on Linux;
+    elsewhere, counted from the import of this module).
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time() - _IMPORTED_AT
+
+def record_startup(milestone: str) -> float:
+    seconds = round(process_age(), 3)
+    STARTUP_SECONDS.set(seconds, milestone)
+    logger.info(f"Startup milestone {milestone} after {seconds}s", extra={"span": {"name": f"startup.{milestone}", "duration_ms": seconds * 1000}})
+    return seconds
+
+# 2. SPANS
+# A span times one unit of work, feeds a histogram, and logs one JSON line
+# ({"span": {...}}) carrying the query_id of the request it belongs to.
+@contextmanager
+def query_scope(query_id: str | None = None) -> Iterator[str]:
+    """
+    Sets the query_id for everything logged inside. Without an id, an enclosing scope's id
+    is kept (or a fresh one made), so nested entry points share one id per request.
+    """
+    current = query_id_var.get()
+    if query_id is None and current is not None:
+        yield current
+        return
+    token = query_id_var.set(query_id or uuid.uuid4().hex)
+    try:
+        yield query_id_var.get()
+    finally:
+        try:
+            query_id_var.reset(token)
+        except ValueError:
+            pass  # async generator closed from another context; that context dies with it
+
+def bind(fn: Callable, *args) -> Callable:
+    """
+    fn(*args) as a callable that runs in a copy of the current context,
+    so work handed to a thread pool keeps the caller's query_id.
+    """
+    return functools.partial(contextvars.copy_context().run, fn, *args)
+
+@contextmanager
+def span(name: str, metric: Histogram | None = None, labels: Tuple[str, ...] = (), **attrs) -> Iterator[dict]:
+    """
+    with span("stage.fetch", STAGE_SECONDS, ("fetch",), countries=3) as s:
+        ...
+        s["series"] = 5   # attributes can be added while the span is open
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if metric is not None:
+            metric.observe(elapsed, *labels)
+        record = {"name": name, "duration_ms": round(elapsed * 1000, 2), **attrs}
+        if error:
+            record["error"] = error
+        logger.info(f"span {name} {record['duration_ms']}ms", extra={"span": record})
+
+def stage(name: str, **attrs):
+    return span(f"stage.{name}", STAGE_SECONDS, (name,), **attrs)
+
+# 3. HOOKS for the data layer (which does not import the orchestrator)
+def record_upstream(host: str, status: int | str, seconds: float, nbytes: int):
+    """
+    HttpClient listener: one call per attempt (retries included).
+    """
+    UPSTREAM_SECONDS.observe(seconds, host, str(status))
+    UPSTREAM_BYTES.observe(nbytes, host)
+    logger.info(f"span upstream {host} {status}", extra={"span": {
+        "name": "upstream", "host": host, "status": status, "duration_ms": round(seconds * 1000, 2), "bytes": nbytes
+    }})
+
+def record_cache_lookup(cache: str, result: str):
+    CACHE_LOOKUPS.inc(cache, result)
+
+def record_llm_usage(agent: str, response, attrs: dict):
+    """
+    Token counts from a Gemini response's usage_metadata, into LLM_TOKENS and the open span's attrs.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    for kind, field in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count")):
+        count = getattr(usage, field, None)
+        if isinstance(count, int):
+            LLM_TOKENS.observe(count, agent, kind)
+            attrs[f"{kind}_tokens"] = count
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the packages the way the gateway does: from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The planner and narrator only check that a key is set; nothing here calls the LLM.
+os.environ.setdefault("GEMINI_API_KEY", "offline-tests")
@@ -0,0 +1,36 @@
+import pytest
+from orchestrator.agents.dataset_router import DatasetRouterAgent
+
+@pytest.fixture
+def router():
+    return DatasetRouterAgent()
+
+@pytest.mark.parametrize("query, source, countries, indicators", [
+    ("GDP growth India vs China", "WORLDBANK", ["IND", "CHN"], ["NY.GDP.MKTP.KD.ZG", "FP.CPI.TOTL.ZG"]),
+    ("US inflation", "WORLDBANK", ["USA"], ["FP.CPI.TOTL.ZG"]),
+    ("unemployment in Canada", "OECD", ["CAN"], ["HUR"]),
+    ("GDP growth South Korea vs Japan", "WORLDBANK", ["KOR", "JPN"], ["NY.GDP.MKTP.KD.ZG", "FP.CPI.TOTL.ZG"]),
+    ("New Zealand inflation", "WORLDBANK", ["NZL"], ["FP.CPI.TOTL.ZG"]),
+])
+def test_plain_questions_take_the_fast_path(router, query, source, countries, indicators):
+    plan, confidence = router.plan(query)
+    assert confidence == 1.0
+    assert (plan.source, plan.target_countries, plan.target_indicators) == (source, countries, indicators)
+
+@pytest.mark.parametrize("query", [
+    "How has inflation changed in the US since 2010?",   # explicit period
+    "unemployment in Spain over the last 5 years",
+    "gdp per capita India",                               # a different series than the keyword's
+    "real GDP Japan",
+    "unemployment in India",                              # India is not an OECD member
+    "GDP growth in Latin America",                        # regions, not the USA
+    "inflation in South America",
+    "Inflation in Central America",
+    "population of North America",
+    "GDP growth North Korea",                             # not South Korea
+    "Inflation in New Mexico",                            # not Mexico
+    "Ireland vs Northern Ireland",
+])
+def test_questions_the_rules_cannot_express_go_to_the_planner(router, query):
+    plan, confidence = router.plan(query)
+    assert plan is None and confidence < 1.0
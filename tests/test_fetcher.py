@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from data import deadline
+from data.adapters.base_adapter import BaseAdapter
+from data.canonical import IndicatorSeries
+from data.series_cache import SeriesCache
+from orchestrator.agents import fetcher as fetcher_module
+from orchestrator.schemas import AnalysisPlan
+
+class SlowAdapter(BaseAdapter):
+    """
+    An upstream that answers after `latency` seconds, unless the fetch's deadline passed by then.
+    """
+    source = "SLOW"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    def fetch_data(self, country_code, indicator_code, start_year, end_year):
+        self.calls += 1
+        time.sleep(self.latency)
+        deadline.check("the upstream response")
+        return IndicatorSeries.from_arrays(indicator_code, country_code, self.source, [start_year], [1.0])
+
+class StrictBatchAdapter(BaseAdapter):
+    """
+    An upstream that rejects a whole request naming an unknown country code, like the World Bank.
+    """
+    source = "STRICT"
+    supports_batch = True
+    known = {"IND", "CHN", "USA"}
+
+    def __init__(self):
+        self.batches = 0
+
+    def fetch_data(self, country_code, indicator_code, start_year, end_year):
+        if country_code not in self.known:
+            raise ValueError(f"No data found for {country_code} - {indicator_code}")
+        return IndicatorSeries.from_arrays(indicator_code, country_code, self.source, [start_year], [1.0])
+
+    def fetch_batch(self, country_codes, indicator_code, start_year, end_year):
+        self.batches += 1
+        if not self.known.issuperset(country_codes):
+            raise ValueError(f"No data found for {country_codes} - {indicator_code}")
+        return [self.fetch_data(code, indicator_code, start_year, end_year) for code in country_codes]
+
+class PairAdapter(BaseAdapter):
+    """
+    One request per pair; earlier countries answer later, and one pair always fails.
+    """
+    source = "PAIRS"
+    latency = {"USA": 0.15, "FRA": 0.1, "DEU": 0.05, "JPN": 0.0}
+
+    def fetch_data(self, country_code, indicator_code, start_year, end_year):
+        time.sleep(self.latency[country_code])
+        if (country_code, indicator_code) == ("FRA", "Y"):
+            raise ValueError("upstream error")
+        return IndicatorSeries.from_arrays(indicator_code, country_code, self.source, [start_year], [1.0])
+
+@pytest.fixture
+def make_fetcher(monkeypatch):
+    monkeypatch.setattr(fetcher_module, "SeriesCache", lambda: SeriesCache(":memory:"))
+
+    def make(adapter):
+        agent = fetcher_module.FetcherAgent(max_workers=2)
+        agent.sources.register(adapter, agent.cache)
+        return agent
+    return make
+
+def plan():
+    return AnalysisPlan(original_query="x", source="SLOW", topic="x",
+                        target_countries=["USA"], target_indicators=["X"], years=[2020])
+
+def run(agent, seconds, results, name):
+    with deadline.scope(seconds) as current:
+        results[name] = (agent.execute_plan(plan()), current.omitted)
+
+def test_coalesced_fetch_serves_a_caller_with_a_longer_deadline(make_fetcher):
+    adapter = SlowAdapter(latency=0.4)
+    agent = make_fetcher(adapter)
+    results = {}
+
+    short = threading.Thread(target=run, args=(agent, 0.1, results, "short"))
+    short.start()
+    while not agent.flights.stats()["in_flight"]:
+        time.sleep(0.01)
+    long = threading.Thread(target=run, args=(agent, 3, results, "long"))
+    long.start()
+    short.join(3)
+    long.join(3)
+
+    assert adapter.calls == 1
+    assert agent.flights.stats()["coalesced"] == 1
+    series, omitted = results["short"]
+    assert series == [] and omitted == ["fetch (1 of 1 fetches)"]
+    series, omitted = results["long"]
+    assert [s.country for s in series] == ["USA"] and omitted == []
+
+def test_fetch_stops_at_the_deadline_of_its_only_caller(make_fetcher):
+    adapter = SlowAdapter(latency=0.3)
+    agent = make_fetcher(adapter)
+    results = {}
+
+    run(agent, 0.1, results, "only")
+    time.sleep(0.4)
+
+    assert results["only"] == ([], ["fetch (1 of 1 fetches)"])
+    assert agent.cache.lookup("SLOW", "USA", "X", 2020, 2020)[1] == [(2020, 2020)]  # nothing stored
+
+def test_one_rejected_country_does_not_fail_the_batch(make_fetcher):
+    adapter = StrictBatchAdapter()
+    agent = make_fetcher(adapter)
+    batch_plan = AnalysisPlan(original_query="x", source="STRICT", topic="x",
+                              target_countries=["IND", "CHN", "XXX"], target_indicators=["X"], years=[2020])
+
+    series = agent.execute_plan(batch_plan)
+
+    assert adapter.batches == 1
+    assert [s.country for s in series] == ["IND", "CHN"]
+
+def test_fan_out_keeps_plan_order_and_isolates_a_failed_pair(make_fetcher):
+    agent = make_fetcher(PairAdapter())
+    pairs_plan = AnalysisPlan(original_query="x", source="PAIRS", topic="x",
+                              target_countries=["USA", "FRA", "DEU", "JPN"], target_indicators=["X", "Y"], years=[2020])
+
+    series = agent.execute_plan(pairs_plan)
+
+    assert [(s.country, s.indicator) for s in series] == [
+        ("USA", "X"), ("USA", "Y"), ("FRA", "X"), ("DEU", "X"), ("DEU", "Y"), ("JPN", "X"), ("JPN", "Y"),
+    ]
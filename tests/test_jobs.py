@@ -0,0 +1,69 @@
+import threading
+import time
+from gateway.jobs import NarrativeJobs
+from gateway.response_cache import ResponseCache, make_etag
+
+def wait_for_status(jobs, query_id, timeout=2.0):
+    until = time.monotonic() + timeout
+    while time.monotonic() < until:
+        job = jobs.get(query_id)
+        if job["status"] != "pending":
+            return job
+        time.sleep(0.01)
+    raise AssertionError("narration did not finish")
+
+def test_finished_narrative_leaves_the_pending_result_untouched():
+    jobs = NarrativeJobs(max_workers=1, store_path=None)
+    release = threading.Event()
+    pending = {"type": "analysis", "data": {"narrative": None, "stats": {}}}
+
+    jobs.submit("q1", pending, lambda: release.wait(2) and "It rose.")
+    release.set()
+    job = wait_for_status(jobs, "q1")
+
+    assert job["status"] == "success"
+    assert job["result"]["data"]["narrative"] == "It rose."
+    assert pending["data"]["narrative"] is None
+
+def test_failed_narration_is_reported_on_the_job():
+    jobs = NarrativeJobs(max_workers=1, store_path=None)
+
+    def narrate():
+        raise RuntimeError("model unavailable")
+
+    jobs.submit("q2", {"type": "analysis", "data": {"narrative": None}}, narrate)
+    job = wait_for_status(jobs, "q2")
+
+    assert job["status"] == "error"
+    assert "model unavailable" in job["result"]["data"]["narrative"]
+
+def test_finished_answer_goes_to_the_response_cache():
+    jobs = NarrativeJobs(max_workers=1, store_path=None)
+    cache = ResponseCache(disk_path=None)
+    pending = {"type": "success", "data": {"analysis": {"trend_direction": "increasing"}, "narrative": None}}
+
+    jobs.submit("q3", pending, lambda: "It rose.", on_success=lambda answer: cache.set("plan-key", answer))
+    job = wait_for_status(jobs, "q3")
+    # The hook runs just after the status flips.
+    until = time.monotonic() + 2
+    while cache.get("plan-key") is None and time.monotonic() < until:
+        time.sleep(0.01)
+
+    cached = cache.get("plan-key")
+    assert cached["result"] == job["result"]
+    assert cached["result"]["data"]["narrative"] == "It rose."
+    assert cached["etag"] == make_etag(job["result"])
+
+def test_failed_narration_is_not_cached():
+    jobs = NarrativeJobs(max_workers=1, store_path=None)
+    cache = ResponseCache(disk_path=None)
+    stored = []
+
+    def narrate():
+        raise RuntimeError("model unavailable")
+
+    jobs.submit("q4", {"type": "success", "data": {"analysis": {}, "narrative": None}}, narrate,
+                on_success=lambda answer: stored.append(cache.set("plan-key", answer)))
+    wait_for_status(jobs, "q4")
+
+    assert stored == [] and cache.get("plan-key") is None
@@ -0,0 +1,27 @@
+from data.adapters.oecd_adapter import COUNTRY_DIMS, SUBJECT_DIMS, decode_sdmx_json
+
+def sdmx(observations):
+    return {
+        "dataSets": [{"observations": observations}],
+        "structure": {"dimensions": {"observation": [
+            {"id": "LOCATION", "values": [{"id": "USA"}, {"id": "FRA"}]},
+            {"id": "SUBJECT", "values": [{"id": "HUR"}]},
+            {"id": "TIME_PERIOD", "values": [{"id": "2019"}, {"id": "2020"}, {"id": "2021"}]},
+        ]}},
+    }
+
+def test_decode_groups_series_and_drops_missing_values():
+    decoded = decode_sdmx_json(sdmx({
+        "0:0:1": [8.1], "0:0:0": [3.7], "1:0:0": [8.4], "1:0:2": [None],
+    }), [COUNTRY_DIMS, SUBJECT_DIMS])
+
+    assert set(decoded) == {("USA", "HUR"), ("FRA", "HUR")}
+    years, values = decoded[("USA", "HUR")]
+    assert list(years) == [2019, 2020] and list(values) == [3.7, 8.1]
+    years, values = decoded[("FRA", "HUR")]
+    assert list(years) == [2019] and list(values) == [8.4]
+
+def test_decode_all_null_observations_is_empty():
+    decoded = decode_sdmx_json(sdmx({"0:0:0": [None], "1:0:1": [], "0:0:2": [None]}),
+                               [COUNTRY_DIMS, SUBJECT_DIMS])
+    assert decoded == {}
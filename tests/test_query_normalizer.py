@@ -0,0 +1,27 @@
+import pytest
+from orchestrator.query_normalizer import extract_countries, normalize_query
+
+@pytest.mark.parametrize("first, second", [
+    ("India vs China", "china vs IND"),                                  # country order and alias form
+    ("GDP growth India vs China", "india vs china gdp growth"),          # word order and case
+    ("GDP growth India vs China", "GDP growth of IND and CHN"),          # filler words, ISO codes
+    ("US inflation", "inflation in the United States"),
+    ("Compare unemployment: France, Spain", "unemployment  spain  FRANCE?"),  # punctuation, spacing
+])
+def test_same_question_same_key(first, second):
+    assert normalize_query(first) == normalize_query(second)
+
+@pytest.mark.parametrize("first, second", [
+    ("GDP growth India from 2010 to 2015", "GDP growth India from 2015 to 2020"),
+    ("GDP growth India since 2010", "GDP growth India"),
+    ("GDP growth India vs China", "inflation India vs China"),
+    ("GDP growth India vs China", "GDP growth India vs Japan"),
+    ("US inflation", "show us inflation"),   # lowercase "us" is a word, not the country
+])
+def test_different_question_different_key(first, second):
+    assert normalize_query(first) != normalize_query(second)
+
+def test_countries_in_order_of_mention():
+    assert extract_countries("India vs the US vs india") == ["IND", "USA"]
+    assert extract_countries("CAN you show Canada") == ["CAN"]
+    assert extract_countries("can you show inflation") == []
@@ -0,0 +1,129 @@
+import pytest
+import requests
+from data import resilience
+from data.resilience import CircuitBreaker, SourceGuard, SourceUnavailable
+
+class FakeClock:
+    """
+    Stands in for the time module inside data.resilience: sleeping just moves the clock.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience, "time", fake)
+    return fake
+
+def make_guard(rate=0.0, burst=1, max_in_flight=4, max_wait=0.0, failures=2, cooldown=30.0):
+    return SourceGuard("TEST", rate=rate, burst=burst, max_in_flight=max_in_flight, max_wait=max_wait,
+                       slow_call=5.0, breaker=CircuitBreaker("TEST", failure_threshold=failures, cooldown=cooldown),
+                       hedge_percentile=0)
+
+def down():
+    raise requests.ConnectionError("connection refused")
+
+def test_breaker_opens_probes_and_closes(clock):
+    guard = make_guard()
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            guard.call(down)
+    assert guard.breaker.state == CircuitBreaker.OPEN
+
+    # Open: refused without calling the upstream.
+    with pytest.raises(SourceUnavailable):
+        guard.call(lambda: pytest.fail("upstream called while the breaker is open"))
+    assert guard.stats()["short_circuited"] == 1
+
+    # After the cooldown a single probe goes through.
+    clock.sleep(30)
+    assert guard.breaker.allow()
+    assert guard.breaker.state == CircuitBreaker.HALF_OPEN
+    assert not guard.breaker.allow()
+    guard.breaker.release()
+
+    assert guard.call(lambda: "ok") == "ok"
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+    assert guard.breaker.stats()["consecutive_failures"] == 0
+
+def test_failed_probe_reopens_the_breaker(clock):
+    guard = make_guard()
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            guard.call(down)
+    clock.sleep(30)
+
+    with pytest.raises(requests.ConnectionError):
+        guard.call(down)
+
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert guard.breaker.trips == 2
+    assert guard.breaker.stats()["retry_in_s"] == 30.0
+    with pytest.raises(SourceUnavailable):
+        guard.call(lambda: "ok")
+
+def test_slow_calls_count_as_failures(clock):
+    guard = make_guard()
+
+    def slow():
+        clock.sleep(6)  # over slow_call
+        return "late"
+
+    assert guard.call(slow) == "late"
+    assert guard.call(slow) == "late"
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    assert guard.stats()["slow_calls"] == 2
+
+def test_no_data_answers_do_not_trip_the_breaker(clock):
+    guard = make_guard()
+
+    def empty():
+        raise ValueError("No data found")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            guard.call(empty)
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+def test_concurrency_cap_refuses_extra_calls(clock):
+    guard = make_guard(max_in_flight=1)
+
+    def nested():
+        # The only slot is held by this call.
+        with pytest.raises(SourceUnavailable):
+            guard.call(lambda: "second")
+        return "first"
+
+    assert guard.call(nested) == "first"
+    assert guard.stats()["rejected"] == 1
+    assert guard.stats()["in_flight"] == 0
+    assert guard.call(lambda: "again") == "again"  # the slot was given back
+
+def test_token_bucket_refuses_once_the_burst_is_spent(clock):
+    guard = make_guard(rate=1.0, burst=2, max_wait=0.5)
+    assert guard.call(lambda: 1) == 1
+    assert guard.call(lambda: 2) == 2
+
+    with pytest.raises(SourceUnavailable):
+        guard.call(lambda: 3)  # the next token is 1s away, longer than max_wait
+    assert guard.stats()["rejected"] == 1
+    assert guard.breaker.state == CircuitBreaker.CLOSED  # a refusal is not an upstream failure
+
+    clock.sleep(1)
+    assert guard.call(lambda: 4) == 4
+
+def test_token_bucket_waits_within_max_wait(clock):
+    guard = make_guard(rate=2.0, burst=1, max_wait=1.0)
+    guard.call(lambda: None)
+    started = clock.now
+
+    assert guard.call(lambda: "waited") == "waited"
+    assert clock.now - started == pytest.approx(0.5)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from gateway.response_cache import ResponseCache, etag_matches, make_etag
+from orchestrator.schemas import AnalysisPlan
+
+def answer(narrative="Inflation fell.", **data):
+    return {"type": "success", "data": {"analysis": {"trend_direction": "decreasing"}, "narrative": narrative, **data}}
+
+def plan(query="US inflation"):
+    return AnalysisPlan(original_query=query, source="WORLDBANK", topic="economic_analysis",
+                        target_countries=["USA"], target_indicators=["FP.CPI.TOTL.ZG"], years=[2020, 2021])
+
+def test_key_ignores_the_phrasing():
+    assert ResponseCache.key(plan("US inflation")) == ResponseCache.key(plan("inflation in the United States"))
+
+def test_etag_round_trip():
+    cache = ResponseCache(disk_path=None)
+    etag = cache.set("k", answer())
+
+    assert etag == make_etag(answer())
+    assert cache.get("k")["etag"] == etag
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+def test_unfinished_answers_are_not_cached():
+    cache = ResponseCache(disk_path=None)
+
+    assert cache.set("k", answer(partial=True, omitted=["narrative"])) is None
+    assert cache.set("k", answer(narrative="Error generation narrative: quota")) is None
+    assert cache.set("k", {"type": "error", "message": "no plan"}) is None
+    assert cache.get("k") is None
+
+def test_stale_answer_is_served_while_one_refresh_runs():
+    cache = ResponseCache(fresh=0.2, disk_path=None)
+    cache.set("k", answer("old"))
+    time.sleep(0.25)
+    refreshes = []
+
+    async def refresh():
+        refreshes.append(1)
+        await asyncio.sleep(0.01)
+        return answer("new")
+
+    async def scenario():
+        entry = cache.get("k")
+        assert entry["stale"] and entry["result"]["data"]["narrative"] == "old"
+        cache.revalidate("k", refresh)
+        cache.revalidate("k", refresh)  # already refreshing: ignored
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    entry = cache.get("k")
+    assert len(refreshes) == 1
+    assert not entry["stale"] and entry["result"]["data"]["narrative"] == "new"
+    assert cache.stats()["refreshes"] == 1
+
+def test_failed_refresh_keeps_the_stale_answer():
+    cache = ResponseCache(fresh=0.05, disk_path=None)
+    etag = cache.set("k", answer("old"))
+    time.sleep(0.1)
+
+    async def refresh():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        cache.revalidate("k", refresh)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+
+    entry = cache.get("k")
+    assert entry["stale"] and entry["etag"] == etag
+    assert cache.stats()["refresh_errors"] == 1
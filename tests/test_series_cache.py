@@ -0,0 +1,37 @@
+import pytest
+from data.canonical import IndicatorSeries
+from data.series_cache import SeriesCache
+
+COUNTRIES = ["A", "B", "C", "D", "E"]
+
+@pytest.fixture(params=["duckdb", "sqlite"])
+def make_cache(request, tmp_path):
+    path = ":memory:" if request.param == "duckdb" else str(tmp_path / "series.sqlite")
+    return lambda **kwargs: SeriesCache(path, **kwargs)
+
+def universe():
+    return [IndicatorSeries.from_arrays("X", country, "WORLDBANK", [2020, 2021, 2022], [1.0, 2.0, 3.0])
+            for country in COUNTRIES]
+
+def test_lookup_all_serves_bulk_fetch(make_cache):
+    cache = make_cache()
+    cache.store_many(universe(), 2020, 2022, all_countries=True)
+
+    found = cache.lookup_all("WORLDBANK", "X", 2020, 2022)
+    assert sorted(s.country for s in found) == COUNTRIES
+    assert cache.lookup_all("WORLDBANK", "X", 2019, 2022) is None
+
+def test_lookup_all_after_eviction_is_a_miss(make_cache):
+    # 15 points over a 12-row budget: eviction takes some members, and must take the marker with them.
+    cache = make_cache(max_rows=12)
+    cache.store_many(universe(), 2020, 2022, all_countries=True)
+
+    assert cache.lookup_all("WORLDBANK", "X", 2020, 2022) is None
+
+def test_lookup_reports_missing_ranges(make_cache):
+    cache = make_cache()
+    cache.store(IndicatorSeries.from_arrays("X", "A", "WORLDBANK", [2020, 2021], [1.0, 2.0]), 2020, 2021)
+
+    series, missing = cache.lookup("WORLDBANK", "A", "X", 2018, 2021)
+    assert list(series.years) == [2020, 2021]
+    assert missing == [(2018, 2019)]
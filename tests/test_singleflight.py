@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import pytest
+from data import deadline
+from orchestrator.singleflight import SingleFlight
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=True)
+
+def test_followers_share_one_execution(executor):
+    flights = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return "done"
+
+    first = flights.submit("k", executor, work)
+    second = flights.submit("k", executor, work)
+    release.set()
+
+    assert first.result(2) == second.result(2) == "done"
+    assert len(calls) == 1
+    assert flights.stats()["coalesced"] == 1
+
+def test_detaching_one_follower_keeps_the_call(executor):
+    flights = SingleFlight("test")
+    release = threading.Event()
+    flights.submit("block", executor, release.wait, 2)
+    flights.submit("block2", executor, release.wait, 2)  # both workers busy: "k" stays queued
+
+    first = flights.submit("k", executor, lambda: "done")
+    second = flights.submit("k", executor, lambda: "done")
+    first.cancel()
+    release.set()
+
+    assert second.result(2) == "done"
+    with pytest.raises(CancelledError):
+        first.result()
+
+def test_call_everyone_left_is_cancelled_and_rejoining_starts_over(executor):
+    flights = SingleFlight("test")
+    release = threading.Event()
+    flights.submit("block", executor, release.wait, 2)
+    flights.submit("block2", executor, release.wait, 2)
+
+    abandoned = flights.submit("k", executor, lambda: "first")
+    abandoned.cancel()
+    rejoined = flights.submit("k", executor, lambda: "second")
+    release.set()
+
+    assert rejoined.result(2) == "second"
+    assert flights.stats()["executions"] == 4
+
+def test_shared_call_runs_until_the_last_callers_deadline(executor):
+    flights = SingleFlight("test")
+
+    def work():
+        # Outlives the first caller's deadline but not the second's.
+        time.sleep(0.3)
+        deadline.check("the upstream call")
+        return "done"
+
+    with deadline.scope(0.1):
+        first = flights.submit("k", executor, work)
+    with deadline.scope(2):
+        second = flights.submit("k", executor, work)
+
+    assert second.result(2) == "done"
+    assert first.result(2) == "done"  # the call itself was not cut; only the first caller's wait is
+
+def test_do_follower_retries_when_the_leaders_deadline_ran_out():
+    flights = SingleFlight("test")
+    joined = threading.Event()
+    results = {}
+
+    def leader_work():
+        joined.wait(2)
+        raise deadline.DeadlineExceeded("leader out of time")
+
+    def call(name, fn):
+        with deadline.scope(5):
+            try:
+                results[name] = flights.do("k", fn)
+            except deadline.DeadlineExceeded as e:
+                results[name] = e
+
+    leader = threading.Thread(target=call, args=("leader", leader_work))
+    leader.start()
+    while not flights.stats()["in_flight"]:
+        time.sleep(0.01)
+    follower = threading.Thread(target=call, args=("follower", lambda: "own call"))
+    follower.start()
+    while not flights.stats()["coalesced"]:
+        time.sleep(0.01)
+    joined.set()
+    leader.join(2)
+    follower.join(2)
+
+    assert isinstance(results["leader"], deadline.DeadlineExceeded)
+    assert results["follower"] == "own call"